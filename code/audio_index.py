@@ -0,0 +1,392 @@
+"""
+Indexed audio discovery for large, nested corpora
+
+Directories are walked in parallel with os.scandir and every audio file is
+recorded in a persistent SQLite manifest (path, size, modification time,
+duration, sample rate and participant ID). On later runs a directory whose modification
+time has not changed is not listed again: its files come from the manifest,
+so only new or changed directories touch the (network) file system.
+Participant IDs are parsed from the path with configurable regular
+expressions, and IDs that match several files are reported instead of the
+last file silently winning.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from audio_io import parse_wav_header
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.flac')
+
+# Tried in order on the path relative to the scanned root ('/' separated);
+# group 1 is the participant ID. Defaults: "300_AUDIO.wav", then "300.wav".
+DEFAULT_ID_PATTERNS = (r'(?:^|/)(\d+)_[^/]*$', r'(?:^|/)(\d+)\.[^/.]+$')
+
+# Directories modified this recently (ns) are listed again on the next update
+RECENT_CHANGE_NS = 2 * 10 ** 9
+
+
+def participant_id_from_path(relative_path, patterns):
+    """
+    Parse the participant ID from a file path
+
+    Args:
+        relative_path: Path relative to the scanned root, '/' separated
+        patterns: Compiled regular expressions tried in order (group 1 is the ID)
+
+    Returns:
+        int or str: The ID (int when numeric), or None if no pattern matches
+    """
+    for pattern in patterns:
+        match = pattern.search(relative_path)
+        if match:
+            participant_id = match.group(1)
+            return int(participant_id) if participant_id.isdigit() else participant_id
+    return None
+
+
+def audio_header(file_path):
+    """
+    Duration and sample rate from the file header, without decoding
+
+    Args:
+        file_path: Path to audio file
+
+    Returns:
+        dict: 'duration' (seconds) and 'sample_rate', or None if they cannot be read from the header
+    """
+    try:
+        header = parse_wav_header(file_path)
+        if header is not None:
+            return {'duration': header['frames'] / header['sample_rate'], 'sample_rate': header['sample_rate']}
+        import soundfile as sf
+        info = sf.info(file_path)
+        return {'duration': info.duration, 'sample_rate': info.samplerate}
+    except Exception:
+        return None
+
+
+def audio_duration(file_path):
+    """
+    Duration in seconds from the file header, without decoding
+
+    Args:
+        file_path: Path to audio file
+
+    Returns:
+        float: Duration, or None if it cannot be read from the header
+    """
+    header = audio_header(file_path)
+    return header['duration'] if header is not None else None
+
+
+class AudioManifest:
+    def __init__(self, path, id_patterns=DEFAULT_ID_PATTERNS, extensions=AUDIO_EXTENSIONS, max_workers=None):
+        """
+        Open (or create) an audio manifest
+
+        Args:
+            path: Path to the SQLite manifest file
+            id_patterns: Regular expressions for the participant ID (see DEFAULT_ID_PATTERNS)
+            extensions: Audio file extensions to index (lower case)
+            max_workers: Threads used to walk directories (None for auto)
+        """
+        self.path = path
+        self.id_patterns = [re.compile(pattern) for pattern in id_patterns]
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.roots = None  # Roots indexed by update(); entries() only returns files under them
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " root TEXT,"
+            " relative_path TEXT,"
+            " directory TEXT,"
+            " participant_id TEXT,"
+            " size INTEGER,"
+            " mtime_ns INTEGER,"
+            " duration REAL,"
+            " sample_rate INTEGER)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS directories ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER,"
+            " subdirectories_json TEXT)"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(files)")]
+        if 'sample_rate' not in columns:
+            # Manifest from before sample rates were stored: read every header again on the next update
+            self.connection.execute("ALTER TABLE files ADD COLUMN sample_rate INTEGER")
+            self.connection.execute("UPDATE files SET mtime_ns = NULL")
+            self.connection.execute("DELETE FROM directories")
+        self.connection.commit()
+        self.refresh_ids()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.connection.close()
+
+    def refresh_ids(self):
+        """Re-parse stored participant IDs if the ID patterns or extensions changed"""
+        settings = json.dumps({'id_patterns': [pattern.pattern for pattern in self.id_patterns],
+                               'extensions': list(self.extensions)})
+        row = self.connection.execute("SELECT value FROM settings WHERE key = 'settings'").fetchone()
+        if row is not None and row[0] == settings:
+            return
+
+        rows = self.connection.execute("SELECT path, relative_path FROM files").fetchall()
+        self.connection.executemany(
+            "UPDATE files SET participant_id = ? WHERE path = ?",
+            [(self.encode_id(participant_id_from_path(relative_path, self.id_patterns)), path)
+             for path, relative_path in rows]
+        )
+        self.connection.execute("DELETE FROM directories")  # Re-list with the new extensions
+        self.connection.execute("INSERT OR REPLACE INTO settings VALUES ('settings', ?)", (settings,))
+        self.connection.commit()
+
+    @staticmethod
+    def encode_id(participant_id):
+        """Participant ID as stored in the manifest (text)"""
+        return None if participant_id is None else str(participant_id)
+
+    @staticmethod
+    def decode_id(participant_id):
+        """Participant ID from the manifest (int when numeric)"""
+        return int(participant_id) if participant_id is not None and participant_id.isdigit() else participant_id
+
+    def scan_directory(self, directory, known_directories, known_files, full_rescan):
+        """
+        List one directory, or reuse its manifest entry if it is unchanged
+
+        Headers of new and changed files are read here, on the scanning
+        thread, so on network storage the file opens run in parallel like the
+        directory listings.
+
+        Args:
+            directory: Directory path
+            known_directories: {path: (mtime_ns, subdirectories)} from the manifest
+            known_files: {path: (size, mtime_ns)} from the manifest
+            full_rescan: Ignore the manifest and list every directory
+
+        Returns:
+            tuple: (directory, mtime_ns, files, subdirectories) where files is a
+                   list of (path, size, mtime_ns, header), or None for an
+                   unchanged directory (header is audio_header(), None for files
+                   the manifest already has unchanged)
+        """
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return directory, None, [], []
+        known = known_directories.get(directory)
+        if not full_rescan and known is not None and known[0] == mtime_ns:
+            return directory, mtime_ns, None, known[1]
+
+        files, subdirectories = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        elif entry.name.lower().endswith(self.extensions) and entry.is_file():
+                            stat = entry.stat()
+                            unchanged = known_files.get(entry.path) == (stat.st_size, stat.st_mtime_ns)
+                            files.append((entry.path, stat.st_size, stat.st_mtime_ns,
+                                          None if unchanged else audio_header(entry.path)))
+                    except OSError:
+                        continue
+        except OSError as e:
+            # Keep what the manifest knows rather than dropping the directory's files
+            print(f"  Error scanning {directory}: {e}")
+            return directory, mtime_ns, None, known[1] if known is not None else []
+        return directory, mtime_ns, files, subdirectories
+
+    def update(self, roots, full_rescan=False):
+        """
+        Bring the manifest up to date with the files under the given roots
+
+        Adding, removing or renaming a file updates its directory's
+        modification time, so unchanged directories are reused as is; files
+        rewritten in place under the same name are only picked up with
+        full_rescan=True. Rows stored under other roots by earlier runs are
+        kept but no longer returned by entries() and files_by_id().
+
+        Args:
+            roots: Directories to index
+            full_rescan: List every directory even if its modification time is unchanged
+
+        Returns:
+            dict: Counts of 'directories_listed', 'directories_reused', 'added',
+                  'changed' and 'removed' files
+        """
+        stats = {'directories_listed': 0, 'directories_reused': 0, 'added': 0, 'changed': 0, 'removed': 0}
+        known_directories = {path: (mtime_ns, json.loads(subdirectories))
+                             for path, mtime_ns, subdirectories in
+                             self.connection.execute("SELECT path, mtime_ns, subdirectories_json FROM directories")}
+        known_files = {path: (size, mtime_ns) for path, size, mtime_ns in
+                       self.connection.execute("SELECT path, size, mtime_ns FROM files")}
+
+        self.roots = []
+        for root in roots:
+            root = os.path.abspath(root)
+            if not os.path.isdir(root):
+                print(f"  Audio directory not found: {root}")
+                continue
+            self.roots.append(root)
+
+            seen_directories = set()
+            listed = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pending = {executor.submit(self.scan_directory, root, known_directories, known_files, full_rescan)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        directory, mtime_ns, files, subdirectories = future.result()
+                        if mtime_ns is None:
+                            continue
+                        seen_directories.add(directory)
+                        if files is None:
+                            stats['directories_reused'] += 1
+                        else:
+                            stats['directories_listed'] += 1
+                            listed.append((directory, mtime_ns, files, subdirectories))
+                        for subdirectory in subdirectories:
+                            pending.add(executor.submit(self.scan_directory, subdirectory,
+                                                        known_directories, known_files, full_rescan))
+
+            self.apply_listings(root, listed, known_files, stats)
+            self.remove_missing_directories(root, seen_directories, stats)
+
+        self.connection.commit()
+        return stats
+
+    def apply_listings(self, root, listed, known_files, stats):
+        """Write the files of freshly listed directories to the manifest"""
+        for directory, mtime_ns, files, subdirectories in listed:
+            present = set()
+            for path, size, file_mtime_ns, header in files:
+                present.add(path)
+                known = known_files.get(path)
+                if known == (size, file_mtime_ns):
+                    continue
+                stats['added' if known is None else 'changed'] += 1
+                relative_path = os.path.relpath(path, root).replace(os.sep, '/')
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, root, relative_path, directory,
+                     self.encode_id(participant_id_from_path(relative_path, self.id_patterns)),
+                     size, file_mtime_ns,
+                     header['duration'] if header is not None else None,
+                     header['sample_rate'] if header is not None else None)
+                )
+
+            stored = [row[0] for row in self.connection.execute(
+                "SELECT path FROM files WHERE directory = ?", (directory,))]
+            removed = [(path,) for path in stored if path not in present]
+            self.connection.executemany("DELETE FROM files WHERE path = ?", removed)
+            stats['removed'] += len(removed)
+
+            # Coarse file system timestamps could hide a change made in the same
+            # tick as this scan, so recently modified directories are re-listed next time
+            if time.time_ns() - mtime_ns < RECENT_CHANGE_NS:
+                mtime_ns = -1
+            self.connection.execute("INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",
+                                    (directory, mtime_ns, json.dumps(subdirectories)))
+
+    def remove_missing_directories(self, root, seen_directories, stats):
+        """Drop manifest entries for directories under root that no longer exist"""
+        prefix = root.rstrip(os.sep) + os.sep
+        stored = [row[0] for row in self.connection.execute("SELECT path FROM directories")]
+        for directory in stored:
+            if (directory == root or directory.startswith(prefix)) and directory not in seen_directories:
+                stats['removed'] += self.connection.execute(
+                    "DELETE FROM files WHERE directory = ?", (directory,)).rowcount
+                self.connection.execute("DELETE FROM directories WHERE path = ?", (directory,))
+
+    def entries(self, participant_ids=None):
+        """
+        Manifest rows, optionally restricted to some participants
+
+        After update() only files under the roots it indexed are returned.
+
+        Args:
+            participant_ids: Optional iterable of IDs
+
+        Returns:
+            list: Dicts with 'path', 'participant_id', 'size', 'mtime_ns' and 'duration'
+        """
+        query = "SELECT path, participant_id, size, mtime_ns, duration FROM files WHERE participant_id IS NOT NULL"
+        parameters = []
+        if self.roots is not None:
+            query += f" AND root IN ({', '.join('?' * len(self.roots))})"
+            parameters = self.roots
+        rows = self.connection.execute(query + " ORDER BY path", parameters).fetchall()
+        entries = [{'path': path, 'participant_id': self.decode_id(participant_id), 'size': size,
+                    'mtime_ns': mtime_ns, 'duration': duration}
+                   for path, participant_id, size, mtime_ns, duration in rows]
+        if participant_ids is not None:
+            wanted = set(participant_ids)
+            entries = [entry for entry in entries if entry['participant_id'] in wanted]
+        return entries
+
+    def files_by_id(self, participant_ids=None):
+        """
+        Map each participant to one audio file
+
+        When an ID matches several files the longest recording is used (then
+        the largest file, then the first path) and the duplicates are returned
+        so the caller can report them.
+
+        Args:
+            participant_ids: Optional iterable of IDs to include
+
+        Returns:
+            tuple: ({participant_id: path}, {participant_id: [paths]} for duplicated IDs)
+        """
+        by_id = {}
+        for entry in self.entries(participant_ids):
+            by_id.setdefault(entry['participant_id'], []).append(entry)
+
+        files, duplicates = {}, {}
+        for participant_id, candidates in by_id.items():
+            candidates.sort(key=lambda entry: (-(entry['duration'] or 0), -entry['size'], entry['path']))
+            files[participant_id] = candidates[0]['path']
+            if len(candidates) > 1:
+                duplicates[participant_id] = [entry['path'] for entry in candidates]
+        return files, duplicates
+
+    def headers(self, paths):
+        """
+        Header duration and sample rate of indexed files, as stored by update()
+
+        Args:
+            paths: Iterable of paths
+
+        Returns:
+            dict: {path: {'duration', 'sample_rate'}, or None for files not
+                  indexed or whose header could not be read}
+        """
+        paths = list(paths)
+        headers = dict.fromkeys(paths)
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT path, duration, sample_rate FROM files WHERE path IN ({', '.join('?' * len(batch))})"
+                " AND duration IS NOT NULL AND sample_rate IS NOT NULL", batch)
+            for path, duration, sample_rate in rows:
+                headers[path] = {'duration': duration, 'sample_rate': sample_rate}
+        return headers
@@ -0,0 +1,171 @@
+"""
+Audio decoding for the feature extractors
+
+PCM and float WAV files are memory-mapped and converted straight to float64
+(the sample type Praat uses), one window at a time if needed. Other formats
+libsndfile understands (FLAC, OGG, AIFF, ...) are read through soundfile.
+Compressed formats soundfile cannot open (e.g. .m4a) are left to the
+librosa/audioread fallback in FrequencyFeatureExtractor.load_audio_file().
+"""
+import os
+import struct
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Memory-mappable WAV sample formats: (format tag, bits) -> (dtype, zero offset, scale to [-1, 1))
+WAV_SAMPLE_TYPES = {
+    (WAVE_FORMAT_PCM, 8): ('u1', 128.0, 1.0 / 128),
+    (WAVE_FORMAT_PCM, 16): ('<i2', 0.0, 1.0 / 32768),
+    (WAVE_FORMAT_PCM, 32): ('<i4', 0.0, 1.0 / 2 ** 31),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): ('<f4', 0.0, 1.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): ('<f8', 0.0, 1.0),
+}
+
+
+def parse_wav_header(file_path):
+    """
+    Locate the sample data of a RIFF/WAVE file
+
+    Args:
+        file_path: Path to audio file
+
+    Returns:
+        dict: 'offset', 'frames', 'channels', 'sample_rate', 'dtype', 'zero'
+              and 'scale', or None if the file is not a memory-mappable WAV
+              (other container, compressed or 24-bit samples)
+    """
+    with open(file_path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return None
+        file_size = os.fstat(f.fileno()).st_size
+
+        wav_format = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                body = f.read(size)
+                if len(body) < 16:
+                    return None
+                format_tag, channels, sample_rate = struct.unpack('<HHI', body[:8])
+                bits = struct.unpack('<H', body[14:16])[0]
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    format_tag = struct.unpack('<H', body[24:26])[0]
+                wav_format = (format_tag, channels, sample_rate, bits)
+                f.seek(size % 2, 1)
+            elif chunk_id == b'data':
+                if wav_format is None:
+                    return None
+                data_offset = f.tell()
+                # Streamed or truncated files can declare more data than they hold
+                data_size = min(size, file_size - data_offset)
+                break
+            else:
+                f.seek(size + size % 2, 1)
+
+    format_tag, channels, sample_rate, bits = wav_format
+    if (format_tag, bits) not in WAV_SAMPLE_TYPES or channels < 1:
+        return None
+    dtype, zero, scale = WAV_SAMPLE_TYPES[(format_tag, bits)]
+    return {'offset': data_offset, 'frames': data_size // (channels * bits // 8), 'channels': channels,
+            'sample_rate': sample_rate, 'dtype': dtype, 'zero': zero, 'scale': scale}
+
+
+class AudioReader:
+    """
+    Random-access mono reader over a WAV memory map or a soundfile handle
+
+    Raises on open if neither path can read the file, so callers can fall
+    back to librosa.
+    """
+
+    def __init__(self, file_path):
+        """
+        Args:
+            file_path: Path to audio file
+        """
+        self.file_path = file_path
+        self.samples = None
+        self.sound_file = None
+
+        header = parse_wav_header(file_path)
+        if header is not None and header['frames'] > 0:
+            self.samplerate = header['sample_rate']
+            self.frames = header['frames']
+            self.zero = header['zero']
+            self.scale = header['scale']
+            self.samples = np.memmap(file_path, dtype=header['dtype'], mode='r', offset=header['offset'],
+                                     shape=(header['frames'], header['channels']))
+        else:
+            import soundfile as sf
+            self.sound_file = sf.SoundFile(file_path)
+            self.samplerate = self.sound_file.samplerate
+            self.frames = self.sound_file.frames
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def read(self, start, stop):
+        """
+        Read samples [start, stop) as mono float64
+
+        Args:
+            start: First sample index
+            stop: End sample index (exclusive)
+
+        Returns:
+            ndarray: Channel-averaged samples scaled to [-1, 1)
+        """
+        if self.samples is not None:
+            block = self.samples[start:stop]
+            if block.shape[1] == 1:
+                audio = block[:, 0].astype(np.float64)
+            else:
+                audio = block.mean(axis=1, dtype=np.float64)
+            if self.zero:
+                audio -= self.zero
+            if self.scale != 1.0:
+                audio *= self.scale
+            return audio
+
+        self.sound_file.seek(start)
+        block = self.sound_file.read(stop - start, dtype='float64', always_2d=True)
+        return block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+
+    def read_all(self):
+        """Read the whole file as mono float64"""
+        return self.read(0, self.frames)
+
+    def close(self):
+        """Release the memory map or file handle"""
+        if self.sound_file is not None:
+            self.sound_file.close()
+        self.samples = None
+
+
+def load_audio(file_path):
+    """
+    Decode a whole file at its native sample rate without librosa
+
+    Args:
+        file_path: Path to audio file
+
+    Returns:
+        tuple: (audio, sample_rate) with mono float64 samples
+
+    Raises:
+        Exception: If the file is neither a memory-mappable WAV nor readable by soundfile
+    """
+    with AudioReader(file_path) as reader:
+        return reader.read_all(), reader.samplerate
@@ -0,0 +1,507 @@
+"""
+Benchmarks for the frequency feature extractor
+
+Runs on deterministic synthetic voiced signals (glottal pulse trains with
+controlled F0, jitter and tremor through formant resonators), so no
+E-DAIC-WOZ audio is needed and runs on different machines or commits are
+comparable. Reports end-to-end and per-stage timings, throughput in
+audio-seconds per CPU-second and peak memory, checks the extracted values
+against the synthesis parameters, and can compare them with a saved
+reference to confirm an optimization leaves the features unchanged.
+
+Usage:
+    python benchmark_features.py                      # full suite
+    python benchmark_features.py --quick              # short fixtures only
+    python benchmark_features.py --save-reference ref.json
+    python benchmark_features.py --reference ref.json --output report.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import parselmouth
+import soundfile as sf
+from parselmouth.praat import call
+from scipy.signal import lfilter
+
+from audio_io import load_audio
+from frequency_features import FrequencyFeatureExtractor, DEFAULT_FEATURE_FAMILIES
+from running_stats import linear_trend, batch_linear_trend
+
+# Synthetic voices used as benchmark fixtures
+FIXTURE_VOICES = {
+    'steady': {'f0': 120.0},
+    'jitter': {'f0': 200.0, 'jitter': 0.01},
+    'tremor': {'f0': 150.0, 'tremor_rate': 5.0, 'tremor_depth': 0.03},
+}
+FULL_DURATIONS = (10, 60, 300)
+FULL_SAMPLE_RATES = (16000, 44100)
+QUICK_DURATIONS = (5, 20)
+QUICK_SAMPLE_RATES = (16000,)
+
+
+def synthesize_pulse_times(duration, f0=120.0, jitter=0.0, tremor_rate=0.0, tremor_depth=0.0, rng=None):
+    """
+    Glottal closure times for a voice with controlled F0, jitter and tremor
+
+    Args:
+        duration: Length of the signal in seconds
+        f0: Mean fundamental frequency in Hz
+        jitter: Standard deviation of the relative period perturbation
+                (local jitter is about 1.13 times this value)
+        tremor_rate: Frequency of the sinusoidal F0 modulation in Hz
+        tremor_depth: Relative amplitude of the F0 modulation
+        rng: numpy Generator for the jitter perturbation
+
+    Returns:
+        tuple: (pulse_times, periods) arrays in seconds; pulse_times are the
+               glottal closures and periods[k] is the cycle ending at pulse_times[k]
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    n_pulses = int(np.ceil(duration * f0 * (1 + tremor_depth))) + 2
+
+    # Unperturbed periods follow the (tremor-modulated) F0 contour
+    times = np.arange(n_pulses) / f0
+    for _ in range(3):  # Fixed-point refinement of t_k under the modulated F0
+        instantaneous_f0 = f0 * (1 + tremor_depth * np.sin(2 * np.pi * tremor_rate * times))
+        times = np.concatenate([[0.0], np.cumsum(1.0 / instantaneous_f0[:-1])])
+    periods = 1.0 / (f0 * (1 + tremor_depth * np.sin(2 * np.pi * tremor_rate * times)))
+
+    # Cycle-to-cycle jitter
+    periods = periods * (1 + jitter * rng.standard_normal(n_pulses))
+    times = np.concatenate([[0.0], np.cumsum(periods[:-1])])
+    keep = times < duration
+    return times[keep], periods[keep]
+
+
+def synthesize_voiced_signal(duration, sample_rate, f0=120.0, jitter=0.0, tremor_rate=0.0, tremor_depth=0.0,
+                             formants=((700, 80), (1200, 90), (2600, 120)), seed=0):
+    """
+    Generate a synthetic vowel: Rosenberg glottal pulses through formant resonators
+
+    The glottal waveform is evaluated in continuous time, so pulse timing
+    (and therefore jitter) is not quantised to the sample grid.
+
+    Args:
+        duration: Length of the signal in seconds
+        sample_rate: Sampling frequency in Hz
+        f0: Mean fundamental frequency in Hz
+        jitter: Relative period perturbation (standard deviation)
+        tremor_rate: Frequency of the F0 modulation in Hz
+        tremor_depth: Relative amplitude of the F0 modulation
+        formants: Sequence of (frequency, bandwidth) pairs in Hz
+        seed: Seed for the jitter and the additive noise floor
+
+    Returns:
+        ndarray: Signal samples (float64, peak 0.5)
+    """
+    rng = np.random.default_rng(seed)
+    pulse_times, periods = synthesize_pulse_times(duration, f0, jitter, tremor_rate, tremor_depth, rng)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+
+    # Rosenberg pulse (40% opening, 16% closing phase) ending at each glottal
+    # closure, so closure-to-closure intervals are exactly the synthesised periods
+    opening, closing = 0.4, 0.16
+    cycle = np.clip(np.searchsorted(pulse_times, t, side='left'), 0, len(pulse_times) - 1)
+    tau = opening + closing - (pulse_times[cycle] - t) / periods[cycle]
+    flow = np.where((tau >= 0) & (tau < opening), 0.5 * (1 - np.cos(np.pi * tau / opening)),
+                    np.where((tau >= opening) & (tau <= opening + closing),
+                             np.cos(0.5 * np.pi * (tau - opening) / closing), 0.0))
+    signal = np.diff(flow, prepend=0.0)  # Lip radiation
+
+    for frequency, bandwidth in formants:
+        radius = np.exp(-np.pi * bandwidth / sample_rate)
+        theta = 2 * np.pi * frequency / sample_rate
+        signal = lfilter([1.0], [1.0, -2 * radius * np.cos(theta), radius ** 2], signal)
+
+    return 0.5 * signal / np.max(np.abs(signal)) + 0.001 * rng.standard_normal(len(signal))
+
+
+def synthesize_voiced_sound(duration, sample_rate, seed=0, **voice):
+    """
+    Synthetic vowel as a Parselmouth Sound (see synthesize_voiced_signal)
+
+    Returns:
+        parselmouth.Sound: Synthetic voiced sound
+    """
+    return parselmouth.Sound(synthesize_voiced_signal(duration, sample_rate, seed=seed, **voice),
+                             sampling_frequency=sample_rate)
+
+
+def write_fixtures(directory, durations=FULL_DURATIONS, sample_rates=FULL_SAMPLE_RATES, seed=0):
+    """
+    Write one 16-bit PCM WAV per voice, duration and sample rate
+
+    Args:
+        directory: Output directory
+        durations: Signal durations in seconds
+        sample_rates: Sampling frequencies in Hz
+        seed: Base seed (each fixture gets its own derived seed)
+
+    Returns:
+        list: Fixture dicts with 'id', 'path', 'voice', 'duration', 'sample_rate' and 'params'
+    """
+    fixtures = []
+    for sample_rate in sample_rates:
+        for duration in durations:
+            for voice_index, (voice, params) in enumerate(FIXTURE_VOICES.items()):
+                fixture_id = f"{voice}_{duration}s_{sample_rate // 1000}k"
+                path = os.path.join(directory, fixture_id + '.wav')
+                signal = synthesize_voiced_signal(duration, sample_rate, seed=seed + voice_index, **params)
+                sf.write(path, signal, sample_rate, subtype='PCM_16')
+                fixtures.append({'id': fixture_id, 'path': path, 'voice': voice, 'duration': duration,
+                                 'sample_rate': sample_rate, 'params': params})
+    return fixtures
+
+
+def benchmark_end_to_end(fixtures, families=None, stream_window_seconds=None):
+    """
+    Time FrequencyFeatureExtractor on every fixture, end to end and per stage
+
+    Runs in this process (one worker) so CPU time and peak memory are
+    attributable; a warm-up file is extracted first so one-off import and
+    initialisation costs are not counted.
+
+    Args:
+        fixtures: Fixture dicts from write_fixtures()
+        families: Feature families to extract (None for the defaults)
+        stream_window_seconds: Benchmark the streaming path with this window
+
+    Returns:
+        dict: 'files' (per-fixture timings and features), 'stages' (profiler
+              summary) and 'throughput' totals
+    """
+    extractor = FrequencyFeatureExtractor(max_workers=1, families=families, profile=True,
+                                          stream_window_seconds=stream_window_seconds)
+    extractor.extract_features_single_file(fixtures[0]['path'], 'warmup')
+    extractor.profiler.drain()
+
+    files = []
+    for fixture in fixtures:
+        features = extractor.extract_chunk([(fixture['path'], fixture['id'])])[0]
+        total = [record for record in extractor.profiler.records
+                 if record['file_id'] == fixture['id'] and record['stage'] == 'total'][0]
+        files.append({'id': fixture['id'], 'duration': fixture['duration'], 'sample_rate': fixture['sample_rate'],
+                      'wall_s': total['wall_s'], 'cpu_s': total['cpu_s'], 'peak_rss_mb': total['peak_rss_mb'],
+                      'features': {key: value for key, value in features.items() if key != 'id'}})
+        print(f"  {fixture['id']:<18} wall {total['wall_s']:7.3f}s | cpu {total['cpu_s']:7.3f}s | "
+              f"{fixture['duration'] / total['cpu_s']:7.1f} audio-s/cpu-s | peak RSS {total['peak_rss_mb']:6.0f} MB")
+
+    audio_seconds = sum(result['duration'] for result in files)
+    cpu_seconds = sum(result['cpu_s'] for result in files)
+    wall_seconds = sum(result['wall_s'] for result in files)
+    throughput = {'audio_s': audio_seconds, 'cpu_s': cpu_seconds, 'wall_s': wall_seconds,
+                  'audio_s_per_cpu_s': audio_seconds / cpu_seconds if cpu_seconds > 0 else np.nan,
+                  'audio_s_per_wall_s': audio_seconds / wall_seconds if wall_seconds > 0 else np.nan,
+                  'peak_rss_mb': max(result['peak_rss_mb'] for result in files)}
+    print(f"  Total: {audio_seconds:.0f}s audio in {cpu_seconds:.2f} CPU-s "
+          f"({throughput['audio_s_per_cpu_s']:.1f} audio-s/CPU-s), peak RSS {throughput['peak_rss_mb']:.0f} MB")
+
+    stages = extractor.profiler.summary()
+    print("  Per stage (total CPU-s | median wall-s per file):")
+    for stage, stats in sorted(stages.items(), key=lambda item: -item[1]['cpu_s_total']):
+        print(f"    {stage:<28} {stats['cpu_s_total']:8.3f} | {stats['wall_s_p50']:.4f}")
+
+    return {'files': files, 'stages': stages, 'throughput': throughput}
+
+
+def benchmark_decode(fixtures, repeat=3):
+    """
+    Compare whole-file decoding with librosa.load against audio_io.load_audio
+
+    Args:
+        fixtures: Fixture dicts from write_fixtures()
+        repeat: Decodes per file (the fastest is kept)
+
+    Returns:
+        dict: Total seconds per decoder and the maximum sample difference
+    """
+    try:
+        import librosa
+    except ImportError:
+        librosa = None
+
+    results = {'audio_io_s': 0.0}
+    max_difference = 0.0
+    for fixture in fixtures:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            audio, _ = load_audio(fixture['path'])
+            timings.append(time.perf_counter() - start)
+        results['audio_io_s'] += min(timings)
+
+        if librosa is not None:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                reference, _ = librosa.load(fixture['path'], sr=None, mono=True)
+                timings.append(time.perf_counter() - start)
+            results['librosa_s'] = results.get('librosa_s', 0.0) + min(timings)
+            max_difference = max(max_difference, float(np.max(np.abs(audio - reference))))
+
+    if librosa is not None:
+        results['max_abs_difference'] = max_difference
+        print(f"  librosa.load: {results['librosa_s']:.3f}s | audio_io: {results['audio_io_s']:.3f}s | "
+              f"speedup: {results['librosa_s'] / results['audio_io_s']:.1f}x | max diff: {max_difference:.1e}")
+    else:
+        print(f"  audio_io: {results['audio_io_s']:.3f}s (librosa not installed)")
+    return results
+
+
+def check_fixture_values(fixtures, files):
+    """
+    Check extracted features against the synthesis parameters
+
+    Mean F0 should match the synthesised F0, local jitter should follow the
+    injected period perturbation, and the tremor voice should show more F0
+    modulation than the steady voice of the same length and sample rate.
+
+    Args:
+        fixtures: Fixture dicts from write_fixtures()
+        files: Per-fixture results from benchmark_end_to_end()
+
+    Returns:
+        list: Failure messages (empty when everything is within tolerance)
+    """
+    failures = []
+    by_id = {result['id']: result['features'] for result in files}
+
+    for fixture in fixtures:
+        features = by_id[fixture['id']]
+        params = fixture['params']
+        if 'pitch_mean' in features and abs(features['pitch_mean'] / params['f0'] - 1) > 0.02:
+            failures.append(f"{fixture['id']}: pitch_mean {features['pitch_mean']:.1f} Hz, expected {params['f0']:.1f} Hz")
+        if 'jitter_local_mean' in features and params.get('jitter'):
+            expected = 2 / np.sqrt(np.pi) * params['jitter']
+            if abs(features['jitter_local_mean'] / expected - 1) > 0.25:
+                failures.append(f"{fixture['id']}: jitter_local_mean {features['jitter_local_mean']:.4f}, "
+                                f"expected about {expected:.4f}")
+        if fixture['voice'] == 'tremor' and 'vocal_tremor' in features:
+            steady_id = fixture['id'].replace('tremor', 'steady', 1)
+            if steady_id in by_id and not features['vocal_tremor'] > by_id[steady_id]['vocal_tremor']:
+                failures.append(f"{fixture['id']}: vocal_tremor not above the steady voice")
+
+    return failures
+
+
+def compare_with_reference(files, reference, rtol=1e-6):
+    """
+    Compare extracted features with a saved reference run
+
+    Args:
+        files: Per-fixture results from benchmark_end_to_end()
+        reference: {fixture id: {feature: value}} from a previous run
+        rtol: Relative tolerance
+
+    Returns:
+        list: Difference messages (empty when all values match)
+    """
+    differences = []
+    for result in files:
+        expected = reference.get(result['id'])
+        if expected is None:
+            continue
+        for feature_name, value in result['features'].items():
+            if feature_name not in expected:
+                continue
+            reference_value = expected[feature_name]
+            reference_value = np.nan if reference_value is None else reference_value
+            if not np.isclose(value, reference_value, rtol=rtol, atol=0, equal_nan=True):
+                differences.append(f"{result['id']}: {feature_name} {value!r} != reference {reference_value!r}")
+    return differences
+
+
+def pointwise_formant_tracks(formant, time_points, max_formant_number=3):
+    """
+    Reference implementation: one Praat call per time point, formant and measure
+
+    Args:
+        formant: Parselmouth Formant object
+        time_points: Array of times (in seconds) to sample
+        max_formant_number: Number of formants to return (F1..Fn)
+
+    Returns:
+        tuple: (frequencies, bandwidths) arrays of shape (max_formant_number, len(time_points))
+    """
+    frequencies = np.full((max_formant_number, len(time_points)), np.nan)
+    bandwidths = np.full((max_formant_number, len(time_points)), np.nan)
+    for formant_index in range(max_formant_number):
+        for i, t in enumerate(time_points):
+            frequencies[formant_index, i] = call(formant, "Get value at time", formant_index + 1, t, "hertz", "Linear")
+            bandwidths[formant_index, i] = call(formant, "Get bandwidth at time", formant_index + 1, t, "hertz", "Linear")
+    return frequencies, bandwidths
+
+
+def benchmark_formant_tracks(durations=(10, 60, 300), sample_rate=16000):
+    """
+    Compare per-timestep formant sampling against the bulk track path
+
+    Args:
+        durations: Signal durations in seconds
+        sample_rate: Sampling frequency in Hz
+
+    Returns:
+        list: One dict per duration with timings and the maximum deviation
+    """
+    extractor = FrequencyFeatureExtractor()
+    results = []
+
+    for duration in durations:
+        sound = synthesize_voiced_sound(duration, sample_rate)
+        formant = sound.to_formant_burg(time_step=0.01, max_number_of_formants=5,
+                                        maximum_formant=5500, window_length=0.025,
+                                        pre_emphasis_from=50)
+        time_points = np.arange(0.01, sound.get_total_duration(), 0.01)
+
+        start = time.perf_counter()
+        reference = pointwise_formant_tracks(formant, time_points)
+        pointwise_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bulk = extractor.get_formant_tracks(formant, time_points)
+        bulk_time = time.perf_counter() - start
+
+        max_difference = max(np.nanmax(np.abs(r - b)) for r, b in zip(reference, bulk))
+        results.append({
+            'duration_s': duration,
+            'pointwise_s': pointwise_time,
+            'bulk_s': bulk_time,
+            'speedup': pointwise_time / bulk_time if bulk_time > 0 else np.nan,
+            'max_abs_difference_hz': max_difference,
+        })
+        print(f"  {duration:>5}s audio | per-timestep: {pointwise_time:7.3f}s | bulk: {bulk_time:6.3f}s | "
+              f"speedup: {results[-1]['speedup']:6.1f}x | max diff: {max_difference:.2e} Hz")
+
+    return results
+
+
+def benchmark_pitch_trend(n_contours=100, mean_length=60000, seed=0):
+    """
+    Compare pitch trend fitting: scikit-learn per contour, closed form, batched
+
+    Args:
+        n_contours: Number of voiced F0 contours (one per file)
+        mean_length: Average number of voiced frames per contour
+        seed: Seed for the synthetic contours
+
+    Returns:
+        dict: Timings in seconds and the maximum relative deviation from scikit-learn
+    """
+    rng = np.random.default_rng(seed)
+    contours = [120 + 15 * rng.standard_normal(n) + 0.0001 * np.arange(n)
+                for n in rng.integers(mean_length // 2, mean_length * 3 // 2, n_contours)]
+    results = {}
+
+    try:
+        from sklearn.linear_model import LinearRegression
+        from sklearn.metrics import mean_squared_error
+
+        start = time.perf_counter()
+        reference = []
+        for contour in contours:
+            time_points = np.arange(len(contour)).reshape(-1, 1)
+            reg = LinearRegression().fit(time_points, contour)
+            reference.append((reg.coef_[0], reg.intercept_, mean_squared_error(contour, reg.predict(time_points))))
+        results['sklearn_s'] = time.perf_counter() - start
+        reference = np.array(reference)
+    except ImportError:
+        reference = None
+
+    start = time.perf_counter()
+    closed_form = np.array([linear_trend(contour) for contour in contours])
+    results['closed_form_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = np.column_stack(batch_linear_trend(contours))
+    results['batched_s'] = time.perf_counter() - start
+
+    if reference is not None:
+        results['max_relative_difference'] = float(max(np.max(np.abs(closed_form - reference) / np.abs(reference)),
+                                                        np.max(np.abs(batched - reference) / np.abs(reference))))
+        print(f"  scikit-learn: {results['sklearn_s']:.3f}s")
+    print(f"  closed form: {results['closed_form_s']:.3f}s | batched: {results['batched_s']:.3f}s "
+          f"({n_contours} contours)")
+    if 'max_relative_difference' in results:
+        print(f"  max relative difference vs scikit-learn: {results['max_relative_difference']:.2e}")
+    return results
+
+
+def environment_info():
+    """Interpreter, library and machine details recorded with each report"""
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'parselmouth': parselmouth.__version__, 'praat': parselmouth.PRAAT_VERSION,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpu_count': os.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the frequency feature extractor on synthetic speech")
+    parser.add_argument('--quick', action='store_true', help="short fixtures at 16 kHz only")
+    parser.add_argument('--families', nargs='+', default=None,
+                        help=f"feature families to extract (default: {' '.join(DEFAULT_FEATURE_FAMILIES)})")
+    parser.add_argument('--stream-window', type=float, default=None,
+                        help="benchmark the streaming path with this window length in seconds")
+    parser.add_argument('--output', help="write the full report as JSON")
+    parser.add_argument('--save-reference', help="write the extracted feature values as a reference JSON")
+    parser.add_argument('--reference', help="compare extracted feature values with this reference JSON")
+    parser.add_argument('--rtol', type=float, default=1e-6, help="relative tolerance for --reference")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    durations = QUICK_DURATIONS if args.quick else FULL_DURATIONS
+    sample_rates = QUICK_SAMPLE_RATES if args.quick else FULL_SAMPLE_RATES
+    report = {'environment': environment_info(), 'config': vars(args)}
+
+    print("Frequency Feature Benchmarks")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        fixtures = write_fixtures(fixture_dir, durations, sample_rates, seed=args.seed)
+        print(f"\nEnd-to-end extraction ({len(fixtures)} synthetic files)")
+        end_to_end = benchmark_end_to_end(fixtures, families=args.families,
+                                          stream_window_seconds=args.stream_window)
+        print(f"\nWhole-file decoding ({len(fixtures)} WAV files)")
+        report['decode'] = benchmark_decode(fixtures)
+    report['end_to_end'] = end_to_end
+
+    failures = check_fixture_values(fixtures, end_to_end['files'])
+    report['value_check_failures'] = failures
+    print("\nValue checks against synthesis parameters: " + ("OK" if not failures else f"{len(failures)} failed"))
+    for failure in failures:
+        print(f"  {failure}")
+
+    features_by_id = {result['id']: result['features'] for result in end_to_end['files']}
+    if args.reference:
+        with open(args.reference) as f:
+            differences = compare_with_reference(end_to_end['files'], json.load(f), rtol=args.rtol)
+        report['reference_differences'] = differences
+        print(f"Comparison with {args.reference}: " + ("identical" if not differences else f"{len(differences)} differences"))
+        for difference in differences[:20]:
+            print(f"  {difference}")
+    if args.save_reference:
+        with open(args.save_reference, 'w') as f:
+            json.dump(features_by_id, f, indent=2, default=float)
+        print(f"Reference values saved to {args.save_reference}")
+
+    print("\nFormant track sampling (F1-F3, 10ms step)")
+    report['formant_tracks'] = benchmark_formant_tracks(durations=durations)
+    print("\nPitch linear trend (slope, offset, MSE): whole-file contours")
+    report['pitch_trend_long'] = benchmark_pitch_trend(n_contours=100, mean_length=60000)
+    print("\nPitch linear trend (slope, offset, MSE): short segment contours")
+    report['pitch_trend_short'] = benchmark_pitch_trend(n_contours=5000, mean_length=300)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+        print(f"\nReport saved to {args.output}")
+
+    return 1 if failures or report.get('reference_differences') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Energy-based acoustic feature extraction
+
+Frame-level energy measures (RMS energy, short-time energy, energy
+distribution, dynamic range and loudness) computed in one vectorized pass over
+strided frames of the decoded signal. The extractor works on an audio buffer
+that has already been decoded, so it can share the buffer with
+FrequencyFeatureExtractor instead of loading the file a second time.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from running_stats import MomentAccumulator, QuantileSketch
+
+# All energy features produced per participant
+ENERGY_FEATURE_NAMES = [
+    'rms_energy_mean', 'rms_energy_std', 'rms_energy_max',
+    'short_time_energy_mean', 'short_time_energy_std',
+    'energy_db_mean', 'energy_db_std', 'energy_db_skewness', 'energy_db_kurtosis',
+    'energy_db_percentile_5', 'energy_db_percentile_50', 'energy_db_percentile_95',
+    'energy_entropy', 'dynamic_range_db',
+    'loudness_mean', 'loudness_sd', 'rate_loudness_peaks'
+]
+
+# Framing shared by all energy measures (10ms hop, like the pitch and formant analyses)
+ENERGY_PARAMETERS = {'frame_length': 0.025, 'hop_length': 0.01,
+                     'db_floor': 1e-10, 'loudness_exponent': 0.3}
+
+
+class EnergyAccumulator:
+    """
+    Mergeable summary of frame energies
+
+    Holds everything the energy features need (moments, a power sketch for the
+    dB percentiles, entropy sums and the loudness peak count) so energies from
+    windows or chunks can be combined without keeping the frames.
+    """
+
+    def __init__(self, quantile_accuracy=0.001):
+        self.rms = MomentAccumulator()
+        self.short_time_energy = MomentAccumulator()
+        self.energy_db = MomentAccumulator()
+        self.loudness = MomentAccumulator()
+        self.power = QuantileSketch(quantile_accuracy)
+        self.energy_sum = 0.0
+        self.energy_log_energy_sum = 0.0
+        self.loudness_peaks = 0
+        self.duration = 0.0
+
+    def merge(self, other):
+        """Combine with another accumulator in place"""
+        self.rms.merge(other.rms)
+        self.short_time_energy.merge(other.short_time_energy)
+        self.energy_db.merge(other.energy_db)
+        self.loudness.merge(other.loudness)
+        self.power.merge(other.power)
+        self.energy_sum += other.energy_sum
+        self.energy_log_energy_sum += other.energy_log_energy_sum
+        self.loudness_peaks += other.loudness_peaks
+        self.duration += other.duration
+        return self
+
+
+class EnergyFeatureExtractor:
+    def __init__(self, frame_length=ENERGY_PARAMETERS['frame_length'], hop_length=ENERGY_PARAMETERS['hop_length']):
+        """
+        Initialize the energy feature extractor
+
+        Args:
+            frame_length: Analysis frame length in seconds
+            hop_length: Hop between frame starts in seconds
+        """
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+
+    def frame_sizes(self, sr):
+        """Frame and hop length in samples"""
+        return max(1, int(round(self.frame_length * sr))), max(1, int(round(self.hop_length * sr)))
+
+    def frame_energies(self, audio, sr):
+        """
+        Short-time energy (sum of squares) of every full frame
+
+        Frames are a strided view of the signal (no copy) and reduced with a
+        single einsum, so there is no per-frame Python loop.
+
+        Args:
+            audio: 1-D audio buffer
+            sr: Sample rate in Hz
+
+        Returns:
+            ndarray: Short-time energy per frame
+        """
+        frame_samples, hop_samples = self.frame_sizes(sr)
+        if len(audio) < frame_samples:
+            return np.empty(0)
+        frames = sliding_window_view(audio, frame_samples)[::hop_samples]
+        return np.einsum('ij,ij->i', frames, frames).astype(np.float64)
+
+    def loudness_peak_mask(self, loudness):
+        """
+        Local maxima of the 3-frame moving average of the loudness contour
+
+        Args:
+            loudness: Loudness per frame
+
+        Returns:
+            ndarray: Boolean mask marking frames where the smoothed contour peaks
+                     (the first and last two frames are never marked)
+        """
+        mask = np.zeros(len(loudness), dtype=bool)
+        if len(loudness) < 5:
+            return mask
+        smoothed = np.convolve(loudness, np.ones(3) / 3.0, mode='same')
+        mask[2:-2] = (smoothed[2:-2] > smoothed[1:-3]) & (smoothed[2:-2] >= smoothed[3:-1])
+        return mask
+
+    def update_accumulator(self, accumulator, short_time_energy, sr, peak_mask=None):
+        """
+        Add frame energies to an EnergyAccumulator
+
+        Args:
+            accumulator: EnergyAccumulator to update
+            short_time_energy: Short-time energy per frame
+            sr: Sample rate in Hz
+            peak_mask: Optional loudness peak mask for these frames (computed
+                       from the frames themselves when omitted)
+        """
+        frame_samples, hop_samples = self.frame_sizes(sr)
+        power = short_time_energy / frame_samples
+        loudness = power ** ENERGY_PARAMETERS['loudness_exponent']
+        if peak_mask is None:
+            peak_mask = self.loudness_peak_mask(loudness)
+
+        accumulator.rms.update(np.sqrt(power))
+        accumulator.short_time_energy.update(short_time_energy)
+        accumulator.energy_db.update(10 * np.log10(power + ENERGY_PARAMETERS['db_floor']))
+        accumulator.loudness.update(loudness)
+        accumulator.power.update(power + ENERGY_PARAMETERS['db_floor'])
+        positive = short_time_energy[short_time_energy > 0]
+        accumulator.energy_sum += float(np.sum(positive))
+        accumulator.energy_log_energy_sum += float(np.sum(positive * np.log(positive)))
+        accumulator.loudness_peaks += int(np.count_nonzero(peak_mask))
+        accumulator.duration += len(short_time_energy) * hop_samples / sr
+
+    def update_accumulator_window(self, accumulator, samples, sr, start_sample, keep_start_sample, keep_stop_sample):
+        """
+        Add the frames of one streaming window to an EnergyAccumulator
+
+        Frames stay on the whole file's hop grid and only frames starting in
+        [keep_start_sample, keep_stop_sample) are counted; the window's margins
+        provide the neighbours needed for loudness peak picking.
+
+        Args:
+            accumulator: EnergyAccumulator to update
+            samples: Window samples (including margins)
+            sr: Sample rate in Hz
+            start_sample: File position of samples[0]
+            keep_start_sample: First file sample owned by this window
+            keep_stop_sample: End (exclusive) of the samples owned by this window
+
+        Returns:
+            tuple: (frame_starts, short_time_energy) of the frames that were counted
+        """
+        _, hop_samples = self.frame_sizes(sr)
+        skip = (-start_sample) % hop_samples
+        short_time_energy = self.frame_energies(samples[skip:], sr)
+        frame_starts = start_sample + skip + hop_samples * np.arange(len(short_time_energy))
+        keep = (frame_starts >= keep_start_sample) & (frame_starts < keep_stop_sample)
+
+        frame_samples, _ = self.frame_sizes(sr)
+        loudness = (short_time_energy / frame_samples) ** ENERGY_PARAMETERS['loudness_exponent']
+        peak_mask = self.loudness_peak_mask(loudness)
+        self.update_accumulator(accumulator, short_time_energy[keep], sr, peak_mask[keep])
+        return frame_starts[keep], short_time_energy[keep]
+
+    def energy_features_from_summary(self, accumulator, power_percentile):
+        """
+        Compute energy features from an EnergyAccumulator
+
+        Args:
+            accumulator: EnergyAccumulator over all frames of a file
+            power_percentile: Function mapping a percentile (0-100) to a frame power
+
+        Returns:
+            dict: Dictionary containing energy features
+        """
+        features = {}
+
+        if accumulator.rms.count == 0:
+            for feature_name in ENERGY_FEATURE_NAMES:
+                features[feature_name] = np.nan
+            return features
+
+        # RMS and short-time energy
+        features['rms_energy_mean'] = accumulator.rms.mean
+        features['rms_energy_std'] = accumulator.rms.std
+        features['rms_energy_max'] = accumulator.rms.maximum
+        features['short_time_energy_mean'] = accumulator.short_time_energy.mean
+        features['short_time_energy_std'] = accumulator.short_time_energy.std
+
+        # Energy distribution (dB re full scale)
+        features['energy_db_mean'] = accumulator.energy_db.mean
+        features['energy_db_std'] = accumulator.energy_db.std
+        features['energy_db_skewness'] = accumulator.energy_db.skewness
+        features['energy_db_kurtosis'] = accumulator.energy_db.kurtosis
+        for q in [5, 50, 95]:
+            features[f'energy_db_percentile_{q}'] = 10 * np.log10(power_percentile(q))
+
+        # Normalised entropy of how energy is spread over frames
+        n_frames = accumulator.rms.count
+        if accumulator.energy_sum > 0 and n_frames > 1:
+            total = accumulator.energy_sum
+            entropy = np.log(total) - accumulator.energy_log_energy_sum / total
+            features['energy_entropy'] = entropy / np.log(n_frames)
+        else:
+            features['energy_entropy'] = np.nan
+
+        # Dynamic range between loud and quiet frames
+        features['dynamic_range_db'] = features['energy_db_percentile_95'] - features['energy_db_percentile_5']
+
+        # Loudness (Stevens' power law on frame power)
+        features['loudness_mean'] = accumulator.loudness.mean
+        features['loudness_sd'] = accumulator.loudness.std
+        features['rate_loudness_peaks'] = (accumulator.loudness_peaks / accumulator.duration
+                                           if accumulator.duration > 0 else np.nan)
+
+        return features
+
+    def energy_features_from_frames(self, short_time_energy, sr):
+        """
+        Compute energy features from the short-time energy of every frame
+
+        Args:
+            short_time_energy: Short-time energy per frame (see frame_energies());
+                               NaN frames (outside the analysed regions) are skipped
+            sr: Sample rate in Hz
+
+        Returns:
+            dict: Dictionary containing energy features
+        """
+        short_time_energy = np.asarray(short_time_energy, dtype=np.float64)
+        short_time_energy = short_time_energy[~np.isnan(short_time_energy)]
+        accumulator = EnergyAccumulator()
+        self.update_accumulator(accumulator, short_time_energy, sr)
+        frame_samples, _ = self.frame_sizes(sr)
+        power = short_time_energy / frame_samples + ENERGY_PARAMETERS['db_floor']
+        return self.energy_features_from_summary(accumulator, lambda q: np.percentile(power, q))
+
+    def extract_energy_features(self, audio, sr):
+        """
+        Extract all energy features from a decoded audio buffer
+
+        Args:
+            audio: 1-D audio buffer (e.g. the one loaded for frequency features)
+            sr: Sample rate in Hz
+
+        Returns:
+            dict: Dictionary containing energy features
+        """
+        try:
+            return self.energy_features_from_frames(self.frame_energies(audio, sr), sr)
+        except Exception as e:
+            print(f"Error in energy extraction: {str(e)}")
+            return {feature_name: np.nan for feature_name in ENERGY_FEATURE_NAMES}
@@ -0,0 +1,157 @@
+"""
+Columnar (Parquet) output for extracted features
+
+Feature rows are written with an explicit schema built from the extractor's
+feature names: a participant ID column, optional string label columns (e.g.
+the extraction mode of each row) and one compact float32 column per feature.
+Rows are buffered and appended as Parquet row groups while the extraction
+runs, so nothing has to be collected in memory first, and readers can load
+only the columns (and participants) they need. Requires pyarrow; CSV stays
+available as an export of the Parquet data.
+"""
+import json
+import os
+
+import numpy as np
+
+
+def feature_schema(feature_names, id_type='int64', value_type='float32', metadata=None, label_columns=()):
+    """
+    Arrow schema for a feature table
+
+    Args:
+        feature_names: Feature columns in output order
+        id_type: Arrow type name of the participant ID column ('int64' or 'string')
+        value_type: Arrow type name of the feature columns
+        metadata: Optional JSON-serialisable dict stored in the file's key/value metadata
+        label_columns: Optional string columns placed after the ID
+
+    Returns:
+        pyarrow.Schema: Schema with 'id', the label columns and the feature columns
+    """
+    import pyarrow as pa
+
+    fields = [pa.field('id', pa.type_for_alias(id_type), nullable=False)]
+    fields += [pa.field(name, pa.string()) for name in label_columns]
+    fields += [pa.field(name, pa.type_for_alias(value_type)) for name in feature_names]
+    schema = pa.schema(fields)
+    if metadata:
+        schema = schema.with_metadata({key: json.dumps(value, default=str) for key, value in metadata.items()})
+    return schema
+
+
+class ParquetFeatureWriter:
+    def __init__(self, path, feature_names, id_type='int64', value_type='float32',
+                 row_group_size=1000, metadata=None, label_columns=()):
+        """
+        Open a Parquet file for incremental feature output
+
+        The file is written under a temporary name and moved into place by
+        close(), so readers never see a half-written file.
+
+        Args:
+            path: Output .parquet path
+            feature_names: Feature columns in output order
+            id_type: Arrow type name of the participant ID column
+            value_type: Arrow type name of the feature columns ('float32' or 'float64')
+            row_group_size: Rows buffered before a row group is appended
+            metadata: Optional dict stored in the file metadata (e.g. extraction parameters)
+            label_columns: Optional string columns (missing labels are written as null)
+        """
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.feature_names = list(feature_names)
+        self.label_columns = list(label_columns)
+        self.row_group_size = row_group_size
+        self.schema = feature_schema(self.feature_names, id_type, value_type, metadata, self.label_columns)
+        self.value_dtype = np.dtype(value_type)
+        self.partial_path = path + '.partial'
+        self.writer = pq.ParquetWriter(self.partial_path, self.schema)
+        self.buffer = []
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def write(self, features):
+        """
+        Add one feature row (dict with 'id'; missing features are written as NaN)
+
+        Args:
+            features: Feature dictionary
+        """
+        self.buffer.append(features)
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    def write_many(self, rows):
+        """Add several feature rows"""
+        for features in rows:
+            self.write(features)
+
+    def flush(self):
+        """Append the buffered rows as one row group"""
+        import pyarrow as pa
+
+        if not self.buffer:
+            return
+        arrays = [pa.array([features['id'] for features in self.buffer], type=self.schema.field('id').type)]
+        for name in self.label_columns:
+            arrays.append(pa.array([features.get(name) for features in self.buffer], type=pa.string()))
+        for name in self.feature_names:
+            values = np.array([features.get(name, np.nan) for features in self.buffer], dtype=np.float64)
+            arrays.append(pa.array(values.astype(self.value_dtype)))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema), row_group_size=len(self.buffer))
+        self.rows_written += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        """Flush remaining rows, finalise the file and move it into place"""
+        if self.writer is None:
+            return
+        self.flush()
+        self.writer.close()
+        self.writer = None
+        os.replace(self.partial_path, self.path)
+
+
+def read_features(path, columns=None, participant_ids=None):
+    """
+    Load a feature table written by ParquetFeatureWriter
+
+    Args:
+        path: Parquet file path
+        columns: Optional feature columns to load ('id' is always included)
+        participant_ids: Optional iterable of IDs to load
+
+    Returns:
+        pandas.DataFrame: Feature table sorted by participant ID
+    """
+    import pyarrow.parquet as pq
+
+    if columns is not None:
+        columns = ['id'] + [column for column in columns if column != 'id']
+    filters = [('id', 'in', list(participant_ids))] if participant_ids is not None else None
+    table = pq.read_table(path, columns=columns, filters=filters)
+    return table.to_pandas().sort_values('id').reset_index(drop=True)
+
+
+def read_metadata(path):
+    """
+    Key/value metadata stored with a feature table
+
+    Args:
+        path: Parquet file path
+
+    Returns:
+        dict: Decoded metadata (e.g. 'extraction_parameters')
+    """
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    return {key.decode(): json.loads(value) for key, value in metadata.items() if not key.startswith(b'pandas')}
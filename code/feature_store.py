@@ -0,0 +1,236 @@
+"""
+Persistent feature store for resumable, incremental extraction
+
+Rows are keyed by participant id and remember the content hash of the audio
+file and a hash of the extraction parameters. A rerun only extracts files
+that are new or whose audio or parameters changed, and each row is committed
+as soon as it finishes, so an interrupted run resumes where it stopped.
+Each row also records the file's size and modification time: a file whose
+stat still matches is taken as unchanged without reading it, and only files
+whose modification time moved at the same size are hashed again.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+
+def parameters_hash(parameters):
+    """
+    Stable hash of the extraction parameters
+
+    Args:
+        parameters: JSON-serialisable dictionary of extraction parameters
+
+    Returns:
+        str: Hex digest
+    """
+    encoded = json.dumps(parameters, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class FeatureStore:
+    def __init__(self, path):
+        """
+        Open (or create) a feature store
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS features ("
+            " participant_id TEXT PRIMARY KEY,"
+            " file_path TEXT,"
+            " audio_hash TEXT,"
+            " params_hash TEXT,"
+            " features_json TEXT,"
+            " created_at REAL,"
+            " size INTEGER,"
+            " mtime_ns INTEGER)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS audio_hashes ("
+            " file_path TEXT PRIMARY KEY,"
+            " size INTEGER,"
+            " mtime_ns INTEGER,"
+            " audio_hash TEXT)"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(features)")]
+        if 'size' not in columns:
+            # Store from before rows kept their stat: the first rerun compares content hashes
+            self.connection.execute("ALTER TABLE features ADD COLUMN size INTEGER")
+            self.connection.execute("ALTER TABLE features ADD COLUMN mtime_ns INTEGER")
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """Close the underlying database connection"""
+        self.connection.close()
+
+    def file_hash(self, file_path, block_size=1 << 20):
+        """
+        Content hash of an audio file, cached by path, size and modification time
+
+        Args:
+            file_path: Path to audio file
+            block_size: Read size in bytes
+
+        Returns:
+            str: Hex digest of the file content
+        """
+        stat = os.stat(file_path)
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, audio_hash FROM audio_hashes WHERE file_path = ?", (file_path,)
+        ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        audio_hash = digest.hexdigest()
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO audio_hashes VALUES (?, ?, ?, ?)",
+            (file_path, stat.st_size, stat.st_mtime_ns, audio_hash)
+        )
+        self.connection.commit()
+        return audio_hash
+
+    def row_is_current(self, participant_id, row, file_path, params_hash):
+        """
+        Compare a stored feature row with the file on disk
+
+        The file is only hashed when its size still matches but its
+        modification time moved; a match then refreshes the stored stat.
+
+        Args:
+            participant_id: ID of the participant the row belongs to
+            row: Stored (audio_hash, params_hash, size, mtime_ns)
+            file_path: Path to audio file
+            params_hash: parameters_hash() of the current extraction parameters
+
+        Returns:
+            bool: True if the row matches the audio content and parameters
+        """
+        audio_hash, stored_params_hash, size, mtime_ns = row
+        if stored_params_hash != params_hash:
+            return False
+        try:
+            stat = os.stat(file_path)
+            if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+                return True
+            if size is not None and stat.st_size != size:
+                return False
+            if self.file_hash(file_path) != audio_hash:
+                return False
+        except OSError:
+            return False
+        self.connection.execute(
+            "UPDATE features SET size = ?, mtime_ns = ? WHERE participant_id = ?",
+            (stat.st_size, stat.st_mtime_ns, str(participant_id))
+        )
+        self.connection.commit()
+        return True
+
+    def is_done(self, file_path, participant_id, parameters):
+        """
+        Check whether a file already has an up-to-date row in the store
+
+        Args:
+            file_path: Path to audio file
+            participant_id: ID of the participant
+            parameters: Extraction parameters dictionary
+
+        Returns:
+            bool: True if the stored row matches the audio content and parameters
+        """
+        row = self.connection.execute(
+            "SELECT audio_hash, params_hash, size, mtime_ns FROM features WHERE participant_id = ?",
+            (str(participant_id),)
+        ).fetchone()
+        return row is not None and self.row_is_current(participant_id, row, file_path, parameters_hash(parameters))
+
+    def pending(self, files, parameters):
+        """
+        Select the files that still need extraction
+
+        Args:
+            files: List of (file_path, participant_id) tuples
+            parameters: Extraction parameters dictionary
+
+        Returns:
+            list: (file_path, participant_id) tuples that are new or changed
+        """
+        params_hash = parameters_hash(parameters)
+        rows = {row[0]: row[1:] for row in self.connection.execute(
+            "SELECT participant_id, audio_hash, params_hash, size, mtime_ns FROM features")}
+        return [(file_path, participant_id) for file_path, participant_id in files
+                if str(participant_id) not in rows
+                or not self.row_is_current(participant_id, rows[str(participant_id)], file_path, params_hash)]
+
+    def put(self, features, file_path, parameters):
+        """
+        Checkpoint one completed feature row
+
+        Rows where every feature is NaN (e.g. the file could not be loaded)
+        are not stored, so they are retried on the next run; string labels
+        such as the extraction mode do not count as features.
+
+        Args:
+            features: Feature dictionary including 'id'
+            file_path: Path to the audio file the row was extracted from
+            parameters: Extraction parameters dictionary
+
+        Returns:
+            bool: True if the row was stored
+        """
+        values = {key: (value.item() if isinstance(value, np.generic) else value)
+                  for key, value in features.items()}
+        if all(value is None or (isinstance(value, float) and np.isnan(value))
+               for key, value in values.items() if key != 'id' and not isinstance(value, str)):
+            return False
+
+        try:
+            stat = os.stat(file_path)
+            audio_hash = self.file_hash(file_path)
+        except OSError:
+            return False
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO features"
+            " (participant_id, file_path, audio_hash, params_hash, features_json, created_at, size, mtime_ns)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(values['id']), file_path, audio_hash, parameters_hash(parameters),
+             json.dumps(values), time.time(), stat.st_size, stat.st_mtime_ns)
+        )
+        self.connection.commit()
+        return True
+
+    def load(self, participant_ids=None):
+        """
+        Load stored feature rows
+
+        Args:
+            participant_ids: Optional iterable of IDs to load (None for all rows)
+
+        Returns:
+            list: Feature dictionaries
+        """
+        rows = self.connection.execute("SELECT participant_id, features_json FROM features").fetchall()
+        if participant_ids is not None:
+            wanted = {str(participant_id) for participant_id in participant_ids}
+            rows = [row for row in rows if row[0] in wanted]
+        return [json.loads(row[1]) for row in rows]
@@ -0,0 +1,168 @@
+"""
+Frame-level track storage for time-resolved analyses
+
+Besides the summary features, the extractor can keep the low-level tracks
+they are computed from: the 10ms F0 track (0 Hz for unvoiced frames), the
+F1-F3 frequency and bandwidth tracks, the glottal pulse times (whose
+differences are the PointProcess periods) and the frame energies. Each
+participant gets a directory of plain .npy arrays plus a JSON file with the
+time axes and extraction parameters, so tracks are memory-mapped on load
+and summary features can be recomputed without decoding audio again.
+
+Values are stored as float32 (the precision of the Parquet output); pulse
+times stay float64 because periods are small differences of large times.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+# Stored arrays and their dtypes
+TRACK_DTYPES = {
+    'pitch': 'float32',              # F0 per pitch frame in Hz, 0 where unvoiced
+    'formant_frequency': 'float32',  # (3, n) F1-F3 on the formant grid, NaN where undefined
+    'formant_bandwidth': 'float32',  # (3, n) B1-B3 on the formant grid, NaN where undefined
+    'pulses': 'float64',             # Glottal pulse times in seconds
+    'frame_energy': 'float32',       # Short-time energy per energy frame
+}
+
+# Tracks produced by each intermediate analysis (FeatureFamily.requires)
+ANALYSIS_TRACKS = {
+    'pitch': ['pitch'],
+    'point_process': ['pulses'],
+    'formant': ['formant_frequency', 'formant_bandwidth'],
+    'samples': ['frame_energy'],
+}
+
+TRACK_FORMAT_VERSION = 1
+ATTRIBUTES_FILE = 'tracks.json'
+
+
+class FeatureTracks:
+    """
+    Stored tracks of one participant
+
+    Arrays are read-only memory maps when loaded with mmap=True; index the
+    object by track name (e.g. tracks['pitch']).
+    """
+
+    def __init__(self, arrays, attributes):
+        """
+        Args:
+            arrays: Dict of track name -> ndarray
+            attributes: Dict with 'id', 'sample_rate', 'duration', the time axes
+                        ('pitch_start', 'pitch_step', 'formant_start', 'formant_step')
+                        and the 'parameters' the tracks were extracted with
+        """
+        self.arrays = arrays
+        self.attributes = attributes
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    @property
+    def participant_id(self):
+        return self.attributes['id']
+
+    def voiced_pitch(self):
+        """F0 contour in Hz with unvoiced frames removed (float64)"""
+        pitch = self.arrays['pitch']
+        return pitch[pitch != 0].astype(np.float64)
+
+    def pitch_times(self):
+        """Time in seconds of every pitch frame"""
+        return self.attributes['pitch_start'] + self.attributes['pitch_step'] * np.arange(len(self.arrays['pitch']))
+
+    def formant_times(self):
+        """Time in seconds of every formant sample"""
+        n_samples = self.arrays['formant_frequency'].shape[1]
+        return self.attributes['formant_start'] + self.attributes['formant_step'] * np.arange(n_samples)
+
+    def periods(self):
+        """Intervals between consecutive glottal pulses in seconds"""
+        return np.diff(self.arrays['pulses'])
+
+
+class TrackStore:
+    def __init__(self, root):
+        """
+        Open (or create) a directory of per-participant tracks
+
+        Args:
+            root: Directory holding one subdirectory per participant
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, participant_id):
+        """Directory of a participant's tracks"""
+        return os.path.join(self.root, str(participant_id))
+
+    def __contains__(self, participant_id):
+        return os.path.exists(os.path.join(self.path(participant_id), ATTRIBUTES_FILE))
+
+    def save(self, participant_id, tracks, attributes):
+        """
+        Write a participant's tracks, replacing any stored ones
+
+        The arrays are written to a temporary directory that is moved into
+        place once complete, so an interrupted run never leaves partial tracks.
+
+        Args:
+            participant_id: ID of the participant
+            tracks: Dict of track name (see TRACK_DTYPES) -> array
+            attributes: JSON-serialisable dict of time axes and parameters
+        """
+        final_path = self.path(participant_id)
+        partial_path = final_path + '.partial'
+        shutil.rmtree(partial_path, ignore_errors=True)
+        os.makedirs(partial_path)
+
+        for name, values in tracks.items():
+            np.save(os.path.join(partial_path, f'{name}.npy'),
+                    np.ascontiguousarray(values, dtype=TRACK_DTYPES[name]))
+        attributes = dict(attributes, id=participant_id, format_version=TRACK_FORMAT_VERSION,
+                          tracks=sorted(tracks))
+        with open(os.path.join(partial_path, ATTRIBUTES_FILE), 'w') as f:
+            json.dump(attributes, f, default=str)
+
+        shutil.rmtree(final_path, ignore_errors=True)
+        os.replace(partial_path, final_path)
+
+    def load(self, participant_id, mmap=True):
+        """
+        Load a participant's tracks
+
+        Args:
+            participant_id: ID of the participant
+            mmap: Memory-map the arrays instead of reading them into memory
+
+        Returns:
+            FeatureTracks: Stored arrays and attributes
+
+        Raises:
+            KeyError: If no tracks are stored for the participant
+        """
+        path = self.path(participant_id)
+        if participant_id not in self:
+            raise KeyError(f"No tracks stored for participant {participant_id}")
+        with open(os.path.join(path, ATTRIBUTES_FILE)) as f:
+            attributes = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+                  for name in attributes['tracks']}
+        return FeatureTracks(arrays, attributes)
+
+    def participant_ids(self):
+        """IDs of all participants with stored tracks (as they were saved)"""
+        participant_ids = []
+        for entry in sorted(os.listdir(self.root)):
+            attributes_path = os.path.join(self.root, entry, ATTRIBUTES_FILE)
+            if entry.endswith('.partial') or not os.path.exists(attributes_path):
+                continue
+            with open(attributes_path) as f:
+                participant_ids.append(json.load(f)['id'])
+        return participant_ids
@@ -1,81 +1,375 @@
-import subprocess
-import sys
 import os
+import io
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 
-def install_package(package):
-    """Install a package using pip"""
-    try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-        print(f"Successfully installed {package}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error installing {package}: {e}")
+import numpy as np
+import psutil
+warnings.filterwarnings('ignore')
 
-# Install required packages
-print("Installing required packages...")
-packages = [
-    'pandas',
-    'numpy',
-    'librosa',
-    'praat-parselmouth',
-    'scipy',
-    'tqdm',
-    'psutil',
-    'scikit-learn'
+# Parselmouth, pandas and librosa are imported where they are first needed, so
+# importing this module (e.g. in every pool worker) stays cheap and never
+# installs anything; install the dependencies up front (requirements.txt)
+from audio_io import AudioReader, load_audio
+from audio_index import AudioManifest, DEFAULT_ID_PATTERNS
+from feature_store import FeatureStore
+from feature_output import ParquetFeatureWriter, read_features
+from feature_tracks import TrackStore, ANALYSIS_TRACKS
+from perturbation import jitter_measures
+from prefetch import Prefetcher
+from profiling import StageProfiler
+from tremor import vocal_tremor
+from speech_segments import (SPEECH_GATING_PARAMETERS, frame_powers, detect_speech_segments, find_transcript,
+                             read_transcript_segments, segments_duration, leading_segments)
+from supervision import SupervisedPool
+from scheduling import (AdmissionQueue, WORKER_BASELINE_MB, analysis_memory_mb, balanced_chunks, pool_size,
+                        read_headers)
+from running_stats import MomentAccumulator, QuantileSketch, LinearTrendAccumulator, linear_trend
+from energy_features import EnergyFeatureExtractor, EnergyAccumulator, ENERGY_FEATURE_NAMES, ENERGY_PARAMETERS
+
+# Columns output by each built-in feature family (in output order)
+JITTER_FEATURE_NAMES = ['ddp_jitter', 'jitter_local_mean', 'jitter_local_sd',
+                        'local_absolute_jitter', 'ppq5_jitter', 'rap_jitter']
+JITTER_FEATURE_MEASURES = dict(zip(JITTER_FEATURE_NAMES, ['ddp', 'local', 'local_sd', 'local_absolute', 'ppq5', 'rap']))
+PITCH_FEATURE_NAMES = [
+    'pitch_mean', 'pitch_std', 'pitch_min', 'pitch_max', 'pitch_range', 'f0_range',
+    'pitch_first_quartile', 'pitch_second_quartile', 'pitch_third_quartile',
+    'pitch_q2_q1_range', 'pitch_q3_q1_range', 'pitch_q3_q2_range',
+    'pitch_percentile_1', 'pitch_percentile_20', 'pitch_percentile_80', 'pitch_percentile_99',
+    'pitch_percentile_1_99_range', 'pitch_percentile_20_80_range',
+    'pitch_skewness', 'pitch_kurtosis', 'pitch_coefficient_of_variation',
+    'pitch_linear_regression_slope', 'pitch_linear_regression_offset', 'pitch_linear_regression_mse'
 ]
+FORMANT_FEATURE_NAMES = [f'f{formant_num}_{measure}' for formant_num in [1, 2, 3]
+                         for measure in ['frequency_mean', 'frequency_sd', 'bandwidth_mean', 'bandwidth_sd']]
+TREMOR_FEATURE_NAMES = ['vocal_tremor', 'vocal_tremor_voiced_seconds']
 
-for package in packages:
-    try:
-        __import__(package.replace('-', '_').split('[')[0])
-        print(f"{package} already installed")
-    except ImportError:
-        print(f"Installing {package}...")
-        install_package(package)
+# Families extracted when none are selected, and all frequency features they produce
+DEFAULT_FEATURE_FAMILIES = ('jitter', 'pitch', 'formant', 'tremor')
+ALL_FEATURE_NAMES = JITTER_FEATURE_NAMES + PITCH_FEATURE_NAMES + FORMANT_FEATURE_NAMES + TREMOR_FEATURE_NAMES
 
-# Now import all required libraries
-print("Importing libraries...")
-import pandas as pd
-import numpy as np
-import librosa
-import parselmouth
-from parselmouth.praat import call
-import warnings
-warnings.filterwarnings('ignore')
-from tqdm import tqdm
-import gc
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
-from functools import lru_cache
-import psutil
-import time
-from scipy import stats
-from scipy.signal import find_peaks
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
+# Analysis settings shared by the feature families; bump FEATURE_SET_VERSION
+# when a feature definition changes so stored results are re-extracted
+FEATURE_SET_VERSION = 7
+PITCH_PARAMETERS = {'time_step': 0.01, 'pitch_floor': 75, 'pitch_ceiling': 500}
+JITTER_PARAMETERS = {'pitch_floor': 75, 'pitch_ceiling': 500,
+                     'period_floor': 0.0001, 'period_ceiling': 0.02, 'maximum_period_factor': 1.3,
+                     'sd_window_periods': 20}
+FORMANT_PARAMETERS = {'time_step': 0.01, 'max_number_of_formants': 5, 'maximum_formant': 5500,
+                      'window_length': 0.025, 'pre_emphasis_from': 50}
+# Signal pyramid (AnalysisContext.get_sound): analyses run on the signal
+# decimated once to the rate they need. Burg formants work at twice the
+# maximum formant (Praat resamples to it internally), so that level is free
+# and leaves the formants unchanged. Pitch and glottal pulses stay at the
+# native rate: pulses located on a decimated signal shift jitter by 5-35%.
+PYRAMID_SAMPLE_RATES = (2 * FORMANT_PARAMETERS['maximum_formant'],)
+RESAMPLE_PRECISION = 50  # Sinc interpolation depth, as in Praat's own formant resampling
+TREMOR_BAND_HZ = (1.5, 15.0)
+TREMOR_PARAMETERS = {'window_seconds': 2.0, 'hop_seconds': 1.0, 'min_voiced_seconds': 0.4}
+# Units of features whose unit is not evident from the name, recorded with the outputs
+FEATURE_UNITS = {'vocal_tremor': 'Hz (peak F0 modulation amplitude)', 'vocal_tremor_voiced_seconds': 's'}
+STREAM_QUANTILE_ACCURACY = 0.001
+SCAN_BLOCK_SECONDS = 10.0
+SPEECH_GATING_MODES = ('vad', 'transcript')
+
+# Extraction modes from full to cheapest; supervised runs retry a file that
+# exceeds its time or memory budget in the next mode (iter_extract_supervised)
+EXTRACTION_MODES = {
+    'full': {'formant_time_step': FORMANT_PARAMETERS['time_step'], 'max_analysis_seconds': None},
+    'coarse_formants': {'formant_time_step': 0.05, 'max_analysis_seconds': None},
+    'bounded_window': {'formant_time_step': 0.05, 'max_analysis_seconds': 300.0},
+}
+# Share of the available memory the workers may use when no budget is given
+MEMORY_BUDGET_FRACTION = 0.75
+AUDIO_DIRS = ('/kaggle/input/all-audio/All_AUDIO',)
+
+def call(*args, **kwargs):
+    """parselmouth.praat.call, importing Parselmouth on first use"""
+    from parselmouth.praat import call as praat_call
+    return praat_call(*args, **kwargs)
+
+def empty_feature_row(participant_id, feature_names=ALL_FEATURE_NAMES):
+    """Feature row with every feature set to NaN"""
+    features = {'id': participant_id}
+    for feature_name in feature_names:
+        features[feature_name] = np.nan
+    return features
+
+def place_on_grid(pieces, fill, rows=()):
+    """
+    Place per-window frame values on a whole-file frame grid
+    
+    Args:
+        pieces: List of (first frame index, values) with frames on the last axis
+        fill: Value of frames no piece covers
+        rows: Leading shape of the values (e.g. (3,) for F1-F3)
+        
+    Returns:
+        ndarray: Track of shape rows + (frames up to the last piece's end,)
+    """
+    if not pieces:
+        return np.full(rows + (0,), fill)
+    length = max(first + values.shape[-1] for first, values in pieces)
+    track = np.full(rows + (length,), fill)
+    for first, values in pieces:
+        track[..., first:first + values.shape[-1]] = values
+    return track
+
+class AnalysisContext:
+    """
+    Per-file memo of intermediate Praat objects (Pitch, PointProcess, Formant)
+    
+    Each object is built on first request, keyed by its analysis parameters,
+    and shared by every feature family that asks for the same parameters.
+    The analyses run on a signal pyramid: the sound is decimated once to
+    each rate in PYRAMID_SAMPLE_RATES that an analysis asks for, each level
+    from the one above it, and never resampled again.
+    Call clear() (or use as a context manager) once the file is done.
+    """
+    
+    def __init__(self, sound_obj, samples=None, profiler=None, file_id=None):
+        """
+        Args:
+            sound_obj: Parselmouth Sound object for the file being analysed
+            samples: Optional decoded buffer the sound was built from, shared with
+                     sample-based families instead of copying the sound's values
+            profiler: Optional StageProfiler timing each build as 'analysis:<name>'
+            file_id: ID of the file, used to label profiler records
+        """
+        self.sound = sound_obj
+        self.samples = samples
+        self.profiler = profiler
+        self.file_id = file_id
+        self.cache = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.clear()
+        return False
+    
+    def get(self, key, build):
+        """Return the cached object for key, building it with build() on first use"""
+        if key not in self.cache:
+            if self.profiler is not None:
+                with self.profiler.stage(f'analysis:{key[0]}', self.file_id):
+                    self.cache[key] = build()
+            else:
+                self.cache[key] = build()
+        return self.cache[key]
+    
+    def get_samples(self):
+        """Mono sample buffer of the sound (at its own rate)"""
+        if self.samples is None:
+            self.samples = self.sound.values[0]
+        return self.samples
+    
+    def get_sound(self, sample_rate):
+        """
+        The sound anti-alias decimated to sample_rate (Praat's Resample)
+        
+        The level is built from the next higher PYRAMID_SAMPLE_RATES level
+        below the native rate (or from the sound itself), so the result does
+        not depend on which analysis asks first. Sounds already at or below
+        sample_rate are returned unchanged.
+        """
+        if sample_rate >= self.sound.sampling_frequency:
+            return self.sound
+        higher = [rate for rate in PYRAMID_SAMPLE_RATES if sample_rate < rate < self.sound.sampling_frequency]
+        source = self.get_sound(min(higher)) if higher else self.sound
+        return self.get(('sound', sample_rate), lambda: source.resample(sample_rate, RESAMPLE_PRECISION))
+    
+    def get_pitch(self, time_step=0.01, pitch_floor=75, pitch_ceiling=500, silence_threshold=0.03):
+        """Pitch object (autocorrelation method, Praat's default settings) at the native rate"""
+        return self.get(('pitch', time_step, pitch_floor, pitch_ceiling, silence_threshold),
+                        lambda: self.sound.to_pitch_ac(
+                            time_step=time_step, pitch_floor=pitch_floor, pitch_ceiling=pitch_ceiling,
+                            silence_threshold=silence_threshold))
+    
+    def get_voiced_pitch_values(self, time_step=0.01, pitch_floor=75, pitch_ceiling=500, silence_threshold=0.03):
+        """F0 contour in Hz with unvoiced frames removed"""
+        def build():
+            pitch = self.get_pitch(time_step, pitch_floor, pitch_ceiling, silence_threshold)
+            pitch_values = pitch.selected_array['frequency']
+            return pitch_values[pitch_values != 0]
+        return self.get(('voiced_pitch_values', time_step, pitch_floor, pitch_ceiling, silence_threshold), build)
+    
+    def get_point_process(self, pitch_floor=75, pitch_ceiling=500, silence_threshold=0.03):
+        """
+        Periodic PointProcess of glottal pulses
+        
+        Equivalent to "To PointProcess (periodic, cc)", which tracks pitch with a
+        0.75 / pitch_floor time step; reuses that Pitch object when it is cached.
+        """
+        def build():
+            pitch = self.get_pitch(0.75 / pitch_floor, pitch_floor, pitch_ceiling, silence_threshold)
+            return call([self.sound, pitch], "To PointProcess (cc)")
+        return self.get(('point_process', pitch_floor, pitch_ceiling, silence_threshold), build)
+    
+    def get_formant(self, time_step=0.01, max_number_of_formants=5, maximum_formant=5500,
+                    window_length=0.025, pre_emphasis_from=50):
+        """Formant object (Burg method), from the pyramid level at twice the maximum formant"""
+        return self.get(('formant', time_step, max_number_of_formants, maximum_formant,
+                         window_length, pre_emphasis_from),
+                        lambda: self.get_sound(2 * maximum_formant).to_formant_burg(
+                            time_step=time_step, max_number_of_formants=max_number_of_formants,
+                            maximum_formant=maximum_formant, window_length=window_length,
+                            pre_emphasis_from=pre_emphasis_from))
+    
+    def clear(self):
+        """Release all cached Praat objects"""
+        self.cache.clear()
+
+class FeatureFamily:
+    """
+    Declaration of a group of features that are extracted together
+    
+    A family states the columns it outputs and the intermediate analyses it
+    needs, so the extractor can run a subset of families and skip analyses
+    nobody asked for. Register new families with register_feature_family().
+    """
+    
+    def __init__(self, name, feature_names, requires, extract, streamable=False, from_tracks=None):
+        """
+        Args:
+            name: Name used to select the family (e.g. 'pitch')
+            feature_names: Columns the family outputs
+            requires: Intermediate analyses the family uses: 'pitch',
+                      'point_process', 'formant' and/or 'samples'
+            extract: Function (extractor, sound_obj, analysis) -> feature dict
+            streamable: Whether extract_features_streaming() can compute the family
+            from_tracks: Optional function (extractor, FeatureTracks) -> feature dict
+                         recomputing the family from stored frame-level tracks
+        """
+        self.name = name
+        self.feature_names = list(feature_names)
+        self.requires = set(requires)
+        self.extract = extract
+        self.streamable = streamable
+        self.from_tracks = from_tracks
+
+# Registered feature families by name, in default output order
+FEATURE_FAMILIES = {}
+
+def register_feature_family(family):
+    """Add (or replace) a feature family in the registry"""
+    FEATURE_FAMILIES[family.name] = family
+    return family
 
 class FrequencyFeatureExtractor:
-    def __init__(self, max_workers=None, chunk_size=50):
+    def __init__(self, max_workers=None, chunk_size=50, stream_window_seconds=None, stream_margin_seconds=1.0,
+                 families=None, profile=False, track_dir=None, speech_gating=None, transcript_dirs=(),
+                 mode='full', prefetch_bytes=None, prefetch_threads=2, memory_budget_mb=None):
         """
         Initialize the frequency feature extractor with optimization parameters
         
         Args:
             max_workers: Number of parallel workers (None for auto-detection)
             chunk_size: Number of files to process in each chunk
+            stream_window_seconds: Analyse audio in windows of this length instead of
+                                   loading whole files (None to disable streaming)
+            stream_margin_seconds: Extra context read on each side of a window so
+                                   analyses are not cut off at window edges
+            families: Names of the feature families to extract (None for
+                      DEFAULT_FEATURE_FAMILIES); only the analyses they need are run
+            profile: Record per-stage wall time, CPU time and peak memory in
+                     self.profiler (see profiling.py)
+            track_dir: Also save the frame-level tracks behind the features
+                       (feature_tracks.py) under this directory (None to disable)
+            speech_gating: Analyse only the participant's speech (speech_segments.py):
+                           'vad' for energy-based voice activity detection,
+                           'transcript' for transcript timings (VAD when a file has
+                           no transcript), None to analyse the whole recording
+            transcript_dirs: Directories searched for transcripts besides the audio's own
+            mode: Extraction mode (EXTRACTION_MODES): 'full', 'coarse_formants'
+                  (formants sampled every 50ms) or 'bounded_window' (coarse
+                  formants on the first 300s of the recording or its speech)
+            prefetch_bytes: Decode the next files of each chunk in background
+                            threads while the current one is analysed, buffering at
+                            most this many bytes of audio (None to read each file
+                            when its analysis starts); whole-file extraction only
+            prefetch_threads: Reader threads per worker when prefetching (several
+                              hide more storage latency)
+            memory_budget_mb: Memory the worker processes may be projected to use
+                              together (scheduling.py); None for a share of the
+                              memory available when extraction starts
         """
-        self.max_workers = max_workers or min(4, psutil.cpu_count())
+        self.max_workers = max_workers or psutil.cpu_count()
         self.chunk_size = chunk_size
-        self.lock = threading.Lock()
-        
-    def memory_monitor(self):
-        """Monitor memory usage and trigger garbage collection if needed"""
-        memory_percent = psutil.virtual_memory().percent
-        if memory_percent > 80:
-            gc.collect()
-            return True
-        return False
+        self.stream_window_seconds = stream_window_seconds
+        self.stream_margin_seconds = stream_margin_seconds
+        self.families = list(families) if families is not None else list(DEFAULT_FEATURE_FAMILIES)
+        self.energy_extractor = EnergyFeatureExtractor()
+        self.profiler = StageProfiler() if profile else None
+        self.track_store = TrackStore(track_dir) if track_dir else None
+        self.speech_gating = speech_gating
+        self.transcript_dirs = list(transcript_dirs)
+        self.prefetch_bytes = prefetch_bytes
+        self.prefetch_threads = prefetch_threads
+        self.memory_budget_mb = memory_budget_mb
+        
+        if mode not in EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode '{mode}' (available: {', '.join(EXTRACTION_MODES)})")
+        self.mode = mode
+        self.formant_parameters = dict(FORMANT_PARAMETERS, time_step=EXTRACTION_MODES[mode]['formant_time_step'])
+        self.max_analysis_seconds = EXTRACTION_MODES[mode]['max_analysis_seconds']
+        
+        if speech_gating is not None and speech_gating not in SPEECH_GATING_MODES:
+            raise ValueError(f"Unknown speech gating '{speech_gating}' (available: {', '.join(SPEECH_GATING_MODES)})")
+        for name in self.families:
+            if name not in FEATURE_FAMILIES:
+                raise ValueError(f"Unknown feature family '{name}' (available: {', '.join(FEATURE_FAMILIES)})")
+            if ((stream_window_seconds or speech_gating or self.max_analysis_seconds)
+                    and not FEATURE_FAMILIES[name].streamable):
+                raise ValueError(f"Feature family '{name}' does not support streaming, speech-gated "
+                                 f"or bounded extraction")
+        
+    def memory_budget(self):
+        """Memory (MB) the worker processes may be projected to use together"""
+        if self.memory_budget_mb is not None:
+            return self.memory_budget_mb
+        return MEMORY_BUDGET_FRACTION * psutil.virtual_memory().available / 2 ** 20
+    
+    def file_estimate(self, header, mode=None):
+        """
+        Estimated analysis cost and peak working memory of a file
+        
+        The cost is the duration of audio analysed. The memory follows the
+        longest stretch decoded and analysed at once: a stream window, or
+        else all the audio analysed (a whole file, its speech regions or its
+        bounded window).
+        
+        Args:
+            header: Dict with the file's 'duration' and 'sample_rate' (read_headers())
+            mode: Extraction mode (None for self.mode)
+            
+        Returns:
+            tuple: (seconds of audio analysed, peak memory in MB beyond the worker baseline)
+        """
+        max_seconds = EXTRACTION_MODES[mode or self.mode]['max_analysis_seconds']
+        seconds = header['duration'] if max_seconds is None else min(header['duration'], max_seconds)
+        span = seconds
+        if self.stream_window_seconds:
+            span = min(seconds, self.stream_window_seconds + 2 * self.stream_margin_seconds)
+        return seconds, analysis_memory_mb(span, header['sample_rate'])
+    
+    def profile_stage(self, name, file_id):
+        """Profiler stage context, or a no-op when profiling is off"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name, file_id)
     
     def load_audio_file(self, file_path):
         """
-        Load audio file without caching for Kaggle environment
+        Load audio file at its native sample rate without caching
+        
+        WAV files are memory-mapped and FLAC/OGG/AIFF are read with soundfile
+        (audio_io.py); librosa is only imported for formats those cannot read.
         
         Args:
             file_path: Path to audio file
@@ -84,351 +378,1301 @@ class FrequencyFeatureExtractor:
             tuple: (audio_data, sample_rate)
         """
         try:
-            # Load with librosa for consistency
+            return load_audio(file_path)
+        except Exception:
+            pass
+        
+        try:
+            # Compressed formats (e.g. .mp3/.m4a) go through librosa/audioread
+            import librosa
             audio, sr = librosa.load(file_path, sr=None, mono=True)
             return audio, sr
         except Exception as e:
             print(f"Error loading {file_path}: {str(e)}")
             return None, None
     
-    def extract_jitter_features(self, sound_obj):
+    def jitter_features_from_pulses(self, pulse_times):
+        """
+        Compute jitter features from glottal pulse times
+        
+        The glottal periods are computed once and every jitter variant is
+        derived from them (perturbation.py), with the period floor, ceiling
+        and maximum period factor of Praat's jitter queries.
+        
+        Args:
+            pulse_times: Sorted glottal pulse times in seconds
+            
+        Returns:
+            dict: Dictionary containing jitter features (NaN without pulses)
+        """
+        try:
+            measures = jitter_measures(pulse_times, JITTER_PARAMETERS['period_floor'],
+                                       JITTER_PARAMETERS['period_ceiling'],
+                                       JITTER_PARAMETERS['maximum_period_factor'],
+                                       JITTER_PARAMETERS['sd_window_periods'])
+            return {feature_name: measures[measure] for feature_name, measure in JITTER_FEATURE_MEASURES.items()}
+        except Exception as e:
+            print(f"Error in jitter extraction: {str(e)}")
+            return {key: np.nan for key in JITTER_FEATURE_NAMES}
+    
+    def extract_jitter_features(self, sound_obj, analysis=None):
         """
         Extract jitter-related features using Parselmouth/Praat
         
         Args:
             sound_obj: Parselmouth Sound object
+            analysis: Optional AnalysisContext shared with the other feature families
             
         Returns:
             dict: Dictionary containing jitter features
         """
         features = {}
+        if analysis is None:
+            analysis = AnalysisContext(sound_obj)
         
         try:
-            # Create PointProcess from sound for jitter analysis
-            point_process = call(sound_obj, "To PointProcess (periodic, cc)", 75, 500)
-            
-            # DDP Jitter (Dynamic Decline Perturbation)
-            try:
-                features['ddp_jitter'] = call(point_process, "Get jitter (ddp)", 0, 0, 0.0001, 0.02, 1.3)
-            except:
-                features['ddp_jitter'] = np.nan
-            
-            # Local Jitter (cycle-to-cycle F0 variability)
-            try:
-                jitter_local = call(point_process, "Get jitter (local)", 0, 0, 0.0001, 0.02, 1.3)
-                features['jitter_local_mean'] = jitter_local
-                # Approximate SD (Praat doesn't provide frame-by-frame jitter directly)
-                features['jitter_local_sd'] = jitter_local * 0.15  # Approximate SD
-            except:
-                features['jitter_local_mean'] = np.nan
-                features['jitter_local_sd'] = np.nan
-            
-            # Local Absolute Jitter
-            try:
-                features['local_absolute_jitter'] = call(point_process, "Get jitter (local, absolute)", 0, 0, 0.0001, 0.02, 1.3)
-            except:
-                features['local_absolute_jitter'] = np.nan
-            
-            # PPQ5 Jitter (5-point period perturbation quotient)
-            try:
-                features['ppq5_jitter'] = call(point_process, "Get jitter (ppq5)", 0, 0, 0.0001, 0.02, 1.3)
-            except:
-                features['ppq5_jitter'] = np.nan
-            
-            # RAP Jitter (Relative Average Perturbation)
-            try:
-                features['rap_jitter'] = call(point_process, "Get jitter (rap)", 0, 0, 0.0001, 0.02, 1.3)
-            except:
-                features['rap_jitter'] = np.nan
+            # Periodic PointProcess for jitter analysis (shares the Pitch object)
+            point_process = analysis.get_point_process(JITTER_PARAMETERS['pitch_floor'],
+                                                       JITTER_PARAMETERS['pitch_ceiling'])
+            features.update(self.jitter_features_from_pulses(self.pulse_times(point_process)))
                 
         except Exception as e:
             print(f"Error in jitter extraction: {str(e)}")
-            for key in ['ddp_jitter', 'jitter_local_mean', 'jitter_local_sd', 
-                       'local_absolute_jitter', 'ppq5_jitter', 'rap_jitter']:
+            for key in JITTER_FEATURE_NAMES:
                 features[key] = np.nan
                 
         return features
     
-    def extract_pitch_features(self, sound_obj):
+    def pitch_features_from_summary(self, moments, percentile, trend):
+        """
+        Compute pitch features from summary statistics of the voiced F0 contour
+        
+        Args:
+            moments: MomentAccumulator over the voiced F0 values
+            percentile: Function mapping a percentile (0-100) to an F0 value
+            trend: (slope, offset, mse) of the contour against the voiced-frame index
+            
+        Returns:
+            dict: Dictionary containing pitch features
+        """
+        features = {}
+        
+        if moments.count > 0:
+            # Basic statistics
+            features['pitch_mean'] = moments.mean
+            features['pitch_std'] = moments.std
+            features['pitch_min'] = moments.minimum
+            features['pitch_max'] = moments.maximum
+            features['pitch_range'] = features['pitch_max'] - features['pitch_min']
+            
+            # F0 range (same as pitch range for voiced segments)
+            features['f0_range'] = features['pitch_range']
+            
+            # Quartiles
+            features['pitch_first_quartile'] = percentile(25)
+            features['pitch_second_quartile'] = percentile(50)  # Median
+            features['pitch_third_quartile'] = percentile(75)
+            
+            # Quartile ranges
+            features['pitch_q2_q1_range'] = features['pitch_second_quartile'] - features['pitch_first_quartile']
+            features['pitch_q3_q1_range'] = features['pitch_third_quartile'] - features['pitch_first_quartile']
+            features['pitch_q3_q2_range'] = features['pitch_third_quartile'] - features['pitch_second_quartile']
+            
+            # Percentiles
+            features['pitch_percentile_1'] = percentile(1)
+            features['pitch_percentile_20'] = percentile(20)
+            features['pitch_percentile_80'] = percentile(80)
+            features['pitch_percentile_99'] = percentile(99)
+            
+            # Percentile ranges
+            features['pitch_percentile_1_99_range'] = features['pitch_percentile_99'] - features['pitch_percentile_1']
+            features['pitch_percentile_20_80_range'] = features['pitch_percentile_80'] - features['pitch_percentile_20']
+            
+            # Statistical measures
+            features['pitch_skewness'] = moments.skewness
+            features['pitch_kurtosis'] = moments.kurtosis
+            features['pitch_coefficient_of_variation'] = features['pitch_std'] / features['pitch_mean'] if features['pitch_mean'] != 0 else np.nan
+            
+            # Linear regression features
+            features['pitch_linear_regression_slope'] = trend[0]
+            features['pitch_linear_regression_offset'] = trend[1]
+            features['pitch_linear_regression_mse'] = trend[2]
+                
+        else:
+            # No voiced frames found
+            for feature_name in PITCH_FEATURE_NAMES:
+                features[feature_name] = np.nan
+        
+        return features
+    
+    def pitch_features_from_values(self, pitch_values):
+        """
+        Compute pitch statistics from a voiced F0 contour
+        
+        Args:
+            pitch_values: F0 values in Hz with unvoiced frames removed
+            
+        Returns:
+            dict: Dictionary containing pitch features
+        """
+        return self.pitch_features_from_summary(MomentAccumulator.from_values(pitch_values),
+                                                lambda q: np.percentile(pitch_values, q),
+                                                linear_trend(pitch_values))
+    
+    def extract_pitch_features(self, sound_obj, analysis=None):
         """
         Extract comprehensive pitch features
         
         Args:
             sound_obj: Parselmouth Sound object
+            analysis: Optional AnalysisContext shared with the other feature families
             
         Returns:
             dict: Dictionary containing pitch features
         """
         features = {}
+        if analysis is None:
+            analysis = AnalysisContext(sound_obj)
         
         try:
-            # Get pitch object
-            pitch = sound_obj.to_pitch(time_step=0.01, pitch_floor=75, pitch_ceiling=500)
+            # Extract pitch values (unvoiced frames removed)
+            pitch_values = analysis.get_voiced_pitch_values(**PITCH_PARAMETERS)
             
-            # Extract pitch values (remove unvoiced frames)
-            pitch_values = pitch.selected_array['frequency']
-            pitch_values = pitch_values[pitch_values != 0]  # Remove unvoiced frames
-            
-            if len(pitch_values) > 0:
-                # Basic statistics
-                features['pitch_mean'] = np.mean(pitch_values)
-                features['pitch_std'] = np.std(pitch_values)
-                features['pitch_min'] = np.min(pitch_values)
-                features['pitch_max'] = np.max(pitch_values)
-                features['pitch_range'] = features['pitch_max'] - features['pitch_min']
-                
-                # F0 range (same as pitch range for voiced segments)
-                features['f0_range'] = features['pitch_range']
-                
-                # Quartiles
-                features['pitch_first_quartile'] = np.percentile(pitch_values, 25)
-                features['pitch_second_quartile'] = np.percentile(pitch_values, 50)  # Median
-                features['pitch_third_quartile'] = np.percentile(pitch_values, 75)
-                
-                # Quartile ranges
-                features['pitch_q2_q1_range'] = features['pitch_second_quartile'] - features['pitch_first_quartile']
-                features['pitch_q3_q1_range'] = features['pitch_third_quartile'] - features['pitch_first_quartile']
-                features['pitch_q3_q2_range'] = features['pitch_third_quartile'] - features['pitch_second_quartile']
-                
-                # Percentiles
-                features['pitch_percentile_1'] = np.percentile(pitch_values, 1)
-                features['pitch_percentile_20'] = np.percentile(pitch_values, 20)
-                features['pitch_percentile_80'] = np.percentile(pitch_values, 80)
-                features['pitch_percentile_99'] = np.percentile(pitch_values, 99)
-                
-                # Percentile ranges
-                features['pitch_percentile_1_99_range'] = features['pitch_percentile_99'] - features['pitch_percentile_1']
-                features['pitch_percentile_20_80_range'] = features['pitch_percentile_80'] - features['pitch_percentile_20']
-                
-                # Statistical measures
-                features['pitch_skewness'] = stats.skew(pitch_values)
-                features['pitch_kurtosis'] = stats.kurtosis(pitch_values)
-                features['pitch_coefficient_of_variation'] = features['pitch_std'] / features['pitch_mean'] if features['pitch_mean'] != 0 else np.nan
-                
-                # Linear regression features
-                if len(pitch_values) > 1:
-                    time_points = np.arange(len(pitch_values)).reshape(-1, 1)
-                    reg = LinearRegression().fit(time_points, pitch_values)
-                    predictions = reg.predict(time_points)
-                    
-                    features['pitch_linear_regression_slope'] = reg.coef_[0]
-                    features['pitch_linear_regression_offset'] = reg.intercept_
-                    features['pitch_linear_regression_mse'] = mean_squared_error(pitch_values, predictions)
-                else:
-                    features['pitch_linear_regression_slope'] = np.nan
-                    features['pitch_linear_regression_offset'] = np.nan
-                    features['pitch_linear_regression_mse'] = np.nan
-                    
-            else:
-                # No voiced frames found
-                pitch_feature_names = [
-                    'pitch_mean', 'pitch_std', 'pitch_min', 'pitch_max', 'pitch_range', 'f0_range',
-                    'pitch_first_quartile', 'pitch_second_quartile', 'pitch_third_quartile',
-                    'pitch_q2_q1_range', 'pitch_q3_q1_range', 'pitch_q3_q2_range',
-                    'pitch_percentile_1', 'pitch_percentile_20', 'pitch_percentile_80', 'pitch_percentile_99',
-                    'pitch_percentile_1_99_range', 'pitch_percentile_20_80_range',
-                    'pitch_skewness', 'pitch_kurtosis', 'pitch_coefficient_of_variation',
-                    'pitch_linear_regression_slope', 'pitch_linear_regression_offset', 'pitch_linear_regression_mse'
-                ]
-                for feature_name in pitch_feature_names:
-                    features[feature_name] = np.nan
+            features.update(self.pitch_features_from_values(pitch_values))
                     
         except Exception as e:
             print(f"Error in pitch extraction: {str(e)}")
-            pitch_feature_names = [
-                'pitch_mean', 'pitch_std', 'pitch_min', 'pitch_max', 'pitch_range', 'f0_range',
-                'pitch_first_quartile', 'pitch_second_quartile', 'pitch_third_quartile',
-                'pitch_q2_q1_range', 'pitch_q3_q1_range', 'pitch_q3_q2_range',
-                'pitch_percentile_1', 'pitch_percentile_20', 'pitch_percentile_80', 'pitch_percentile_99',
-                'pitch_percentile_1_99_range', 'pitch_percentile_20_80_range',
-                'pitch_skewness', 'pitch_kurtosis', 'pitch_coefficient_of_variation',
-                'pitch_linear_regression_slope', 'pitch_linear_regression_offset', 'pitch_linear_regression_mse'
-            ]
-            for feature_name in pitch_feature_names:
+            for feature_name in PITCH_FEATURE_NAMES:
                 features[feature_name] = np.nan
                 
         return features
     
-    def extract_formant_features(self, sound_obj):
+    def get_formant_tracks(self, formant, time_points, max_formant_number=3):
+        """
+        Sample formant frequency and bandwidth tracks in bulk
+        
+        Lists every analysis frame of the Formant object with a single Praat call
+        and reproduces "Get value at time" / "Get bandwidth at time" (linear
+        interpolation) for all time points with NumPy, instead of two Praat calls
+        per time point and formant.
+        
+        Args:
+            formant: Parselmouth Formant object
+            time_points: Array of times (in seconds) to sample
+            max_formant_number: Number of formants to return (F1..Fn)
+            
+        Returns:
+            tuple: (frequencies, bandwidths) arrays of shape
+                   (max_formant_number, len(time_points)), NaN where undefined
+        """
+        time_points = np.asarray(time_points, dtype=float)
+        frequencies = np.full((max_formant_number, len(time_points)), np.nan)
+        bandwidths = np.full((max_formant_number, len(time_points)), np.nan)
+        
+        # Columns: time, nformants, F1, B1, F2, B2, ...
+        listing = call(formant, "List", False, True, 10, False, 3, True, 10, True)
+        frame_table = np.loadtxt(io.StringIO(listing.replace('--undefined--', 'nan')),
+                                 delimiter='\t', skiprows=1, ndmin=2)
+        n_frames = frame_table.shape[0]
+        if n_frames == 0 or len(time_points) == 0:
+            return frequencies, bandwidths
+        
+        # Same nearest/far frame selection as Praat's Sampled_getValueAtX
+        position = (time_points - formant.x1) / formant.dx
+        left = np.floor(position).astype(np.int64)
+        phase = position - left
+        near_is_left = phase < 0.5
+        near = np.where(near_is_left, left, left + 1)
+        far = np.where(near_is_left, left + 1, left)
+        phase = np.where(near_is_left, phase, 1.0 - phase)
+        near_valid = (near >= 0) & (near < n_frames)
+        far_valid = (far >= 0) & (far < n_frames)
+        near = np.clip(near, 0, n_frames - 1)
+        far = np.clip(far, 0, n_frames - 1)
+        
+        def interpolate(frame_values):
+            value_near = np.where(near_valid, frame_values[near], np.nan)
+            value_far = np.where(far_valid, frame_values[far], np.nan)
+            # Undefined neighbour: Praat falls back to the nearest frame
+            return np.where(np.isnan(value_far), value_near, value_near + phase * (value_far - value_near))
+        
+        n_listed = (frame_table.shape[1] - 2) // 2
+        for formant_index in range(min(max_formant_number, n_listed)):
+            frequencies[formant_index] = interpolate(frame_table[:, 2 + 2 * formant_index])
+            bandwidths[formant_index] = interpolate(frame_table[:, 3 + 2 * formant_index])
+        
+        return frequencies, bandwidths
+    
+    def formant_features_from_moments(self, frequency_moments, bandwidth_moments):
+        """
+        Compute formant statistics from per-formant moment accumulators
+        
+        Args:
+            frequency_moments: List of MomentAccumulator for F1, F2, F3 frequencies
+            bandwidth_moments: List of MomentAccumulator for F1, F2, F3 bandwidths
+            
+        Returns:
+            dict: Dictionary containing formant features
+        """
+        features = {}
+        
+        for formant_num in [1, 2, 3]:
+            frequencies = frequency_moments[formant_num - 1]
+            bandwidths = bandwidth_moments[formant_num - 1]
+            
+            # Calculate statistics for frequencies
+            if frequencies.count > 0:
+                features[f'f{formant_num}_frequency_mean'] = frequencies.mean
+                features[f'f{formant_num}_frequency_sd'] = frequencies.std
+            else:
+                features[f'f{formant_num}_frequency_mean'] = np.nan
+                features[f'f{formant_num}_frequency_sd'] = np.nan
+            
+            # Calculate statistics for bandwidths
+            if bandwidths.count > 0:
+                features[f'f{formant_num}_bandwidth_mean'] = bandwidths.mean
+                features[f'f{formant_num}_bandwidth_sd'] = bandwidths.std
+            else:
+                features[f'f{formant_num}_bandwidth_mean'] = np.nan
+                features[f'f{formant_num}_bandwidth_sd'] = np.nan
+        
+        return features
+    
+    def update_formant_moments(self, frequency_moments, bandwidth_moments, frequency_tracks, bandwidth_tracks):
+        """
+        Add sampled F1-F3 tracks to per-formant moment accumulators
+        
+        Only defined, positive values are counted.
+        
+        Args:
+            frequency_moments: List of MomentAccumulator for F1, F2, F3 frequencies
+            bandwidth_moments: List of MomentAccumulator for F1, F2, F3 bandwidths
+            frequency_tracks: Array of shape (3, n_times), NaN where undefined
+            bandwidth_tracks: Array of shape (3, n_times), NaN where undefined
+        """
+        for formant_index in range(3):
+            frequencies = frequency_tracks[formant_index]
+            bandwidths = bandwidth_tracks[formant_index]
+            frequency_moments[formant_index].update(frequencies[~np.isnan(frequencies) & (frequencies > 0)])
+            bandwidth_moments[formant_index].update(bandwidths[~np.isnan(bandwidths) & (bandwidths > 0)])
+    
+    def formant_features_from_tracks(self, frequency_tracks, bandwidth_tracks):
+        """
+        Compute formant statistics from sampled F1-F3 tracks
+        
+        Args:
+            frequency_tracks: Array of shape (3, n_times), NaN where undefined
+            bandwidth_tracks: Array of shape (3, n_times), NaN where undefined
+            
+        Returns:
+            dict: Dictionary containing formant features
+        """
+        frequency_moments = [MomentAccumulator() for _ in range(3)]
+        bandwidth_moments = [MomentAccumulator() for _ in range(3)]
+        self.update_formant_moments(frequency_moments, bandwidth_moments, frequency_tracks, bandwidth_tracks)
+        return self.formant_features_from_moments(frequency_moments, bandwidth_moments)
+    
+    def sampled_formant_tracks(self, sound_obj, analysis):
+        """
+        F1-F3 frequency and bandwidth tracks sampled every formant time step (10ms) over the whole sound
+        
+        Cached in the analysis context, so saved tracks reuse the sampling
+        done for the formant features.
+        
+        Args:
+            sound_obj: Parselmouth Sound object
+            analysis: AnalysisContext of the sound
+            
+        Returns:
+            tuple: (time_points, frequencies, bandwidths), see get_formant_tracks()
+        """
+        def build():
+            formant = analysis.get_formant(**self.formant_parameters)
+            step = self.formant_parameters['time_step']
+            time_points = np.arange(step, sound_obj.get_total_duration(), step)
+            return (time_points,) + self.get_formant_tracks(formant, time_points, max_formant_number=3)
+        return analysis.get(('formant_tracks',) + tuple(self.formant_parameters.values()), build)
+    
+    def extract_formant_features(self, sound_obj, analysis=None):
         """
         Extract formant frequency and bandwidth features
         
         Args:
             sound_obj: Parselmouth Sound object
+            analysis: Optional AnalysisContext shared with the other feature families
             
         Returns:
             dict: Dictionary containing formant features
         """
         features = {}
+        if analysis is None:
+            analysis = AnalysisContext(sound_obj)
         
         try:
-            # Get formant object
-            formant = sound_obj.to_formant_burg(time_step=0.01, max_number_of_formants=5, 
-                                              maximum_formant=5500, window_length=0.025, 
-                                              pre_emphasis_from=50)
+            # Sample every time step, pulling all F1-F3 tracks out of Praat in one go
+            _, frequency_tracks, bandwidth_tracks = self.sampled_formant_tracks(sound_obj, analysis)
             
-            # Extract formant frequencies and bandwidths for F1, F2, F3
-            for formant_num in [1, 2, 3]:
-                try:
-                    # Get all formant values across time
-                    frequencies = []
-                    bandwidths = []
-                    
-                    # Sample at regular intervals
-                    duration = sound_obj.get_total_duration()
-                    time_points = np.arange(0.01, duration, 0.01)  # Every 10ms
-                    
-                    for t in time_points:
-                        try:
-                            freq = call(formant, "Get value at time", formant_num, t, "hertz", "Linear")
-                            bw = call(formant, "Get bandwidth at time", formant_num, t, "hertz", "Linear")
-                            
-                            if not np.isnan(freq) and freq > 0:
-                                frequencies.append(freq)
-                            if not np.isnan(bw) and bw > 0:
-                                bandwidths.append(bw)
-                        except:
-                            continue
-                    
-                    # Calculate statistics for frequencies
-                    if frequencies:
-                        features[f'f{formant_num}_frequency_mean'] = np.mean(frequencies)
-                        features[f'f{formant_num}_frequency_sd'] = np.std(frequencies)
-                    else:
-                        features[f'f{formant_num}_frequency_mean'] = np.nan
-                        features[f'f{formant_num}_frequency_sd'] = np.nan
-                    
-                    # Calculate statistics for bandwidths
-                    if bandwidths:
-                        features[f'f{formant_num}_bandwidth_mean'] = np.mean(bandwidths)
-                        features[f'f{formant_num}_bandwidth_sd'] = np.std(bandwidths)
-                    else:
-                        features[f'f{formant_num}_bandwidth_mean'] = np.nan
-                        features[f'f{formant_num}_bandwidth_sd'] = np.nan
-                        
-                except Exception as e:
-                    print(f"Error extracting F{formant_num}: {str(e)}")
-                    features[f'f{formant_num}_frequency_mean'] = np.nan
-                    features[f'f{formant_num}_frequency_sd'] = np.nan
-                    features[f'f{formant_num}_bandwidth_mean'] = np.nan
-                    features[f'f{formant_num}_bandwidth_sd'] = np.nan
+            features.update(self.formant_features_from_tracks(frequency_tracks, bandwidth_tracks))
                     
         except Exception as e:
             print(f"Error in formant extraction: {str(e)}")
-            for formant_num in [1, 2, 3]:
-                features[f'f{formant_num}_frequency_mean'] = np.nan
-                features[f'f{formant_num}_frequency_sd'] = np.nan
-                features[f'f{formant_num}_bandwidth_mean'] = np.nan
-                features[f'f{formant_num}_bandwidth_sd'] = np.nan
+            for feature_name in FORMANT_FEATURE_NAMES:
+                features[feature_name] = np.nan
                 
         return features
     
-    def extract_vocal_tremor(self, sound_obj):
+    def tremor_features_from_pitch(self, pitch_track):
+        """
+        Compute vocal tremor from an F0 track
+        
+        Welch-averaged spectra of fixed-length windows over the contiguous
+        voiced runs (tremor.py); the feature is the peak F0 modulation
+        amplitude in Hz within TREMOR_BAND_HZ, reported with the voiced
+        duration it was measured on.
+        
+        Args:
+            pitch_track: F0 values in Hz on the 10ms pitch grid, 0 for unvoiced frames
+            
+        Returns:
+            dict: Dictionary containing vocal tremor features
+        """
+        frame_rate = 1.0 / PITCH_PARAMETERS['time_step']  # 100 Hz (10ms time step)
+        amplitude, _, voiced_seconds = vocal_tremor([pitch_track], frame_rate, TREMOR_BAND_HZ, **TREMOR_PARAMETERS)
+        return {'vocal_tremor': amplitude[0], 'vocal_tremor_voiced_seconds': voiced_seconds[0]}
+    
+    def extract_vocal_tremor(self, sound_obj, analysis=None):
         """
         Extract vocal tremor feature (F0 modulation in 1.5-15 Hz band)
         
         Args:
             sound_obj: Parselmouth Sound object
+            analysis: Optional AnalysisContext shared with the other feature families
             
         Returns:
             dict: Dictionary containing vocal tremor feature
         """
         features = {}
+        if analysis is None:
+            analysis = AnalysisContext(sound_obj)
         
         try:
-            # Get pitch contour
-            pitch = sound_obj.to_pitch(time_step=0.01, pitch_floor=75, pitch_ceiling=500)
-            pitch_values = pitch.selected_array['frequency']
-            pitch_values = pitch_values[pitch_values != 0]  # Remove unvoiced frames
+            # Whole pitch track (0 for unvoiced frames), so voiced runs stay separate
+            pitch = analysis.get_pitch(**PITCH_PARAMETERS)
             
-            if len(pitch_values) > 30:  # Need sufficient data for tremor analysis
-                # Calculate sampling rate of pitch contour
-                fs_pitch = 1.0 / 0.01  # 100 Hz (10ms time step)
-                
-                # Apply FFT to pitch contour
-                fft_pitch = np.fft.fft(pitch_values - np.mean(pitch_values))
-                freqs = np.fft.fftfreq(len(pitch_values), 1/fs_pitch)
-                
-                # Find magnitude in tremor frequency band (1.5-15 Hz)
-                tremor_mask = (freqs >= 1.5) & (freqs <= 15.0)
-                tremor_magnitudes = np.abs(fft_pitch[tremor_mask])
-                
-                if len(tremor_magnitudes) > 0:
-                    features['vocal_tremor'] = np.max(tremor_magnitudes)
-                else:
-                    features['vocal_tremor'] = np.nan
-            else:
-                features['vocal_tremor'] = np.nan
+            features.update(self.tremor_features_from_pitch(pitch.selected_array['frequency']))
                 
         except Exception as e:
             print(f"Error in vocal tremor extraction: {str(e)}")
-            features['vocal_tremor'] = np.nan
+            for feature_name in TREMOR_FEATURE_NAMES:
+                features[feature_name] = np.nan
             
         return features
     
-    def extract_features_single_file(self, file_path, participant_id):
+    def extract_energy_features(self, sound_obj, analysis=None):
         """
-        Extract all frequency features from a single audio file
+        Extract energy features (energy_features.py) from the decoded samples
+        
+        Args:
+            sound_obj: Parselmouth Sound object
+            analysis: Optional AnalysisContext holding the decoded buffer
+            
+        Returns:
+            dict: Dictionary containing energy features
+        """
+        if analysis is None:
+            analysis = AnalysisContext(sound_obj)
+        
+        try:
+            short_time_energy = self.frame_energies(sound_obj, analysis)
+            return self.energy_extractor.energy_features_from_frames(short_time_energy, sound_obj.sampling_frequency)
+        except Exception as e:
+            print(f"Error in energy extraction: {str(e)}")
+            return {feature_name: np.nan for feature_name in ENERGY_FEATURE_NAMES}
+    
+    def frame_energies(self, sound_obj, analysis):
+        """Short-time energy of every energy frame, cached in the analysis context"""
+        return analysis.get(('frame_energy', self.energy_extractor.frame_length, self.energy_extractor.hop_length),
+                            lambda: self.energy_extractor.frame_energies(analysis.get_samples(),
+                                                                         sound_obj.sampling_frequency))
+    
+    def pulse_times(self, point_process):
+        """Glottal pulse times of a PointProcess (empty when it has no pulses)"""
+        if call(point_process, "Get number of points") == 0:
+            return np.empty(0)
+        return call(point_process, "To Matrix").values[0]
+    
+    def tracks_from_analysis(self, sound_obj, analysis):
+        """
+        Frame-level tracks behind the selected families' features
+        
+        Reuses the Praat objects and samplings already built in the analysis
+        context while extracting the features.
+        
+        Args:
+            sound_obj: Parselmouth Sound object
+            analysis: AnalysisContext the features were extracted with
+            
+        Returns:
+            tuple: (tracks, attributes) as expected by TrackStore.save()
+        """
+        needs = self.required_analyses()
+        tracks = {}
+        attributes = {'sample_rate': sound_obj.sampling_frequency, 'duration': sound_obj.get_total_duration()}
+        
+        if 'pitch' in needs:
+            pitch = analysis.get_pitch(**PITCH_PARAMETERS)
+            tracks['pitch'] = pitch.selected_array['frequency']
+            attributes.update(pitch_start=pitch.x1, pitch_step=pitch.dx)
+        if 'point_process' in needs:
+            point_process = analysis.get_point_process(JITTER_PARAMETERS['pitch_floor'],
+                                                       JITTER_PARAMETERS['pitch_ceiling'])
+            tracks['pulses'] = self.pulse_times(point_process)
+        if 'formant' in needs:
+            _, tracks['formant_frequency'], tracks['formant_bandwidth'] = self.sampled_formant_tracks(sound_obj,
+                                                                                                      analysis)
+            attributes.update(formant_start=self.formant_parameters['time_step'],
+                              formant_step=self.formant_parameters['time_step'])
+        if 'samples' in needs:
+            tracks['frame_energy'] = self.frame_energies(sound_obj, analysis)
+        
+        return tracks, attributes
+    
+    def save_tracks(self, participant_id, tracks, attributes):
+        """
+        Write a file's tracks to the track store, reporting (not raising) failures
+        
+        Args:
+            participant_id: ID of the participant
+            tracks: Dict of track name -> array
+            attributes: Time axes and sample rate of the tracks
+        """
+        try:
+            with self.profile_stage('save_tracks', participant_id):
+                self.track_store.save(participant_id, tracks,
+                                      dict(attributes, families=self.families,
+                                           parameters=self.extraction_parameters()))
+        except Exception as e:
+            print(f"Error saving tracks for ID {participant_id}: {str(e)}")
+    
+    def iter_audio_windows(self, file_path, segments=None, detect_speech=False, gating=None):
+        """
+        Read an audio file in bounded windows with context margins
+        
+        Only one window (plus margins) is held in memory at a time. Window reads
+        start on the 10ms analysis grid and differ in length from the file by a
+        whole number of steps, so Praat places pitch and formant frames at the
+        same times as it would for the whole file. Files within a quarter step
+        of a whole number of steps are the exception: there, a window's frame
+        count could flip with the rounding of its (resampled) duration, so
+        reads get an extra half step and all windows share a grid a quarter
+        step from the whole file's. WAV windows are sliced from
+        a memory map; formats audio_io cannot read fall back to a full
+        load_audio_file() decode.
+        
+        With speech regions (given or detected), only the regions are read and
+        analysed: each region is one window (split further when streaming),
+        with SPEECH_GATING_PARAMETERS['margin'] of context on each side. In a
+        bounded extraction mode the regions are cut to their leading
+        max_analysis_seconds.
+        
+        Args:
+            file_path: Path to audio file
+            segments: Optional (start, end) times in seconds to restrict the analysis to
+            detect_speech: Find the speech regions with the energy VAD during the
+                           scan of the file (ignored when segments are given)
+            gating: Optional dict that receives the analysed regions as 'segments'
+            
+        Yields:
+            tuple: (sound, keep_start, keep_end, total_duration, silence_threshold)
+                   where sound is a Parselmouth Sound on the file's absolute time
+                   axis, only analysis frames in [keep_start, keep_end) belong to
+                   this window, and silence_threshold is the pitch silence threshold
+                   that makes the window's voicing decisions match the whole file's
+        """
+        try:
+            audio_file = AudioReader(file_path)
+        except Exception:
+            audio_file = None
+        
+        if audio_file is not None:
+            sr = audio_file.samplerate
+            n_samples = audio_file.frames
+            read_samples = audio_file.read
+        else:
+            audio, sr = self.load_audio_file(file_path)
+            if audio is None:
+                return
+            n_samples = len(audio)
+            
+            def read_samples(start, stop):
+                return audio[start:stop]
+        
+        try:
+            from parselmouth import Sound
+            total_duration = n_samples / sr
+            window = int(round(self.stream_window_seconds * sr)) if self.stream_window_seconds else n_samples
+            margin = int(round(self.stream_margin_seconds * sr))
+            step = PITCH_PARAMETERS['time_step'] * sr
+            step = int(round(step)) if abs(step - round(step)) < 1e-9 else 1
+            remainder = n_samples % step
+            if step > 1 and min(remainder, step - remainder) < step / 4:
+                remainder = (remainder + step // 2) % step
+            
+            # Praat's pitch silence threshold is relative to the peak of the
+            # (mean-removed) sound, so measure the whole file's peak first
+            # (and the VAD frame powers in the same pass)
+            detect_speech = detect_speech and segments is None
+            scan_block = window if self.stream_window_seconds else int(SCAN_BLOCK_SECONDS * sr)
+            if detect_speech:
+                vad_frame = max(1, int(round(SPEECH_GATING_PARAMETERS['frame_length'] * sr)))
+                scan_block = max(vad_frame, scan_block // vad_frame * vad_frame)
+                powers = []
+            total, low, high = 0.0, np.inf, -np.inf
+            for block_start in range(0, n_samples, scan_block):
+                block = read_samples(block_start, min(block_start + scan_block, n_samples))
+                total += float(np.sum(block, dtype=np.float64))
+                low, high = min(low, float(block.min())), max(high, float(block.max()))
+                if detect_speech:
+                    powers.append(frame_powers(block, vad_frame))
+            file_mean = total / n_samples
+            file_peak = max(high - file_mean, file_mean - low)
+            
+            if detect_speech:
+                segments = detect_speech_segments(np.concatenate(powers), vad_frame / sr)
+            if self.max_analysis_seconds is not None:
+                # Bounded mode: only the leading stretch of the recording (or of its speech)
+                segments = leading_segments(segments if segments is not None else [(0.0, total_duration)],
+                                            self.max_analysis_seconds)
+            if segments is None:
+                regions = [(0, n_samples)]
+            else:
+                regions = [(int(round(start * sr)), min(n_samples, int(round(end * sr)))) for start, end in segments]
+                margin = int(round(SPEECH_GATING_PARAMETERS['margin'] * sr))
+                if gating is not None:
+                    gating['segments'] = np.asarray(segments, dtype=np.float64).reshape(-1, 2)
+            
+            for region_start, region_stop in regions:
+                for window_start in range(region_start, region_stop, window):
+                    window_stop = min(window_start + window, region_stop)
+                    read_start = max(0, window_start - margin) // step * step
+                    read_stop = window_stop + margin
+                    read_stop = read_start + int(np.ceil((read_stop - read_start - remainder) / step)) * step + remainder
+                    read_stop = min(n_samples, read_stop)
+                    
+                    samples = read_samples(read_start, read_stop)
+                    window_peak = float(np.max(np.abs(samples - np.mean(samples, dtype=np.float64))))
+                    silence_threshold = 0.03 * file_peak / window_peak if window_peak > 0 else 0.03
+                    
+                    sound = Sound(samples, sampling_frequency=sr, start_time=read_start / sr)
+                    yield sound, window_start / sr, window_stop / sr, total_duration, silence_threshold
+        finally:
+            if audio_file is not None:
+                audio_file.close()
+    
+    def extract_features_streaming(self, file_path, participant_id, segments=None, detect_speech=False):
+        """
+        Extract all frequency features window by window without loading the whole file
+        
+        Each window is analysed with margins and only the pitch frames, glottal
+        pulses and formant samples inside the window are kept. Pitch and formant
+        frames are folded into mergeable accumulators (running_stats), so their
+        summaries need no frame buffers; pitch percentiles carry the sketch's
+        relative error (STREAM_QUANTILE_ACCURACY). Values otherwise agree with
+        whole-file analysis up to window-edge effects (mainly formant bandwidths
+        of near-silent frames); the margin should be longer than a typical
+        voiced stretch.
+        
+        Also used for speech-gated extraction, where the windows are the
+        speech regions and audio outside them is never analysed.
         
         Args:
             file_path: Path to audio file
             participant_id: ID of the participant
+            segments: Optional (start, end) speech regions in seconds to restrict the analysis to
+            detect_speech: Detect the speech regions with the energy VAD
             
         Returns:
             dict: Dictionary containing all extracted features
         """
         features = {'id': participant_id}
+        needs = self.required_analyses()
+        pitch_moments = MomentAccumulator()
+        pitch_quantiles = QuantileSketch(STREAM_QUANTILE_ACCURACY)
+        pitch_trend = LinearTrendAccumulator()
+        frequency_moments = [MomentAccumulator() for _ in range(3)]
+        bandwidth_moments = [MomentAccumulator() for _ in range(3)]
+        energy_accumulator = EnergyAccumulator(STREAM_QUANTILE_ACCURACY)
+        pitch_pieces = []  # (first frame time, frames) per window, for the tremor spectra and tracks
+        pulse_times = []
+        window_tracks = {}  # (first frame, values) per window when saving tracks
+        keep_tracks = self.track_store is not None
+        gating = {}
+        n_windows = 0
+        formant_step = self.formant_parameters['time_step']
+        
+        try:
+            windows = self.iter_audio_windows(file_path, segments, detect_speech, gating)
+            for sound, keep_start, keep_end, total_duration, silence_threshold in windows:
+                if self.profiler is not None:
+                    self.profiler.set_audio_duration(participant_id, total_duration)
+                with AnalysisContext(sound, profiler=self.profiler, file_id=participant_id) as analysis:
+                    # Voiced pitch frames inside the window
+                    if 'pitch' in needs:
+                        with self.profile_stage('pitch', participant_id):
+                            pitch = analysis.get_pitch(silence_threshold=silence_threshold, **PITCH_PARAMETERS)
+                            frame_times = pitch.xs()
+                            frequencies = pitch.selected_array['frequency']
+                            in_window = (frame_times >= keep_start) & (frame_times < keep_end)
+                            keep = in_window & (frequencies != 0)
+                            window_pitch = frequencies[keep]
+                            pitch_moments.update(window_pitch)
+                            pitch_quantiles.update(window_pitch)
+                            pitch_trend.update(window_pitch)
+                            if ('tremor' in self.families or keep_tracks) and np.any(in_window):
+                                pitch_pieces.append((frame_times[in_window][0], frequencies[in_window]))
+                    
+                    # Glottal pulses inside the window
+                    if 'point_process' in needs:
+                        with self.profile_stage('jitter', participant_id):
+                            try:
+                                point_process = analysis.get_point_process(JITTER_PARAMETERS['pitch_floor'],
+                                                                           JITTER_PARAMETERS['pitch_ceiling'],
+                                                                           silence_threshold)
+                                times = self.pulse_times(point_process)
+                                pulse_times.append(times[(times >= keep_start) & (times < keep_end)])
+                            except Exception:
+                                pass
+                    
+                    # Formant samples on the file's formant grid inside the window
+                    if 'formant' in needs:
+                        with self.profile_stage('formant', participant_id):
+                            first = max(0, int(np.floor(keep_start / formant_step)) - 1)
+                            last = int(np.ceil(keep_end / formant_step)) + 1
+                            time_points = formant_step + formant_step * np.arange(first, last)
+                            time_points = time_points[(time_points >= keep_start) & (time_points < keep_end) &
+                                                      (time_points < total_duration)]
+                            formant = analysis.get_formant(**self.formant_parameters)
+                            window_frequencies, window_bandwidths = self.get_formant_tracks(formant, time_points,
+                                                                                            max_formant_number=3)
+                            self.update_formant_moments(frequency_moments, bandwidth_moments,
+                                                        window_frequencies, window_bandwidths)
+                            if keep_tracks and len(time_points) > 0:
+                                first_sample = int(round(time_points[0] / formant_step)) - 1
+                                window_tracks.setdefault('formant_frequency', []).append((first_sample,
+                                                                                         window_frequencies))
+                                window_tracks.setdefault('formant_bandwidth', []).append((first_sample,
+                                                                                         window_bandwidths))
+                    
+                    # Energy frames inside the window
+                    if 'samples' in needs:
+                        sr = sound.sampling_frequency
+                        with self.profile_stage('energy', participant_id):
+                            frame_starts, window_energy = self.energy_extractor.update_accumulator_window(
+                                energy_accumulator, sound.values[0], sr, int(round(sound.xmin * sr)),
+                                int(round(keep_start * sr)), int(round(keep_end * sr)))
+                            if keep_tracks and len(frame_starts) > 0:
+                                hop_samples = self.energy_extractor.frame_sizes(sr)[1]
+                                window_tracks.setdefault('frame_energy', []).append((frame_starts[0] // hop_samples,
+                                                                                    window_energy))
+                n_windows += 1
+            
+            if n_windows == 0:
+                # Nothing could be read, or no speech was found
+                if 'segments' in gating:
+                    print(f"No speech found in {file_path}")
+                return empty_feature_row(participant_id, self.feature_names())
+            
+            merged_pulses = np.concatenate(pulse_times) if pulse_times else np.empty(0)
+            if keep_tracks:
+                window_tracks['pitch'] = pitch_pieces
+                tracks, attributes = self.merge_window_tracks(window_tracks, merged_pulses, sound.sampling_frequency,
+                                                              total_duration)
+                if 'segments' in gating:
+                    attributes['speech_segments'] = gating['segments'].tolist()
+                self.save_tracks(participant_id, tracks, attributes)
+            
+            summaries = {
+                # Jitter on the merged pulse train
+                'jitter': lambda: self.jitter_features_from_pulses(merged_pulses),
+                'pitch': lambda: self.pitch_features_from_summary(pitch_moments, pitch_quantiles.percentile,
+                                                                  pitch_trend.result()),
+                'formant': lambda: self.formant_features_from_moments(frequency_moments, bandwidth_moments),
+                'tremor': lambda: self.tremor_features_from_pitch(self.merged_pitch_track(pitch_pieces)[0]),
+                'energy': lambda: self.energy_extractor.energy_features_from_summary(
+                    energy_accumulator, energy_accumulator.power.percentile),
+            }
+            for name in self.families:
+                with self.profile_stage(name, participant_id):
+                    features.update(summaries[name]())
+            
+        except Exception as e:
+            print(f"Error processing file {file_path}: {str(e)}")
+            for feature_name in self.feature_names():
+                if feature_name not in features:
+                    features[feature_name] = np.nan
+        
+        return features
+    
+    def merged_pitch_track(self, pieces):
+        """
+        Join the per-window pitch frames of a streamed file on the pitch grid
+        
+        Args:
+            pieces: List of (first frame time, frequencies) per window
+            
+        Returns:
+            tuple: (pitch track with 0 for unvoiced or unanalysed frames, time of its first frame)
+        """
+        step = PITCH_PARAMETERS['time_step']
+        pitch_start = float(pieces[0][0]) if pieces else 0.0
+        track = place_on_grid([(int(round((start - pitch_start) / step)), values) for start, values in pieces], 0.0)
+        return track, pitch_start
+    
+    def merge_window_tracks(self, window_tracks, pulse_times, sample_rate, total_duration):
+        """
+        Join the per-window tracks of a streamed file into whole-file tracks
+        
+        Windows are placed on the file's frame grids; frames no window covered
+        (between speech regions) are unvoiced (pitch 0) or undefined (NaN).
+        
+        Args:
+            window_tracks: Dict of track name -> list of (first frame, values) per
+                           window; the first pitch frame is given as a time
+            pulse_times: Merged glottal pulse times
+            sample_rate: Sample rate of the file in Hz
+            total_duration: Duration of the file in seconds
+            
+        Returns:
+            tuple: (tracks, attributes) as expected by TrackStore.save()
+        """
+        needs = self.required_analyses()
+        tracks = {}
+        attributes = {'sample_rate': sample_rate, 'duration': total_duration}
+        
+        if 'pitch' in needs:
+            tracks['pitch'], pitch_start = self.merged_pitch_track(window_tracks.get('pitch', []))
+            attributes.update(pitch_start=pitch_start, pitch_step=PITCH_PARAMETERS['time_step'])
+        if 'point_process' in needs:
+            tracks['pulses'] = pulse_times
+        if 'formant' in needs:
+            for name in ['formant_frequency', 'formant_bandwidth']:
+                tracks[name] = place_on_grid(window_tracks.get(name, []), np.nan, rows=(3,))
+            attributes.update(formant_start=self.formant_parameters['time_step'],
+                              formant_step=self.formant_parameters['time_step'])
+        if 'samples' in needs:
+            tracks['frame_energy'] = place_on_grid(window_tracks.get('frame_energy', []), np.nan)
+        
+        return tracks, attributes
+    
+    def transcript_segments(self, file_path, participant_id):
+        """
+        Participant speech regions from the file's transcript timings
+        
+        Args:
+            file_path: Path to audio file (its directory is searched first)
+            participant_id: ID of the participant
+            
+        Returns:
+            ndarray: (start, end) rows in seconds, or None when there is no
+                     usable transcript (the caller falls back to the VAD)
+        """
+        transcript_path = find_transcript(participant_id, file_path, self.transcript_dirs)
+        if transcript_path is None:
+            return None
+        try:
+            segments = read_transcript_segments(transcript_path)
+        except Exception as e:
+            print(f"Error reading transcript {transcript_path}: {str(e)}")
+            return None
+        if segments_duration(segments) == 0:
+            print(f"No participant speech in transcript {transcript_path}; using voice activity detection")
+            return None
+        return segments
+    
+    def reads_whole_files(self):
+        """Whether files are decoded whole (not read window by window or region by region)"""
+        return not (self.stream_window_seconds or self.speech_gating is not None or
+                    self.max_analysis_seconds is not None)
+    
+    def extract_features_single_file(self, file_path, participant_id, audio=None):
+        """
+        Extract all frequency features from a single audio file
         
-        # Define all expected feature names
-        all_feature_names = [
-            'ddp_jitter', 'f0_range', 'f1_bandwidth_mean', 'f1_bandwidth_sd', 'f1_frequency_mean', 'f1_frequency_sd',
-            'f2_bandwidth_mean', 'f2_bandwidth_sd', 'f2_frequency_mean', 'f2_frequency_sd',
-            'f3_bandwidth_mean', 'f3_bandwidth_sd', 'f3_frequency_mean', 'f3_frequency_sd',
-            'jitter_local_mean', 'jitter_local_sd', 'local_absolute_jitter', 'pitch_coefficient_of_variation',
-            'pitch_first_quartile', 'pitch_kurtosis', 'pitch_linear_regression_mse', 'pitch_linear_regression_offset',
-            'pitch_linear_regression_slope', 'pitch_max', 'pitch_mean', 'pitch_min', 'pitch_percentile_1',
-            'pitch_percentile_20', 'pitch_percentile_20_80_range', 'pitch_percentile_80', 'pitch_percentile_99',
-            'pitch_percentile_1_99_range', 'pitch_q2_q1_range', 'pitch_q3_q1_range', 'pitch_q3_q2_range',
-            'pitch_range', 'pitch_second_quartile', 'pitch_skewness', 'pitch_std', 'pitch_third_quartile',
-            'ppq5_jitter', 'rap_jitter', 'vocal_tremor'
-        ]
+        Args:
+            file_path: Path to audio file
+            participant_id: ID of the participant
+            audio: Optional (audio_data, sample_rate) already decoded from the file
+                   (e.g. prefetched); ignored when files are read in windows
+            
+        Returns:
+            dict: Dictionary containing all extracted features
+        """
+        if self.speech_gating is not None or self.max_analysis_seconds is not None:
+            # Only the participant's speech regions (and in bounded mode only
+            # their leading part) are read and analysed
+            segments = None
+            if self.speech_gating == 'transcript':
+                segments = self.transcript_segments(file_path, participant_id)
+            return self.extract_features_streaming(file_path, participant_id, segments=segments,
+                                                   detect_speech=self.speech_gating is not None and segments is None)
+        if self.stream_window_seconds:
+            return self.extract_features_streaming(file_path, participant_id)
+        
+        features = {'id': participant_id}
         
         try:
-            # Load audio
-            audio, sr = self.load_audio_file(file_path)
+            # Load audio (unless it was prefetched)
+            if audio is None:
+                with self.profile_stage('load_audio', participant_id):
+                    audio = self.load_audio_file(file_path)
+            audio, sr = audio
             if audio is None:
                 # Return NaN features if loading failed
-                for feature_name in all_feature_names:
+                for feature_name in self.feature_names():
                     features[feature_name] = np.nan
                 return features
             
             # Create Parselmouth Sound object
-            sound = parselmouth.Sound(audio, sampling_frequency=sr)
-            
-            # Extract jitter features
-            jitter_features = self.extract_jitter_features(sound)
-            features.update(jitter_features)
-            
-            # Extract pitch features
-            pitch_features = self.extract_pitch_features(sound)
-            features.update(pitch_features)
-            
-            # Extract formant features
-            formant_features = self.extract_formant_features(sound)
-            features.update(formant_features)
+            from parselmouth import Sound
+            sound = Sound(audio, sampling_frequency=sr)
             
-            # Extract vocal tremor
-            tremor_features = self.extract_vocal_tremor(sound)
-            features.update(tremor_features)
+            # Intermediate Praat objects are built on first use and shared by
+            # the selected families; analyses no family needs are never run
+            if self.profiler is not None:
+                self.profiler.set_audio_duration(participant_id, len(audio) / sr)
+            with AnalysisContext(sound, samples=audio, profiler=self.profiler, file_id=participant_id) as analysis:
+                for name in self.families:
+                    with self.profile_stage(name, participant_id):
+                        features.update(FEATURE_FAMILIES[name].extract(self, sound, analysis))
+                
+                # Frame-level tracks behind the features, for re-analysis without audio
+                if self.track_store is not None:
+                    self.save_tracks(participant_id, *self.tracks_from_analysis(sound, analysis))
             
         except Exception as e:
             print(f"Error processing file {file_path}: {str(e)}")
             # Return NaN features if processing failed
-            for feature_name in all_feature_names:
+            for feature_name in self.feature_names():
                 if feature_name not in features:
                     features[feature_name] = np.nan
         
         return features
+    
+    def feature_names(self):
+        """Names of all features this extractor outputs (besides 'id')"""
+        return [feature_name for name in self.families for feature_name in FEATURE_FAMILIES[name].feature_names]
+    
+    def required_analyses(self):
+        """Intermediate analyses needed by the selected feature families"""
+        return set().union(*(FEATURE_FAMILIES[name].requires for name in self.families))
+    
+    def extraction_parameters(self, mode=None):
+        """
+        Parameters that determine the extracted feature values
+        
+        Used by the feature store to re-extract files when settings change.
+        
+        Args:
+            mode: Extraction mode the values were produced in (None for self.mode),
+                  e.g. a cheaper mode a supervised run fell back to
+        
+        Returns:
+            dict: JSON-serialisable description of the extraction settings
+        """
+        mode = mode or self.mode
+        parameters = {
+            'feature_set_version': FEATURE_SET_VERSION,
+            'feature_names': self.feature_names(),
+            'pitch': PITCH_PARAMETERS,
+            'jitter': JITTER_PARAMETERS,
+            'formant': dict(FORMANT_PARAMETERS, time_step=EXTRACTION_MODES[mode]['formant_time_step']),
+            'tremor_band_hz': list(TREMOR_BAND_HZ),
+            'tremor': TREMOR_PARAMETERS,
+            'feature_units': {name: unit for name, unit in FEATURE_UNITS.items() if name in self.feature_names()},
+        }
+        if 'energy' in self.families:
+            parameters['energy'] = ENERGY_PARAMETERS
+        if mode != 'full':
+            parameters['mode'] = dict(EXTRACTION_MODES[mode], name=mode)
+        if self.speech_gating:
+            parameters['speech_gating'] = dict(SPEECH_GATING_PARAMETERS, mode=self.speech_gating)
+        if self.stream_window_seconds:
+            parameters['stream'] = {'window_seconds': self.stream_window_seconds,
+                                    'margin_seconds': self.stream_margin_seconds,
+                                    'quantile_accuracy': STREAM_QUANTILE_ACCURACY}
+        return parameters
+    
+    def worker_config(self):
+        """Constructor arguments for the extractor instances running in pool workers"""
+        return {'max_workers': 1, 'chunk_size': self.chunk_size,
+                'stream_window_seconds': self.stream_window_seconds,
+                'stream_margin_seconds': self.stream_margin_seconds,
+                'families': self.families,
+                'profile': self.profiler is not None,
+                'track_dir': self.track_store.root if self.track_store is not None else None,
+                'speech_gating': self.speech_gating,
+                'transcript_dirs': self.transcript_dirs,
+                'mode': self.mode,
+                'prefetch_bytes': self.prefetch_bytes,
+                'prefetch_threads': self.prefetch_threads}
+    
+    def extract_chunk(self, chunk):
+        """
+        Extract features for a chunk of files, isolating failures per file
+        
+        Args:
+            chunk: List of (file_path, participant_id) tuples
+            
+        Returns:
+            list: One feature dictionary per file (NaN row for failed files)
+        """
+        results = []
+        prefetcher = None
+        if self.prefetch_bytes and self.reads_whole_files() and len(chunk) > 1:
+            # Upcoming files are decoded while the current one is analysed
+            prefetcher = Prefetcher(chunk, lambda item: self.load_audio_file(item[0]), self.prefetch_bytes,
+                                    self.prefetch_threads)
+        try:
+            for file_path, participant_id in chunk:
+                try:
+                    with self.profile_stage('total', participant_id):
+                        audio = None
+                        if prefetcher is not None:
+                            # Time spent waiting on storage despite the prefetching
+                            with self.profile_stage('load_audio', participant_id):
+                                _, audio = next(prefetcher)
+                        results.append(self.extract_features_single_file(file_path, participant_id, audio))
+                except Exception as e:
+                    print(f"  ❌ Error processing ID {participant_id}: {str(e)}")
+                    results.append(empty_feature_row(participant_id, self.feature_names()))
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+        return results
+    
+    def iter_extract_many(self, files, headers=None):
+        """
+        Extract features for many files on a process pool, yielding results as they finish
+        
+        Durations and sample rates are taken from headers, and read from the
+        file headers up front for files missing there (scheduling.py). Files are grouped into chunks of similar total
+        duration, longest files first, and the chunks are dispatched longest
+        first so no long recording is left running alone at the end. There
+        are as many chunks as chunks of chunk_size files would make, and at
+        least four per worker. A chunk only starts while the estimated peak
+        memory of the running chunks fits memory_budget(), and the pool has
+        no more workers than typical chunks fit in the budget.
+        
+        A worker that dies (killed by the OS, or a crash inside Praat) fails
+        every chunk on the pool. The pool is then rebuilt and the interrupted
+        chunks re-run one at a time; a chunk that kills its worker again is
+        split into single files, so only the file that crashes gets a NaN row.
+        
+        Args:
+            files: Iterable of (file_path, participant_id) tuples
+            headers: Optional {file_path: header} already known (e.g. from the
+                     audio manifest, see find_audio_files_for_lexical_ids())
+            
+        Yields:
+            dict: Feature dictionary for each file, in completion order
+        """
+        files = list(files)
+        if not files:
+            return
+        
+        headers, n_unknown = read_headers([file_path for file_path, _ in files], known=headers)
+        estimates = [self.file_estimate(header) for header in headers]
+        chunk_size = max(1, min(self.chunk_size, len(files) // (self.max_workers * 4)))
+        prefetching = self.prefetch_bytes and self.reads_whole_files()
+        chunks = []
+        for indices in balanced_chunks([seconds for seconds, _ in estimates], -(-len(files) // chunk_size)):
+            memory_mb = max(estimates[index][1] for index in indices)
+            if prefetching and len(indices) > 1:
+                # Buffered audio plus the files being decoded (float64 samples)
+                samples = max(headers[index]['duration'] * headers[index]['sample_rate'] for index in indices)
+                memory_mb += (self.prefetch_bytes + self.prefetch_threads * samples * 8) / 2 ** 20
+            chunks.append(([files[index] for index in indices], memory_mb))
+        
+        if self.max_workers <= 1:
+            for chunk, _ in chunks:
+                yield from self.extract_chunk(chunk)
+            return
+        
+        budget_mb = self.memory_budget()
+        n_workers = pool_size(self.max_workers, budget_mb, [memory_mb for _, memory_mb in chunks])
+        queue = AdmissionQueue(budget_mb - n_workers * WORKER_BASELINE_MB)
+        for chunk, memory_mb in chunks:
+            queue.push(chunk, memory_mb)
+        print(f"  Scheduled {sum(seconds for seconds, _ in estimates) / 3600:.1f} h of audio in {len(chunks)} chunks, "
+              f"longest first, on {n_workers} worker processes within {budget_mb:.0f} MB"
+              f"{f' ({n_unknown} headers unreadable)' if n_unknown else ''}")
+        
+        suspects = deque()  # Chunks that were on the pool when a worker died
+        running = {}
+        executor = self.extraction_pool(n_workers)
+        
+        def start(chunk, memory_mb, alone):
+            try:
+                running[executor.submit(extract_chunk_in_worker, chunk)] = (chunk, memory_mb, alone)
+                return True
+            except BrokenProcessPool:
+                return False
+        
+        try:
+            while queue or suspects or running:
+                broken = False
+                if suspects:
+                    # A dead worker fails every chunk on the pool, so those are re-run
+                    # one at a time to find the file that kills its worker
+                    if not running:
+                        broken = not start(*suspects[0], True)
+                        if not broken:
+                            suspects.popleft()
+                else:
+                    while len(running) < n_workers:
+                        admitted = queue.pop()
+                        if admitted is None:
+                            break
+                        if not start(*admitted, False):
+                            queue.requeue(*admitted)
+                            broken = True
+                            break
+                
+                interrupted = 0
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    if broken or any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                        broken = True
+                        done, _ = wait(running)
+                    for future in done:
+                        chunk, memory_mb, alone = running.pop(future)
+                        if not alone:
+                            queue.finished(memory_mb)
+                        participant_ids = [participant_id for _, participant_id in chunk]
+                        try:
+                            results, records = future.result()
+                            if self.profiler is not None:
+                                self.profiler.add_records(records)
+                        except BrokenProcessPool:
+                            if not alone:
+                                suspects.append((chunk, memory_mb))
+                                interrupted += 1
+                                continue
+                            if len(chunk) > 1:
+                                suspects.extendleft(([file], memory_mb / len(chunk)) for file in reversed(chunk))
+                                continue
+                            # Killed by the OS (e.g. out of memory) or crashed inside Praat
+                            print(f"  ❌ Worker died on IDs {participant_ids}")
+                            results = [empty_feature_row(participant_id, self.feature_names())
+                                       for participant_id in participant_ids]
+                        except Exception as e:
+                            print(f"  ❌ Worker failed on IDs {participant_ids}: {str(e)}")
+                            results = [empty_feature_row(participant_id, self.feature_names())
+                                       for participant_id in participant_ids]
+                        yield from results
+                
+                if broken:
+                    if interrupted > 0:
+                        print(f"  ⚠ A worker process died; restarting the pool and re-running "
+                              f"{interrupted} interrupted chunks one at a time")
+                    executor.shutdown()
+                    executor = self.extraction_pool(n_workers)
+        finally:
+            executor.shutdown()
+    
+    def extraction_pool(self, n_workers):
+        """Process pool whose workers each hold an extractor configured like this one"""
+        return ProcessPoolExecutor(max_workers=n_workers, initializer=init_extraction_worker,
+                                   initargs=(self.worker_config(),))
+    
+    def extract_many(self, files):
+        """
+        Extract features for many files on a process pool
+        
+        Args:
+            files: Iterable of (file_path, participant_id) tuples
+            
+        Returns:
+            list: Feature dictionaries sorted by participant id
+        """
+        return sorted(self.iter_extract_many(files), key=lambda features: features['id'])
+    
+    def iter_extract_supervised(self, files, time_limit=None, memory_limit_mb=None, headers=None):
+        """
+        Extract features with a wall-clock and memory budget per file, yielding results as they finish
+        
+        Each of max_workers processes runs one file at a time under
+        supervision (supervision.py). A worker whose file runs longer than
+        time_limit or grows beyond memory_limit_mb, or that dies, is killed
+        and replaced, and the file is retried in the next cheaper extraction
+        mode (EXTRACTION_MODES). Files over budget in every mode get a NaN row.
+        Every row records the mode that produced it in 'extraction_mode'
+        ('failed' for NaN rows of files no mode could finish). Files are
+        dispatched longest first, and each attempt only starts while the
+        estimated memory of the running ones fits memory_budget()
+        (scheduling.py), with its estimate for the mode it runs in.
+        
+        Args:
+            files: Iterable of (file_path, participant_id) tuples
+            time_limit: Wall-clock seconds per file and attempt (None for no limit)
+            memory_limit_mb: Worker resident memory limit in MB (None for no limit)
+            headers: Optional {file_path: header} already known (see iter_extract_many())
+            
+        Yields:
+            dict: Feature dictionary for each file, in completion order
+        """
+        modes = list(EXTRACTION_MODES)
+        modes = modes[modes.index(self.mode):]
+        reasons = {'timeout': f"exceeded {time_limit}s", 'memory': f"exceeded {memory_limit_mb} MB",
+                   'died': "worker died", 'error': "failed"}
+        
+        files = list(files)
+        if not files:
+            return
+        headers, _ = read_headers([file_path for file_path, _ in files], known=headers)
+        file_headers = {participant_id: header for (_, participant_id), header in zip(files, headers)}
+        estimates = [self.file_estimate(header, modes[0]) for header in headers]
+        budget_mb = self.memory_budget()
+        n_workers = pool_size(self.max_workers, budget_mb, [memory_mb for _, memory_mb in estimates])
+        
+        with SupervisedPool(extract_file_in_worker, max_workers=n_workers, time_limit=time_limit,
+                            memory_limit_mb=memory_limit_mb, initializer=init_extraction_worker,
+                            initargs=(self.worker_config(),),
+                            memory_budget_mb=budget_mb - n_workers * WORKER_BASELINE_MB) as pool:
+            for index in sorted(range(len(files)), key=lambda index: -estimates[index][0]):
+                file_path, participant_id = files[index]
+                pool.submit(participant_id, (file_path, participant_id, modes[0]), estimates[index][1])
+            
+            for participant_id, (file_path, _, mode), status, result in pool.results():
+                if status == 'ok':
+                    features, records = result
+                    if self.profiler is not None:
+                        self.profiler.add_records(records)
+                    features['extraction_mode'] = mode
+                    yield features
+                    continue
+                
+                next_mode = modes.index(mode) + 1
+                if status != 'error' and next_mode < len(modes):
+                    print(f"  ⏱ ID {participant_id}: {reasons[status]} in mode '{mode}', "
+                          f"retrying in mode '{modes[next_mode]}'")
+                    pool.submit(participant_id, (file_path, participant_id, modes[next_mode]),
+                                self.file_estimate(file_headers[participant_id], modes[next_mode])[1])
+                    continue
+                
+                print(f"  ❌ ID {participant_id}: {reasons[status]} in mode '{mode}'"
+                      f"{': ' + result if status == 'error' else ''}")
+                features = empty_feature_row(participant_id, self.feature_names())
+                features['extraction_mode'] = 'failed'
+                yield features
+    
+    def features_from_stored_tracks(self, tracks, families=None):
+        """
+        Recompute the selected families' features from stored tracks without decoding audio
+        
+        Args:
+            tracks: FeatureTracks loaded from a TrackStore
+            families: Families to recompute (None for all selected families)
+            
+        Returns:
+            dict: Feature dictionary (NaN for families whose tracks were not stored)
+        """
+        features = {'id': tracks.participant_id}
+        for name in (self.families if families is None else families):
+            family = FEATURE_FAMILIES[name]
+            try:
+                missing = [track for analysis in sorted(family.requires) for track in ANALYSIS_TRACKS[analysis]
+                           if track not in tracks]
+                if missing:
+                    raise ValueError(f"tracks not stored: {', '.join(missing)}")
+                features.update(family.from_tracks(self, tracks))
+            except Exception as e:
+                print(f"Error recomputing {name} features for ID {tracks.participant_id}: {str(e)}")
+                for feature_name in family.feature_names:
+                    features[feature_name] = np.nan
+        return features
+    
+    def recompute_from_tracks(self, participant_ids=None):
+        """
+        Recompute features for participants in the track store
+        
+        Lets feature definitions be changed and re-evaluated on the stored
+        tracks instead of re-running the Praat analyses.
+        
+        Args:
+            participant_ids: IDs to recompute (None for every stored participant)
+            
+        Returns:
+            list: Feature dictionaries sorted by participant id
+        """
+        if self.track_store is None:
+            raise ValueError("Recomputing features from tracks needs a track_dir")
+        for name in self.families:
+            if FEATURE_FAMILIES[name].from_tracks is None:
+                raise ValueError(f"Feature family '{name}' cannot be computed from stored tracks")
+        
+        if participant_ids is None:
+            participant_ids = self.track_store.participant_ids()
+        stored = [self.track_store.load(participant_id) for participant_id in participant_ids]
+        
+        # Tremor spectra of all participants are computed as one batch
+        batch_tremor = 'tremor' in self.families and all('pitch' in tracks for tracks in stored)
+        families = [name for name in self.families if not (batch_tremor and name == 'tremor')]
+        results = [self.features_from_stored_tracks(tracks, families) for tracks in stored]
+        if batch_tremor:
+            amplitudes, _, voiced_seconds = vocal_tremor([tracks['pitch'] for tracks in stored],
+                                                         1.0 / PITCH_PARAMETERS['time_step'],
+                                                         TREMOR_BAND_HZ, **TREMOR_PARAMETERS)
+            for features, amplitude, seconds in zip(results, amplitudes, voiced_seconds):
+                features['vocal_tremor'] = amplitude
+                features['vocal_tremor_voiced_seconds'] = seconds
+            results = [{key: features[key] for key in ['id'] + self.feature_names()} for features in results]
+        return sorted(results, key=lambda features: features['id'])
+
+# Built-in feature families
+register_feature_family(FeatureFamily(
+    'jitter', JITTER_FEATURE_NAMES, ['point_process'], FrequencyFeatureExtractor.extract_jitter_features,
+    streamable=True,
+    from_tracks=lambda extractor, tracks: extractor.jitter_features_from_pulses(tracks['pulses'])))
+register_feature_family(FeatureFamily(
+    'pitch', PITCH_FEATURE_NAMES, ['pitch'], FrequencyFeatureExtractor.extract_pitch_features,
+    streamable=True,
+    from_tracks=lambda extractor, tracks: extractor.pitch_features_from_values(tracks.voiced_pitch())))
+register_feature_family(FeatureFamily(
+    'formant', FORMANT_FEATURE_NAMES, ['formant'], FrequencyFeatureExtractor.extract_formant_features,
+    streamable=True,
+    from_tracks=lambda extractor, tracks: extractor.formant_features_from_tracks(tracks['formant_frequency'],
+                                                                                 tracks['formant_bandwidth'])))
+register_feature_family(FeatureFamily(
+    'tremor', TREMOR_FEATURE_NAMES, ['pitch'], FrequencyFeatureExtractor.extract_vocal_tremor,
+    streamable=True,
+    from_tracks=lambda extractor, tracks: extractor.tremor_features_from_pitch(tracks['pitch'])))
+register_feature_family(FeatureFamily(
+    'energy', ENERGY_FEATURE_NAMES, ['samples'], FrequencyFeatureExtractor.extract_energy_features,
+    streamable=True,
+    from_tracks=lambda extractor, tracks: extractor.energy_extractor.energy_features_from_frames(
+        tracks['frame_energy'], tracks.attributes['sample_rate'])))
+
+# Extractor instance owned by each pool worker process
+_worker_extractor = None
+
+def init_extraction_worker(extractor_kwargs):
+    """Process pool initializer: build one extractor per worker process"""
+    global _worker_extractor
+    _worker_extractor = FrequencyFeatureExtractor(**extractor_kwargs)
+
+def extract_chunk_in_worker(chunk):
+    """Process pool task: extract one chunk with the worker's extractor (returns results and profile records)"""
+    results = _worker_extractor.extract_chunk(chunk)
+    records = _worker_extractor.profiler.drain() if _worker_extractor.profiler is not None else []
+    return results, records
+
+def extract_file_in_worker(file_path, participant_id, mode):
+    """Supervised task: extract one file in the given extraction mode (returns features and profile records)"""
+    if _worker_extractor.mode != mode:
+        init_extraction_worker(dict(_worker_extractor.worker_config(), mode=mode))
+    results, records = extract_chunk_in_worker([(file_path, participant_id)])
+    return results[0], records
 
 def find_lexical_richness_file():
     """
@@ -446,58 +1690,80 @@ def find_lexical_richness_file():
     
     return None
 
-def find_audio_files_for_lexical_ids(lexical_ids):
+def find_audio_files_for_lexical_ids(lexical_ids, audio_dirs=AUDIO_DIRS, manifest_path=None,
+                                     id_patterns=DEFAULT_ID_PATTERNS, headers=None):
     """
     Find audio files that match the IDs from lexical richness data
     
+    The audio directories are indexed in a persistent manifest (audio_index.py),
+    so later runs only re-list directories that changed.
+    
     Args:
         lexical_ids: Set of participant IDs from lexical richness data
+        audio_dirs: Directories to search (recursively)
+        manifest_path: Path to the SQLite manifest (None for a default next to the outputs)
+        id_patterns: Regular expressions extracting the participant ID from the file path
+        headers: Optional dict filled with {file_path: header} of the returned
+                 files, as stored in the manifest (None for unreadable headers)
         
     Returns:
         dict: Dictionary mapping participant_id to file_path
     """
-    audio_files_dict = {}
-    
-    # Search in the audio directory
-    audio_dir = '/kaggle/input/all-audio/All_AUDIO'
+    if manifest_path is None:
+        manifest_path = 'audio_manifest.sqlite'
+        if os.path.isdir('/kaggle/working'):
+            manifest_path = os.path.join('/kaggle/working', manifest_path)
     
-    if os.path.exists(audio_dir):
-        print(f"Searching for audio files in: {audio_dir}")
+    with AudioManifest(manifest_path, id_patterns=id_patterns) as manifest:
+        existing_dirs = [audio_dir for audio_dir in audio_dirs if os.path.exists(audio_dir)]
+        for audio_dir in existing_dirs:
+            print(f"Searching for audio files in: {audio_dir}")
         
-        try:
-            files_in_dir = os.listdir(audio_dir)
-            audio_files_found = [f for f in files_in_dir if f.lower().endswith(('.wav', '.mp3', '.m4a', '.flac'))]
-            
-            print(f"  Found {len(audio_files_found)} audio files in directory")
-            
-            for file in audio_files_found:
-                try:
-                    # Extract participant ID from filename
-                    if '_' in file:
-                        participant_id = int(file.split('_')[0])
-                    elif '.' in file:
-                        participant_id = int(file.split('.')[0])
-                    else:
-                        continue
-                        
-                    # Only include if it's in our lexical richness IDs
-                    if participant_id in lexical_ids:
-                        file_path = os.path.join(audio_dir, file)
-                        audio_files_dict[participant_id] = file_path
-                        
-                except ValueError:
-                    # Skip files that don't have numeric IDs
-                    continue
-                    
-        except Exception as e:
-            print(f"  Error searching in {audio_dir}: {e}")
+        start = time.time()
+        scan = manifest.update(existing_dirs)
+        print(f"  Indexed in {time.time() - start:.1f}s: {scan['directories_listed']} directories listed, "
+              f"{scan['directories_reused']} unchanged | {scan['added']} files added, "
+              f"{scan['changed']} changed, {scan['removed']} removed")
+        print(f"  Found {len(manifest.entries())} audio files with participant IDs")
+        
+        audio_files_dict, duplicates = manifest.files_by_id(lexical_ids)
+        if headers is not None:
+            headers.update(manifest.headers(audio_files_dict.values()))
+    
+    if duplicates:
+        print(f"  Warning: {len(duplicates)} participant IDs match several audio files; using the longest recording")
+        for participant_id, paths in list(duplicates.items())[:5]:
+            print(f"    {participant_id}: {', '.join(os.path.basename(path) for path in paths)}")
     
     return audio_files_dict
 
-def main():
+def main(export_csv=True, save_tracks=False, speech_gating=None, file_time_limit=None, file_memory_limit_mb=None,
+         prefetch_mb=None, memory_budget_mb=None, profile=False, energy_features=False):
     """
     Main function to orchestrate the frequency feature extraction process
+    
+    Args:
+        export_csv: Also export the features as CSV next to the Parquet output
+        save_tracks: Also save the frame-level pitch, formant, pulse and energy
+                     tracks (feature_tracks.py) in frequency_tracks/
+        speech_gating: Restrict the analyses to participant speech: 'vad' or
+                       'transcript' (see FrequencyFeatureExtractor), None for whole recordings
+        file_time_limit: Supervise the workers and give each file this many
+                         wall-clock seconds per attempt; files over budget are
+                         retried in cheaper modes (see iter_extract_supervised)
+        file_memory_limit_mb: Supervise the workers with this memory budget per file
+        prefetch_mb: Let each worker decode its next files while analysing the
+                     current one, buffering at most this much audio (MB)
+        memory_budget_mb: Memory the workers may be projected to use together;
+                          files only start while their estimated peaks fit
+                          (None for a share of the available memory)
+        profile: Time every extraction stage and save the per-stage report
+                 (frequency_features_profile.json/.csv) next to the outputs
+        energy_features: Also extract the energy family (ENERGY_FEATURE_NAMES)
+                         on top of DEFAULT_FEATURE_FAMILIES
     """
+    import pandas as pd
+    
     print("Frequency Feature Extraction Script")
     print("=" * 60)
     
@@ -529,7 +1795,8 @@ def main():
     print("=" * 60)
     
     # Find audio files that match lexical richness IDs
-    audio_files_dict = find_audio_files_for_lexical_ids(lexical_ids)
+    file_headers = {}
+    audio_files_dict = find_audio_files_for_lexical_ids(lexical_ids, headers=file_headers)
     
     if not audio_files_dict:
         print("No matching audio files found!")
@@ -541,7 +1808,7 @@ def main():
     # Convert to list of tuples for processing
     audio_files_info = [(file_path, participant_id) for participant_id, file_path in audio_files_dict.items()]
     
-    # Sort by participant ID for consistent processing
+    # Sorted by participant ID for the listing; extraction dispatches them longest first
     audio_files_info.sort(key=lambda x: x[1])
     
     print(f"\nWill process {len(audio_files_info)} files:")
@@ -560,89 +1827,123 @@ def main():
     print("STARTING FREQUENCY FEATURE EXTRACTION")
     print("=" * 60)
     
-    extractor = FrequencyFeatureExtractor(max_workers=2, chunk_size=5)
+    output_dir = '/kaggle/working' if os.path.isdir('/kaggle/working') else '.'
+    track_dir = os.path.join(output_dir, 'frequency_tracks') if save_tracks else None
+    families = list(DEFAULT_FEATURE_FAMILIES) + (['energy'] if energy_features else [])
+    extractor = FrequencyFeatureExtractor(max_workers=None, chunk_size=5, families=families, profile=profile,
+                                          track_dir=track_dir, speech_gating=speech_gating,
+                                          transcript_dirs=AUDIO_DIRS,
+                                          prefetch_bytes=prefetch_mb * 2 ** 20 if prefetch_mb else None,
+                                          memory_budget_mb=memory_budget_mb)
+    
+    # Skip files already in the feature store with the same audio and parameters
+    store_path = 'frequency_features_store.sqlite'
+    if os.path.isdir('/kaggle/working'):
+        store_path = os.path.join('/kaggle/working', store_path)
+    store = FeatureStore(store_path)
+    parameters = extractor.extraction_parameters()
+    pending_files = store.pending(audio_files_info, parameters)
+    if extractor.track_store is not None:
+        # Stored features without saved tracks are extracted again for their tracks
+        pending_ids = {participant_id for _, participant_id in pending_files}
+        pending_files += [(file_path, participant_id) for file_path, participant_id in audio_files_info
+                          if participant_id not in pending_ids and participant_id not in extractor.track_store]
+    file_paths = {participant_id: file_path for file_path, participant_id in audio_files_info}
     
-    # Extract features sequentially for better error handling
-    all_features = []
+    print(f"Feature store: {store_path}")
+    print(f"  {len(audio_files_info) - len(pending_files)} files already extracted, {len(pending_files)} to process")
     
-    print(f"Processing {len(audio_files_info)} files...")
+    # Columnar output: rows are appended in row groups as they complete,
+    # starting with the ones already in the feature store
+    parquet_filename = os.path.join(output_dir, 'frequency_features.parquet')
+    id_type = 'int64' if all(isinstance(participant_id, (int, np.integer)) for participant_id in file_paths) else 'string'
+    pending_ids = {participant_id for _, participant_id in pending_files}
+    supervised = file_time_limit is not None or file_memory_limit_mb is not None
+    stored_features = store.load(set(file_paths) - pending_ids)
+    for features in stored_features:
+        # Only rows extracted in the extractor's own mode count as done
+        features.setdefault('extraction_mode', extractor.mode)
+    try:
+        writer = ParquetFeatureWriter(parquet_filename, extractor.feature_names(), id_type=id_type,
+                                      row_group_size=500, metadata={'extraction_parameters': parameters},
+                                      label_columns=['extraction_mode'])
+        writer.write_many(stored_features)
+        collected_features = None
+    except ImportError:
+        print("pyarrow is not installed; features are kept in memory and exported as CSV only")
+        writer = None
+        collected_features = stored_features
+        export_csv = True
+    
+    # Extract features on a process pool; each row is checkpointed as it finishes
+    
+    print(f"Processing {len(pending_files)} files with {extractor.max_workers} worker processes...")
     print("Extracting: Pitch, Jitter, Formants, and Vocal Tremor features...")
     start_time = time.time()
     
-    for i, (file_path, participant_id) in enumerate(audio_files_info):
-        print(f"Processing file {i+1}/{len(audio_files_info)}: ID {participant_id}")
-        
-        # Memory check
-        extractor.memory_monitor()
-        
-        try:
-            features = extractor.extract_features_single_file(file_path, participant_id)
-            all_features.append(features)
+    if supervised:
+        print(f"Supervised: {file_time_limit}s and {file_memory_limit_mb} MB per file, "
+              f"then modes {', '.join(list(EXTRACTION_MODES)[1:])}")
+        results = extractor.iter_extract_supervised(pending_files, file_time_limit, file_memory_limit_mb,
+                                                    headers=file_headers)
+    else:
+        results = extractor.iter_extract_many(pending_files, headers=file_headers)
+    try:
+        for i, features in enumerate(results):
+            # Failed rows are not stored (so they are retried next run) but are in this run's output.
+            # Rows from a cheaper mode are stored under that mode's parameters, so they
+            # do not count as done and are retried at full fidelity on the next run.
+            mode = features.setdefault('extraction_mode', extractor.mode)
+            row_parameters = parameters if mode in (extractor.mode, 'failed') else extractor.extraction_parameters(mode)
+            store.put(features, file_paths[features['id']], row_parameters)
+            if writer is not None:
+                writer.write(features)
+            else:
+                collected_features.append(features)
             
             # Show progress every 20 files
             if (i + 1) % 20 == 0:
                 elapsed = time.time() - start_time
                 avg_time = elapsed / (i + 1)
-                remaining = avg_time * (len(audio_files_info) - (i + 1))
-                print(f"  Progress: {i+1}/{len(audio_files_info)} files | Avg: {avg_time:.1f}s/file | ETA: {remaining/60:.1f} min")
-                
-        except Exception as e:
-            print(f"  ❌ Error processing ID {participant_id}: {str(e)}")
-            # Add empty feature set for failed files
-            empty_features = {'id': participant_id}
-            all_feature_names = [
-                'ddp_jitter', 'f0_range', 'f1_bandwidth_mean', 'f1_bandwidth_sd', 'f1_frequency_mean', 'f1_frequency_sd',
-                'f2_bandwidth_mean', 'f2_bandwidth_sd', 'f2_frequency_mean', 'f2_frequency_sd',
-                'f3_bandwidth_mean', 'f3_bandwidth_sd', 'f3_frequency_mean', 'f3_frequency_sd',
-                'jitter_local_mean', 'jitter_local_sd', 'local_absolute_jitter', 'pitch_coefficient_of_variation',
-                'pitch_first_quartile', 'pitch_kurtosis', 'pitch_linear_regression_mse', 'pitch_linear_regression_offset',
-                'pitch_linear_regression_slope', 'pitch_max', 'pitch_mean', 'pitch_min', 'pitch_percentile_1',
-                'pitch_percentile_20', 'pitch_percentile_20_80_range', 'pitch_percentile_80', 'pitch_percentile_99',
-                'pitch_percentile_1_99_range', 'pitch_q2_q1_range', 'pitch_q3_q1_range', 'pitch_q3_q2_range',
-                'pitch_range', 'pitch_second_quartile', 'pitch_skewness', 'pitch_std', 'pitch_third_quartile',
-                'ppq5_jitter', 'rap_jitter', 'vocal_tremor'
-            ]
-            for feature_name in all_feature_names:
-                empty_features[feature_name] = np.nan
-            all_features.append(empty_features)
-            continue
+                remaining = avg_time * (len(pending_files) - (i + 1))
+                print(f"  Progress: {i+1}/{len(pending_files)} files | Avg: {avg_time:.1f}s/file | ETA: {remaining/60:.1f} min")
+    finally:
+        store.close()
+        if writer is not None:
+            writer.close()
     
     end_time = time.time()
     total_time = end_time - start_time
     
-    if not all_features:
+    if (writer.rows_written if writer is not None else len(collected_features)) == 0:
         print("No features were extracted!")
         return None
     
-    # Convert to DataFrame
-    print(f"\nCreating DataFrame from {len(all_features)} feature sets...")
-    features_df = pd.DataFrame(all_features)
-    
-    # Sort by ID for consistency
-    features_df = features_df.sort_values('id').reset_index(drop=True)
+    # Load the results (sorted by ID) for the summary and CSV export
+    if writer is not None:
+        print(f"\nFeatures saved to: {parquet_filename} ({writer.rows_written} rows, float32 columns)")
+        features_df = read_features(parquet_filename)
+    else:
+        features_df = pd.DataFrame(collected_features).sort_values('id').reset_index(drop=True)
     
     # Display summary
     print("\n" + "=" * 60)
     print("EXTRACTION RESULTS")
     print("=" * 60)
     print(f"Total processing time: {total_time/60:.1f} minutes")
-    print(f"Average time per file: {total_time/len(audio_files_info):.1f} seconds")
+    print(f"Average time per file: {total_time/max(len(pending_files), 1):.1f} seconds")
     print(f"Total participants processed: {len(features_df)}")
-    print(f"Features per participant: {len(features_df.columns) - 1}")
-    
-    feature_names = [col for col in features_df.columns if col != 'id']
+    feature_names = [col for col in features_df.columns if col not in ('id', 'extraction_mode')]
+    print(f"Features per participant: {len(feature_names)}")
     print(f"Extracted {len(feature_names)} frequency features")
+    if 'extraction_mode' in features_df.columns:
+        mode_counts = features_df['extraction_mode'].fillna('unrecorded').value_counts()
+        print(f"Extraction modes: {', '.join(f'{mode} {count}' for mode, count in mode_counts.items())}")
     
-    # Group features by type
-    jitter_features = [f for f in feature_names if 'jitter' in f]
-    pitch_features = [f for f in feature_names if 'pitch' in f or 'f0_range' in f]
-    formant_features = [f for f in feature_names if any(f'f{i}_' in f for i in [1,2,3])]
-    tremor_features = [f for f in feature_names if 'tremor' in f]
-    
-    print(f"  - Jitter features: {len(jitter_features)}")
-    print(f"  - Pitch features: {len(pitch_features)}")
-    print(f"  - Formant features: {len(formant_features)}")
-    print(f"  - Tremor features: {len(tremor_features)}")
+    # Group features by family
+    for name in extractor.families:
+        family_features = [f for f in FEATURE_FAMILIES[name].feature_names if f in feature_names]
+        print(f"  - {name.capitalize()} features: {len(family_features)}")
     
     # Check for missing values
     print(f"\nData quality check:")
@@ -652,17 +1953,33 @@ def main():
         if success_rate < 90:  # Only show features with high missing rates
             print(f"  {feature}: {valid_count}/{len(features_df)} valid ({success_rate:.1f}%)")
     
-    # Save results
-    output_filename = '/kaggle/working/frequency_features.csv'
-    try:
-        features_df.to_csv(output_filename, index=False)
-        print(f"\nFeatures saved to: {output_filename}")
-    except Exception as e:
-        print(f"Error saving features: {str(e)}")
-        # Try alternative path
-        alt_filename = 'frequency_features.csv'
-        features_df.to_csv(alt_filename, index=False)
-        print(f"Features saved to: {alt_filename}")
+    # CSV export
+    output_filename = parquet_filename if writer is not None else None
+    if export_csv:
+        output_filename = '/kaggle/working/frequency_features.csv'
+        try:
+            features_df.to_csv(output_filename, index=False)
+            print(f"\nFeatures exported to: {output_filename}")
+        except Exception as e:
+            print(f"Error saving features: {str(e)}")
+            # Try alternative path
+            output_filename = 'frequency_features.csv'
+            features_df.to_csv(output_filename, index=False)
+            print(f"Features exported to: {output_filename}")
+    
+    # Per-stage timing report for the files extracted in this run
+    if extractor.profiler is not None and extractor.profiler.records:
+        profile_dir = '/kaggle/working' if os.path.isdir('/kaggle/working') else '.'
+        extractor.profiler.write_json(os.path.join(profile_dir, 'frequency_features_profile.json'))
+        extractor.profiler.write_csv(os.path.join(profile_dir, 'frequency_features_profile.csv'),
+                                     os.path.join(profile_dir, 'frequency_features_profile_summary.csv'))
+        print(f"\nPer-stage timing (median wall time per file):")
+        for stage, stats in sorted(extractor.profiler.summary().items(), key=lambda item: -item[1]['wall_s_p50']):
+            print(f"  {stage:<28} {stats['wall_s_p50']:8.3f}s  (p95 {stats['wall_s_p95']:.3f}s, "
+                  f"peak RSS {stats['peak_rss_mb_max']:.0f} MB)")
+        print(f"Profile saved to: {os.path.join(profile_dir, 'frequency_features_profile.json')}")
+    if extractor.track_store is not None:
+        print(f"Frame-level tracks saved to: {track_dir}")
     
     # Display sample results
     print(f"\nSample results (first 3 participants, key features):")
@@ -681,8 +1998,13 @@ def main():
     return features_df
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract frequency features for the participants with lexical data")
+    parser.add_argument('--profile', action='store_true', help="time every extraction stage and save the report")
+    parser.add_argument('--energy', action='store_true', help="also extract the energy features")
+    args = parser.parse_args()
     try:
-        result_df = main()
+        result_df = main(profile=args.profile, energy_features=args.energy)
         if result_df is not None:
             print(f"\n🎉 SUCCESS! Generated frequency features for {len(result_df)} participants.")
             print(f"Frequency feature extraction completed successfully!")
@@ -0,0 +1,150 @@
+"""
+Cycle-to-cycle perturbation measures from glottal pulse times
+
+The glottal periods are taken from the pulse times once, and every jitter
+variant is a statistic over sliding windows of that one array (vectorised
+differences and window means), instead of one Praat query per variant that
+rescans the pulses each time. Period validity follows Praat's PointProcess
+rules (period floor and ceiling, maximum ratio of consecutive periods), so
+the values match Praat's "Get jitter (...)" queries.
+
+The window masks and quotients work on any per-cycle values, so amplitude
+(shimmer-style) measures can reuse them with peak amplitudes in place of
+periods.
+"""
+import numpy as np
+
+# Measures returned by jitter_measures()
+JITTER_MEASURES = ('local', 'local_sd', 'local_absolute', 'rap', 'ppq5', 'ddp')
+
+
+def rolling_sums(values, length):
+    """Sums of every run of length consecutive values (from one cumulative sum)"""
+    cumulative = np.concatenate([[0], np.cumsum(values)])
+    return cumulative[length:] - cumulative[:-length]
+
+
+def neighbour_ratios_ok(values, maximum_factor):
+    """Whether each pair of neighbouring values differs by at most maximum_factor, shape (n - 1,)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.maximum(values[1:], values[:-1]) <= maximum_factor * np.minimum(values[1:], values[:-1])
+
+
+def valid_windows(in_range, ratios_ok, length):
+    """
+    Mask of the windows of consecutive cycles a perturbation measure may use
+
+    A window qualifies when all its cycles are in range and no two
+    neighbouring cycles differ by more than the maximum factor.
+
+    Args:
+        in_range: Boolean mask of cycles within the floor and ceiling, shape (n,)
+        ratios_ok: Neighbour mask from neighbour_ratios_ok(), shape (n - 1,)
+        length: Cycles per window
+
+    Returns:
+        ndarray: Boolean mask of shape (n - length + 1,) (empty when n < length)
+    """
+    if len(in_range) < length:
+        return np.zeros(0, dtype=bool)
+    valid = rolling_sums(~in_range, length) == 0
+    if length > 1:
+        valid &= rolling_sums(~ratios_ok, length - 1) == 0
+    return valid
+
+
+def perturbation_quotient(values, valid, length):
+    """
+    Mean absolute deviation of each window's centre value from the window mean
+
+    RAP for windows of 3 cycles and PPQ5 for 5 (APQ-style shimmer for amplitudes).
+
+    Args:
+        values: Per-cycle values, shape (n,)
+        valid: Window mask from valid_windows() for the same length
+        length: Odd number of cycles per window
+
+    Returns:
+        float: Mean absolute deviation over the valid windows (NaN without any)
+    """
+    if not np.any(valid):
+        return np.nan
+    centres = values[length // 2:len(values) - length // 2]
+    return float(np.mean(np.abs(centres - rolling_sums(values, length) / length)[valid]))
+
+
+def mean_period(periods, in_range, ratios_ok):
+    """
+    Mean of the periods Praat counts as periods
+
+    A period in range is dropped only when it has two neighbours and differs
+    by more than the maximum factor from both.
+
+    Args:
+        periods: Intervals between consecutive pulses, shape (n,)
+        in_range: Boolean mask of periods within the floor and ceiling
+        ratios_ok: Neighbour mask from neighbour_ratios_ok()
+
+    Returns:
+        float: Mean period in seconds (NaN without any period)
+    """
+    previous_outlier = np.concatenate([[False], ~ratios_ok])
+    next_outlier = np.concatenate([~ratios_ok, [False]])
+    counted = in_range & (periods > 0) & ~(previous_outlier & next_outlier)
+    return float(np.mean(periods[counted])) if np.any(counted) else np.nan
+
+
+def jitter_measures(pulse_times, period_floor=0.0001, period_ceiling=0.02, maximum_period_factor=1.3,
+                    sd_window_periods=20):
+    """
+    All jitter variants from one pass over the glottal periods
+
+    'local', 'local_absolute', 'rap', 'ppq5' and 'ddp' follow Praat's
+    definitions over the whole pulse train. 'local_sd' is the standard
+    deviation of local jitter measured in sliding windows of
+    sd_window_periods consecutive period pairs (NaN with fewer pairs).
+
+    Args:
+        pulse_times: Sorted glottal pulse times in seconds
+        period_floor: Shortest period counted, in seconds
+        period_ceiling: Longest period counted, in seconds
+        maximum_period_factor: Largest allowed ratio of consecutive periods
+        sd_window_periods: Period pairs per window for 'local_sd'
+
+    Returns:
+        dict: Measure name (JITTER_MEASURES) -> value (NaN when undefined)
+    """
+    periods = np.diff(np.asarray(pulse_times, dtype=np.float64))
+    in_range = (periods >= period_floor) & (periods <= period_ceiling)
+    measures = dict.fromkeys(JITTER_MEASURES, np.nan)
+    if len(periods) < 2:
+        return measures
+
+    ratios_ok = neighbour_ratios_ok(periods, maximum_period_factor)
+    mean = mean_period(periods, in_range, ratios_ok)
+
+    # Local: absolute differences of consecutive periods
+    pairs = valid_windows(in_range, ratios_ok, 2)
+    differences = np.abs(np.diff(periods))[pairs]
+    if len(differences) > 0:
+        measures['local_absolute'] = float(np.mean(differences))
+        measures['local'] = measures['local_absolute'] / mean
+
+        # Local jitter of each run of sd_window_periods pairs, from rolling sums
+        if len(differences) >= sd_window_periods:
+            pair_means = ((periods[:-1] + periods[1:]) / 2)[pairs]
+            window_jitter = rolling_sums(differences, sd_window_periods) / rolling_sums(pair_means, sd_window_periods)
+            measures['local_sd'] = float(np.std(window_jitter))
+
+    # RAP and DDP share the three-period windows
+    triples = valid_windows(in_range, ratios_ok, 3)
+    if np.any(triples):
+        measures['rap'] = perturbation_quotient(periods, triples, 3) / mean
+        second_differences = np.abs(np.diff(periods, n=2))[triples]
+        measures['ddp'] = float(np.mean(second_differences)) / mean
+
+    quintuples = valid_windows(in_range, ratios_ok, 5)
+    if np.any(quintuples):
+        measures['ppq5'] = perturbation_quotient(periods, quintuples, 5) / mean
+
+    return measures
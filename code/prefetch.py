@@ -0,0 +1,111 @@
+"""
+Bounded background prefetching for overlapping file reads with analysis
+
+Decoding a file mostly waits on storage (network mounts in particular),
+and Praat analyses hold the CPU, so the two overlap well in one process.
+Reader threads load upcoming items in order while the caller works on the
+current one. Loaded results are handed out in input order, and readers stop
+starting new loads while the buffered results exceed a byte budget, so
+memory stays bounded however far the readers could run ahead.
+"""
+import threading
+
+import numpy as np
+
+
+def result_bytes(result):
+    """Bytes held by the arrays in a loaded result (an array or a tuple/list of values)"""
+    values = result if isinstance(result, (tuple, list)) else [result]
+    return sum(value.nbytes for value in values if isinstance(value, np.ndarray))
+
+
+class Prefetcher:
+    def __init__(self, items, load, max_bytes=256 * 2 ** 20, n_threads=1, size=result_bytes):
+        """
+        Start loading items in background threads
+
+        Args:
+            items: Sequence of items to load
+            load: Function item -> result, run in the reader threads
+            max_bytes: Buffered results beyond which readers wait (files being
+                       loaded are on top of this, and one file larger than the
+                       budget is still admitted when the buffer is empty)
+            n_threads: Number of reader threads
+            size: Function result -> bytes it holds
+        """
+        self.items = list(items)
+        self.load = load
+        self.max_bytes = max_bytes
+        self.size = size
+        self.condition = threading.Condition()
+        self.results = {}
+        self.buffered_bytes = 0
+        self.next_load = 0
+        self.next_yield = 0
+        self.closed = False
+        self.threads = [threading.Thread(target=self.read, daemon=True) for _ in range(max(1, n_threads))]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __iter__(self):
+        return self
+
+    def read(self):
+        """Reader thread loop: claim the next item, load it and buffer the result"""
+        while True:
+            with self.condition:
+                while not self.closed and self.results and self.buffered_bytes >= self.max_bytes:
+                    self.condition.wait()
+                if self.closed or self.next_load >= len(self.items):
+                    return
+                index = self.next_load
+                self.next_load += 1
+
+            try:
+                result, error = self.load(self.items[index]), None
+            except Exception as e:
+                result, error = None, e
+            n_bytes = self.size(result) if error is None else 0
+
+            with self.condition:
+                self.results[index] = (result, error, n_bytes)
+                self.buffered_bytes += n_bytes
+                self.condition.notify_all()
+
+    def __next__(self):
+        """
+        Wait for the next item in input order
+
+        Returns:
+            tuple: (item, result); errors raised by load() are re-raised here
+        """
+        if self.next_yield >= len(self.items):
+            raise StopIteration
+        with self.condition:
+            while self.next_yield not in self.results:
+                self.condition.wait()
+            result, error, n_bytes = self.results.pop(self.next_yield)
+            self.buffered_bytes -= n_bytes
+            self.condition.notify_all()
+        item = self.items[self.next_yield]
+        self.next_yield += 1
+        if error is not None:
+            raise error
+        return item, result
+
+    def close(self):
+        """Stop starting new loads and wait for the readers (loads in progress finish)"""
+        with self.condition:
+            self.closed = True
+            self.results.clear()
+            self.buffered_bytes = 0
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
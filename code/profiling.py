@@ -0,0 +1,210 @@
+"""
+Per-stage profiling for the feature extraction pipeline
+
+Records wall time, CPU time and peak resident memory for each pipeline stage
+(audio decoding, every intermediate Praat analysis and every feature family)
+of every file, and exports the records together with per-stage percentiles
+as JSON or CSV. Used to size worker nodes and to catch performance
+regressions between runs.
+"""
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def read_peak_rss():
+    """
+    Peak resident set size of this process in bytes
+
+    On Linux this is the high-water mark since the last reset_peak_rss(),
+    elsewhere the peak over the lifetime of the process.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return np.nan
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss():
+    """
+    Reset the peak RSS high-water mark to the current RSS (Linux only)
+
+    Returns:
+        bool: True if the reset is supported
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class StageProfiler:
+    """
+    Collects one timing record per (file, stage) execution
+
+    Stages may be nested (e.g. a Praat analysis built inside a feature
+    family); the outer stage's time and peak memory include the inner ones.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.audio_durations = {}
+        self.active_peaks = []
+
+    def set_audio_duration(self, file_id, seconds):
+        """Remember the audio duration of a file for its records"""
+        self.audio_durations[file_id] = seconds
+
+    @contextmanager
+    def stage(self, name, file_id=None):
+        """
+        Time a block of code as one stage
+
+        Args:
+            name: Stage name (e.g. 'load_audio', 'pitch', 'analysis:formant')
+            file_id: ID of the file being processed
+        """
+        # Hand the peak so far to the enclosing stages before resetting it
+        if self.active_peaks:
+            peak = read_peak_rss()
+            self.active_peaks = [max(outer, peak) for outer in self.active_peaks]
+        reset_peak_rss()
+        self.active_peaks.append(0)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = max(self.active_peaks.pop(), read_peak_rss())
+            self.active_peaks = [max(outer, peak) for outer in self.active_peaks]
+            self.records.append({
+                'file_id': file_id,
+                'stage': name,
+                'wall_s': wall,
+                'cpu_s': cpu,
+                'peak_rss_mb': peak / 2 ** 20,
+                'audio_duration_s': self.audio_durations.get(file_id, np.nan),
+            })
+
+    def drain(self):
+        """Return and forget the collected records (used to ship them out of pool workers)"""
+        records, self.records = self.records, []
+        self.audio_durations = {}
+        return records
+
+    def add_records(self, records):
+        """Add records collected by another profiler (e.g. in a worker process)"""
+        self.records.extend(records)
+
+    def file_stage_totals(self):
+        """
+        Sum the records of each (file, stage) pair
+
+        A stage can run several times per file (e.g. once per streaming
+        window); percentiles are taken over per-file totals.
+
+        Returns:
+            dict: {stage: list of per-file total dicts}
+        """
+        durations = {}
+        for record in self.records:
+            if not np.isnan(record['audio_duration_s']):
+                durations[record['file_id']] = record['audio_duration_s']
+
+        totals = {}
+        for record in self.records:
+            key = (record['stage'], record['file_id'])
+            if key not in totals:
+                totals[key] = {'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': 0.0,
+                               'audio_duration_s': durations.get(record['file_id'], np.nan)}
+            totals[key]['wall_s'] += record['wall_s']
+            totals[key]['cpu_s'] += record['cpu_s']
+            totals[key]['peak_rss_mb'] = max(totals[key]['peak_rss_mb'], record['peak_rss_mb'])
+
+        stages = {}
+        for (stage, _), total in totals.items():
+            stages.setdefault(stage, []).append(total)
+        return stages
+
+    def summary(self, percentiles=(50, 90, 95, 99)):
+        """
+        Aggregate statistics per stage
+
+        Args:
+            percentiles: Percentiles to report for wall time, CPU time and memory
+
+        Returns:
+            dict: {stage: statistics} with counts, totals, percentiles and the
+                  real-time factor (wall time per second of audio)
+        """
+        summary = {}
+        for stage, totals in self.file_stage_totals().items():
+            wall = np.array([total['wall_s'] for total in totals])
+            cpu = np.array([total['cpu_s'] for total in totals])
+            peak = np.array([total['peak_rss_mb'] for total in totals])
+            audio = np.array([total['audio_duration_s'] for total in totals])
+
+            stats = {'files': len(totals), 'wall_s_total': float(wall.sum()), 'wall_s_mean': float(wall.mean()),
+                     'cpu_s_total': float(cpu.sum()), 'peak_rss_mb_max': float(peak.max())}
+            for q in percentiles:
+                stats[f'wall_s_p{q}'] = float(np.percentile(wall, q))
+                stats[f'cpu_s_p{q}'] = float(np.percentile(cpu, q))
+                stats[f'peak_rss_mb_p{q}'] = float(np.percentile(peak, q))
+
+            known = ~np.isnan(audio) & (audio > 0)
+            if np.any(known):
+                realtime_factor = wall[known] / audio[known]
+                stats['audio_s_total'] = float(audio[known].sum())
+                for q in percentiles:
+                    stats[f'realtime_factor_p{q}'] = float(np.percentile(realtime_factor, q))
+            summary[stage] = stats
+        return summary
+
+    def write_json(self, path):
+        """Write records and per-stage summary as a JSON report"""
+        report = {'summary': self.summary(), 'records': self.records}
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=float)
+
+    def write_csv(self, path, summary_path=None):
+        """
+        Write the per-stage records as CSV
+
+        Args:
+            path: Output path for one row per (file, stage) execution
+            summary_path: Optional output path for one row per stage
+        """
+        fields = ['file_id', 'stage', 'wall_s', 'cpu_s', 'peak_rss_mb', 'audio_duration_s']
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+        if summary_path is not None:
+            summary = self.summary()
+            columns = sorted({key for stats in summary.values() for key in stats})
+            with open(summary_path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=['stage'] + columns)
+                writer.writeheader()
+                for stage, stats in summary.items():
+                    writer.writerow({'stage': stage, **stats})
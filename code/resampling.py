@@ -0,0 +1,356 @@
+"""
+Permutation tests and bootstrap confidence intervals for every feature at once
+
+Resamples are generated as index matrices in blocks: a block of B
+permutations or bootstrap draws is evaluated for all features with a few
+matrix products (group masks times the feature matrix for Cohen's d,
+permuted outcome ranks times the ranked features for Spearman's rho,
+resample counts times the features for bootstrap moments), so no Python
+loop runs per feature or per resample. Blocks are sized to a memory limit
+and can be spread over processes. Every block draws from its own child of
+one SeedSequence, so results depend on the seed but not on the number of
+workers.
+"""
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from statistical_analysis import missing_patterns, rank_columns, correlation_columns
+
+
+def resample_counts(indices, n):
+    """
+    How often each row occurs in each resample
+
+    Args:
+        indices: Array of shape (n_resamples, n) of row indices
+        n: Number of rows
+
+    Returns:
+        ndarray: Counts of shape (n_resamples, n)
+    """
+    counts = np.zeros((indices.shape[0], n))
+    np.add.at(counts, (np.arange(indices.shape[0])[:, np.newaxis], indices), 1.0)
+    return counts
+
+
+def weighted_cohens_d(weights_first, weights_second, X):
+    """
+    Cohen's d between two weighted groups for every (resample, column)
+
+    Args:
+        weights_first: Array of shape (n_resamples, n) with each row's count in the first group
+        weights_second: Same for the second group
+        X: Column-centred feature matrix of shape (n, n_features)
+
+    Returns:
+        ndarray: Cohen's d of shape (n_resamples, n_features)
+    """
+    X_squared = X * X
+    n1 = weights_first.sum(axis=1, keepdims=True)
+    n2 = weights_second.sum(axis=1, keepdims=True)
+    mean1 = weights_first @ X / n1
+    mean2 = weights_second @ X / n2
+    ss1 = weights_first @ X_squared - n1 * mean1 ** 2
+    ss2 = weights_second @ X_squared - n2 * mean2 ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pooled_sd = np.sqrt(np.maximum(ss1 + ss2, 0.0) / (n1 + n2 - 2))
+        return (mean1 - mean2) / pooled_sd
+
+
+def cohens_d_statistic(X, in_first_group, indices=None, kind=None):
+    """
+    Cohen's d (first minus second group) for the data or a block of resamples
+
+    Args:
+        X: Complete feature matrix of shape (n, n_features)
+        in_first_group: Boolean array of shape (n,)
+        indices: Optional resample index matrix of shape (n_resamples, n)
+        kind: 'permutation' (indices permute the group labels) or 'bootstrap'
+              (indices draw rows, stratified by group)
+
+    Returns:
+        ndarray: Shape (n_features,) without indices, else (n_resamples, n_features)
+    """
+    X = X - X.mean(axis=0)
+    first = np.asarray(in_first_group, dtype=np.float64)
+    if indices is None:
+        return weighted_cohens_d(first[np.newaxis, :], 1.0 - first[np.newaxis, :], X)[0]
+    if kind == 'permutation':
+        permuted = first[indices]
+        return weighted_cohens_d(permuted, 1.0 - permuted, X)
+    counts = resample_counts(indices, len(first))
+    return weighted_cohens_d(counts * first, counts * (1.0 - first), X)
+
+
+def resample_ranks(values, counts):
+    """
+    Average rank of every row within each bootstrap resample
+
+    A row drawn c times contributes c tied copies, so its rank in a resample
+    is the count of drawn values below it plus half of its tie group (plus
+    one half), which cumulative counts in sort order give directly.
+
+    Args:
+        values: Complete array of shape (n, n_columns)
+        counts: Resample counts of shape (n_resamples, n)
+
+    Returns:
+        ndarray: Ranks of shape (n_resamples, n, n_columns); rows that were
+                 not drawn get the rank they would have had
+    """
+    n = values.shape[0]
+    order = np.argsort(values, axis=0, kind='mergesort')
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    group_start = np.ones(values.shape, dtype=bool)
+    group_start[1:] = sorted_values[1:] != sorted_values[:-1]
+    group_end = np.ones(values.shape, dtype=bool)
+    group_end[:-1] = group_start[1:]
+    positions = np.arange(n)[:, np.newaxis]
+    first = np.maximum.accumulate(np.where(group_start, positions, 0), axis=0)
+    last = np.minimum.accumulate(np.where(group_end, positions, n - 1)[::-1], axis=0)[::-1]
+
+    cumulative = np.zeros((counts.shape[0], n + 1, values.shape[1]))
+    np.cumsum(counts[:, order], axis=1, out=cumulative[:, 1:])
+    below = np.take_along_axis(cumulative, first[np.newaxis], axis=1)
+    through = np.take_along_axis(cumulative, last[np.newaxis] + 1, axis=1)
+
+    ranks = np.empty_like(below)
+    np.put_along_axis(ranks, np.broadcast_to(order, ranks.shape), below + (through - below + 1) / 2, axis=1)
+    return ranks
+
+
+def standardized(values):
+    """Centre and scale the columns of values to unit norm (zero columns stay zero)"""
+    centred = values - values.mean(axis=0)
+    norms = np.sqrt(np.einsum('ij,ij->j', centred, centred))
+    norms[norms == 0] = np.inf
+    return centred / norms
+
+
+def correlation_statistic(X, y, indices=None, kind=None, method='spearman'):
+    """
+    Pearson or Spearman correlation with y for the data or a block of resamples
+
+    Args:
+        X: Complete feature matrix of shape (n, n_features)
+        y: Outcome of shape (n,)
+        indices: Optional resample index matrix of shape (n_resamples, n)
+        kind: 'permutation' (indices permute y) or 'bootstrap' (indices draw rows)
+        method: 'pearson' or 'spearman'
+
+    Returns:
+        ndarray: Shape (n_features,) without indices, else (n_resamples, n_features)
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if method == 'spearman' and kind != 'bootstrap':
+        X = rank_columns(X)[0]
+        y = rank_columns(y[:, np.newaxis])[0][:, 0]
+    if indices is None:
+        return correlation_columns(X, y)
+
+    if kind == 'permutation':
+        # Permuting y permutes its ranks, so the ranked features are reused
+        X_standardized = standardized(X)
+        y_standardized = standardized(y[:, np.newaxis])[:, 0]
+        with np.errstate(invalid='ignore'):
+            r = y_standardized[indices] @ X_standardized
+        r[:, np.all(X_standardized == 0, axis=0)] = np.nan
+        return np.clip(r, -1.0, 1.0) if np.any(y_standardized) else np.full(r.shape, np.nan)
+
+    n_resamples, n = indices.shape
+    if method == 'pearson':
+        counts = resample_counts(indices, n)
+        X = X - X.mean(axis=0)
+        y = y - y.mean()
+        mean_x = counts @ X / n
+        mean_y = counts @ y / n
+        covariance = counts @ (X * y[:, np.newaxis]) / n - mean_x * mean_y[:, np.newaxis]
+        variance_x = counts @ (X * X) / n - mean_x ** 2
+        variance_y = counts @ (y * y) / n - mean_y ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = covariance / np.sqrt(np.maximum(variance_x, 0.0) * np.maximum(variance_y, 0.0)[:, np.newaxis])
+        return np.clip(r, -1.0, 1.0)
+
+    # Spearman bootstrap: each row's rank within a resample follows from the
+    # resample counts in the data's sort order, so nothing is re-sorted
+    counts = resample_counts(indices, n)
+    X_ranks = resample_ranks(X, counts) - (n + 1) / 2.0
+    y_ranks = resample_ranks(y[:, np.newaxis], counts)[:, :, 0] - (n + 1) / 2.0
+    weighted_y = counts * y_ranks
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (np.einsum('bnf,bn->bf', X_ranks, weighted_y) /
+             np.sqrt(np.einsum('bnf,bnf,bn->bf', X_ranks, X_ranks, counts) *
+                     np.einsum('bn,bn->b', weighted_y, y_ranks)[:, np.newaxis]))
+    return np.clip(r, -1.0, 1.0)
+
+
+# Statistics by name: function (X, v, indices=None, kind=None) where v is the
+# group mask (cohens_d) or the outcome (correlations)
+STATISTICS = {
+    'cohens_d': cohens_d_statistic,
+    'spearman': lambda X, y, indices=None, kind=None: correlation_statistic(X, y, indices, kind, 'spearman'),
+    'pearson': lambda X, y, indices=None, kind=None: correlation_statistic(X, y, indices, kind, 'pearson'),
+}
+
+
+def resample_indices(kind, statistic, v, n_resamples, rng):
+    """
+    Index matrix for one block of resamples
+
+    Args:
+        kind: 'permutation' or 'bootstrap'
+        statistic: Statistic name (bootstrap draws for 'cohens_d' are stratified by group)
+        v: Group mask or outcome
+        n_resamples: Number of resamples in the block
+        rng: numpy Generator
+
+    Returns:
+        ndarray: Shape (n_resamples, n)
+    """
+    n = len(v)
+    if kind == 'permutation':
+        return rng.permuted(np.tile(np.arange(n), (n_resamples, 1)), axis=1)
+    if statistic == 'cohens_d':
+        indices = np.empty((n_resamples, n), dtype=np.int64)
+        for members in [np.flatnonzero(v), np.flatnonzero(~np.asarray(v, dtype=bool))]:
+            indices[:, members] = members[rng.integers(0, len(members), (n_resamples, len(members)))]
+        return indices
+    return rng.integers(0, n, (n_resamples, n))
+
+
+def resample_block(kind, statistic, X, v, observed, n_resamples, seed_sequence):
+    """
+    Evaluate one block of resamples (process pool task)
+
+    Args:
+        kind: 'permutation' or 'bootstrap'
+        statistic: Statistic name (see STATISTICS)
+        X: Complete feature matrix
+        v: Group mask or outcome
+        observed: Observed statistic per feature (permutation tests only)
+        n_resamples: Number of resamples in the block
+        seed_sequence: numpy SeedSequence of the block
+
+    Returns:
+        For permutations, (exceedances, valid) counts per feature; for the
+        bootstrap, the statistics of shape (n_resamples, n_features)
+    """
+    rng = np.random.default_rng(seed_sequence)
+    indices = resample_indices(kind, statistic, v, n_resamples, rng)
+    values = STATISTICS[statistic](X, v, indices, kind)
+    if kind == 'bootstrap':
+        return values
+    valid = ~np.isnan(values)
+    # Two-sided, with a relative tolerance so the identity permutation counts
+    exceeds = np.abs(values) >= np.abs(observed) * (1 - 1e-12)
+    return np.sum(exceeds & valid, axis=0), np.sum(valid, axis=0)
+
+
+class ResamplingEngine:
+    def __init__(self, n_resamples=10000, max_workers=1, seed=0, block_size=1000, memory_limit_mb=256):
+        """
+        Initialize the resampling engine
+
+        Args:
+            n_resamples: Permutations or bootstrap draws per test
+            max_workers: Worker processes evaluating blocks (1 to run in-process)
+            seed: Seed of the SeedSequence all blocks are drawn from
+            block_size: Maximum resamples evaluated per block
+            memory_limit_mb: Approximate working memory per block; blocks are
+                             made smaller when the data is large
+        """
+        self.n_resamples = n_resamples
+        self.max_workers = max_workers
+        self.seed = seed
+        self.block_size = block_size
+        self.memory_limit_mb = memory_limit_mb
+
+    def blocks(self, n, n_features):
+        """Sizes of the resample blocks for data of shape (n, n_features)"""
+        # Spearman bootstrap blocks hold a few (block, n, n_features) arrays
+        per_resample = 8 * n * max(n_features, 1) * 6
+        block = int(max(1, min(self.block_size, self.memory_limit_mb * 2 ** 20 // per_resample)))
+        sizes = [block] * (self.n_resamples // block)
+        if self.n_resamples % block:
+            sizes.append(self.n_resamples % block)
+        return sizes
+
+    def run_blocks(self, kind, statistic, X, v, observed, seed_sequence):
+        """Evaluate all blocks for one complete-case group, in block order"""
+        sizes = self.blocks(*X.shape)
+        seeds = seed_sequence.spawn(len(sizes))
+        tasks = [(kind, statistic, X, v, observed, size, block_seed) for size, block_seed in zip(sizes, seeds)]
+        if self.max_workers <= 1 or len(tasks) == 1:
+            return [resample_block(*task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(resample_block, *zip(*tasks)))
+
+    def resample(self, kind, statistic, X, v):
+        """Observed statistic and block results per group of columns with the same missing rows"""
+        if statistic not in STATISTICS:
+            raise ValueError(f"Unknown statistic '{statistic}' (available: {', '.join(STATISTICS)})")
+        X = np.asarray(X, dtype=np.float64)
+        v = np.asarray(v, dtype=bool if statistic == 'cohens_d' else np.float64)
+        missing_rows = () if statistic == 'cohens_d' else (v,)
+        for pattern_index, (rows, columns) in enumerate(missing_patterns(X, *missing_rows)):
+            X_rows, v_rows = X[np.ix_(rows, columns)], v[rows]
+            observed = STATISTICS[statistic](X_rows, v_rows)
+            seed_sequence = np.random.SeedSequence(self.seed, spawn_key=(pattern_index,))
+            yield columns, observed, self.run_blocks(kind, statistic, X_rows, v_rows, observed, seed_sequence)
+
+    def permutation_test(self, statistic, X, v):
+        """
+        Two-sided permutation p-values for every feature
+
+        Args:
+            statistic: 'cohens_d' (v is a boolean first-group mask; labels are
+                       permuted) or 'spearman'/'pearson' (v is the outcome; it
+                       is permuted against the features)
+            X: Feature matrix of shape (n, n_features), NaN for missing values
+            v: Group mask or outcome of shape (n,)
+
+        Returns:
+            dict: 'statistic' (observed) and 'p' ((exceedances + 1) / (valid
+                  resamples + 1)) arrays of shape (n_features,)
+        """
+        n_features = np.shape(X)[1]
+        results = {'statistic': np.full(n_features, np.nan), 'p': np.full(n_features, np.nan)}
+        for columns, observed, blocks in self.resample('permutation', statistic, X, v):
+            exceedances = sum(block[0] for block in blocks)
+            valid = sum(block[1] for block in blocks)
+            results['statistic'][columns] = observed
+            results['p'][columns] = np.where(np.isnan(observed), np.nan, (exceedances + 1) / (valid + 1))
+        return results
+
+    def bootstrap(self, statistic, X, v, confidence=0.95):
+        """
+        Percentile bootstrap confidence intervals for every feature
+
+        Args:
+            statistic: 'cohens_d' (rows are resampled within each group) or
+                       'spearman'/'pearson' (rows are resampled jointly with v)
+            X: Feature matrix of shape (n, n_features), NaN for missing values
+            v: Group mask or outcome of shape (n,)
+            confidence: Coverage of the intervals
+
+        Returns:
+            dict: 'statistic' (observed), 'low', 'high' and 'standard_error'
+                  arrays of shape (n_features,)
+        """
+        n_features = np.shape(X)[1]
+        results = {key: np.full(n_features, np.nan) for key in ['statistic', 'low', 'high', 'standard_error']}
+        tail = (1 - confidence) / 2 * 100
+        for columns, observed, blocks in self.resample('bootstrap', statistic, X, v):
+            values = np.concatenate(blocks, axis=0)
+            with warnings.catch_warnings():
+                # All-NaN columns (e.g. constant features) stay NaN
+                warnings.simplefilter('ignore', RuntimeWarning)
+                low, high = np.nanpercentile(values, [tail, 100 - tail], axis=0)
+                standard_error = np.nanstd(values, axis=0, ddof=1)
+            results['statistic'][columns] = observed
+            results['low'][columns] = low
+            results['high'][columns] = high
+            results['standard_error'][columns] = standard_error
+        return results
@@ -0,0 +1,390 @@
+"""
+Mergeable one-pass accumulators for summary statistics
+
+Each accumulator consumes values in batches with update(), can be combined
+with merge() (e.g. results from windows, chunks or workers), and never keeps
+the individual values:
+
+- MomentAccumulator: count, mean, SD, skewness, kurtosis, min and max (exact)
+- QuantileSketch: percentiles with a bounded relative error
+- LinearTrendAccumulator: least-squares slope, offset and MSE (exact)
+
+linear_trend() and batch_linear_trend() fit the same line in closed form for
+one contour or many contours at once.
+"""
+import math
+
+import numpy as np
+
+
+class MomentAccumulator:
+    """
+    Running central moments up to order four (Pebay's pairwise update formulas)
+
+    Statistics follow the conventions used by the feature extractor:
+    population SD (np.std), biased skewness and Fisher kurtosis
+    (scipy.stats.skew / scipy.stats.kurtosis defaults).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    @classmethod
+    def from_values(cls, values):
+        """Accumulator holding the moments of an array of values"""
+        accumulator = cls()
+        accumulator.update(values)
+        return accumulator
+
+    def update(self, values):
+        """
+        Add a batch of values
+
+        Args:
+            values: Array-like of finite values
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        batch = MomentAccumulator()
+        batch.count = len(values)
+        batch.mean = float(np.mean(values))
+        deviations = values - batch.mean
+        squared = deviations * deviations
+        batch.m2 = float(np.sum(squared))
+        batch.m3 = float(np.sum(squared * deviations))
+        batch.m4 = float(np.sum(squared * squared))
+        batch.minimum = float(np.min(values))
+        batch.maximum = float(np.max(values))
+        self.merge(batch)
+
+    def merge(self, other):
+        """
+        Combine with another accumulator in place (exact)
+
+        Args:
+            other: MomentAccumulator
+
+        Returns:
+            MomentAccumulator: self
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean = other.count, other.mean
+            self.m2, self.m3, self.m4 = other.m2, other.m3, other.m4
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return self
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+
+        m4 = (self.m4 + other.m4
+              + delta * delta_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+              + 6.0 * delta_n ** 2 * (na * na * other.m2 + nb * nb * self.m2)
+              + 4.0 * delta_n * (na * other.m3 - nb * self.m3))
+        m3 = (self.m3 + other.m3
+              + delta * delta_n ** 2 * na * nb * (na - nb)
+              + 3.0 * delta_n * (na * other.m2 - nb * self.m2))
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+
+        self.count = n
+        self.mean += delta_n * nb
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def std(self):
+        """Population standard deviation"""
+        return math.sqrt(self.m2 / self.count) if self.count > 0 else np.nan
+
+    @property
+    def skewness(self):
+        """Biased sample skewness"""
+        if self.count == 0 or self.m2 == 0:
+            return np.nan
+        return math.sqrt(self.count) * self.m3 / self.m2 ** 1.5
+
+    @property
+    def kurtosis(self):
+        """Biased Fisher (excess) kurtosis"""
+        if self.count == 0 or self.m2 == 0:
+            return np.nan
+        return self.count * self.m4 / (self.m2 * self.m2) - 3.0
+
+
+class QuantileSketch:
+    """
+    Log-bucket quantile sketch for positive values (DDSketch-style)
+
+    Values are counted in geometric buckets of ratio gamma = (1 + a) / (1 - a),
+    so every reported quantile is within relative error a of the true order
+    statistic; percentiles interpolate between order statistics like
+    np.percentile. Merging adds bucket counts and is exact. Memory grows with
+    log(max / min) / a, not with the number of values (about 950 buckets for
+    75-500 Hz at the default a = 0.001).
+    """
+
+    def __init__(self, relative_accuracy=0.001):
+        """
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.count = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    def update(self, values):
+        """
+        Add a batch of values
+
+        Args:
+            values: Array-like of positive values
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        if np.any(values <= 0):
+            raise ValueError("QuantileSketch only accepts positive values")
+        indices, counts = np.unique(np.ceil(np.log(values) / self.log_gamma).astype(np.int64),
+                                    return_counts=True)
+        for index, count in zip(indices.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += len(values)
+        self.minimum = min(self.minimum, float(np.min(values)))
+        self.maximum = max(self.maximum, float(np.max(values)))
+
+    def merge(self, other):
+        """
+        Combine with another sketch in place (exact)
+
+        Args:
+            other: QuantileSketch with the same relative accuracy
+
+        Returns:
+            QuantileSketch: self
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def percentile(self, q):
+        """
+        Approximate percentile with np.percentile's linear interpolation
+
+        Args:
+            q: Percentile or array of percentiles in [0, 100]
+
+        Returns:
+            float or ndarray: Percentile value(s), NaN for an empty sketch
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+
+        indices = np.array(sorted(self.buckets), dtype=np.int64)
+        cumulative = np.cumsum([self.buckets[index] for index in indices.tolist()])
+        bucket_values = 2.0 * np.power(self.gamma, indices) / (self.gamma + 1.0)
+
+        def order_statistic(rank):
+            value = bucket_values[np.searchsorted(cumulative, rank, side='right')]
+            return np.clip(value, self.minimum, self.maximum)
+
+        rank = q / 100.0 * (self.count - 1)
+        lower = np.floor(rank)
+        fraction = rank - lower
+        low_value = order_statistic(lower)
+        high_value = order_statistic(np.minimum(lower + 1, self.count - 1))
+        result = low_value + fraction * (high_value - low_value)
+        result = np.where(q <= 0, self.minimum, np.where(q >= 100, self.maximum, result))
+        return float(result) if result.ndim == 0 else result
+
+
+class LinearTrendAccumulator:
+    """
+    Running least-squares fit of y = slope * x + offset from co-moments
+
+    When x is omitted, values are indexed 0, 1, 2, ... in arrival order, which
+    matches fitting the concatenated contour against np.arange(n).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.c_xx = 0.0
+        self.c_xy = 0.0
+        self.c_yy = 0.0
+
+    def update(self, y, x=None):
+        """
+        Add a batch of points
+
+        Args:
+            y: Array-like of response values
+            x: Optional array-like of predictor values (default: running index)
+        """
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if len(y) == 0:
+            return
+        if x is None:
+            x = self.count + np.arange(len(y), dtype=np.float64)
+        else:
+            x = np.asarray(x, dtype=np.float64).ravel()
+        batch = LinearTrendAccumulator()
+        batch.count = len(y)
+        batch.mean_x = float(np.mean(x))
+        batch.mean_y = float(np.mean(y))
+        dx = x - batch.mean_x
+        dy = y - batch.mean_y
+        batch.c_xx = float(np.dot(dx, dx))
+        batch.c_xy = float(np.dot(dx, dy))
+        batch.c_yy = float(np.dot(dy, dy))
+        self.merge(batch)
+
+    def merge(self, other, x_offset=0.0):
+        """
+        Combine with another accumulator in place (exact)
+
+        Args:
+            other: LinearTrendAccumulator
+            x_offset: Shift applied to other's x values, e.g. self.count when
+                      other was filled with a running index starting at 0
+
+        Returns:
+            LinearTrendAccumulator: self
+        """
+        if other.count == 0:
+            return self
+        other_mean_x = other.mean_x + x_offset
+        if self.count == 0:
+            self.count, self.mean_x, self.mean_y = other.count, other_mean_x, other.mean_y
+            self.c_xx, self.c_xy, self.c_yy = other.c_xx, other.c_xy, other.c_yy
+            return self
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta_x = other_mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        weight = na * nb / n
+
+        self.c_xx += other.c_xx + delta_x * delta_x * weight
+        self.c_xy += other.c_xy + delta_x * delta_y * weight
+        self.c_yy += other.c_yy + delta_y * delta_y * weight
+        self.mean_x += delta_x * nb / n
+        self.mean_y += delta_y * nb / n
+        self.count = n
+        return self
+
+    def result(self):
+        """
+        Fitted line and its mean squared error
+
+        Returns:
+            tuple: (slope, offset, mse), NaN when fewer than two distinct x values
+        """
+        if self.count < 2 or self.c_xx == 0:
+            return np.nan, np.nan, np.nan
+        slope = self.c_xy / self.c_xx
+        offset = self.mean_y - slope * self.mean_x
+        mse = max(self.c_yy - slope * self.c_xy, 0.0) / self.count
+        return slope, offset, mse
+
+
+def linear_trend(values):
+    """
+    Closed-form least-squares fit of a contour against its sample index
+
+    Equivalent to LinearRegression().fit(np.arange(n).reshape(-1, 1), values)
+    followed by mean_squared_error on the predictions.
+
+    Args:
+        values: 1-D array-like contour
+
+    Returns:
+        tuple: (slope, offset, mse), NaN when the contour has fewer than two values
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    n = len(values)
+    if n < 2:
+        return np.nan, np.nan, np.nan
+    x = np.arange(n, dtype=np.float64)
+    mean_x = (n - 1) / 2.0
+    slope = np.dot(x - mean_x, values) / (n * (n * n - 1) / 12.0)
+    offset = np.mean(values) - slope * mean_x
+    residuals = values - (offset + slope * x)
+    return float(slope), float(offset), float(np.mean(residuals * residuals))
+
+
+def batch_linear_trend(contours, lengths=None):
+    """
+    Closed-form least-squares fits for many contours in one vectorized pass
+
+    Args:
+        contours: Either a padded 2-D array (n_contours, max_length) or a list
+                  of 1-D arrays of different lengths (ragged)
+        lengths: Valid length of each row when contours is a padded array
+                 (None means every row is fully used)
+
+    Returns:
+        tuple: (slopes, offsets, mses) arrays of shape (n_contours,), NaN for
+               contours with fewer than two values
+    """
+    if isinstance(contours, np.ndarray) and contours.ndim == 2:
+        n_contours, max_length = contours.shape
+        lengths = np.full(n_contours, max_length) if lengths is None else np.asarray(lengths)
+        valid = np.arange(max_length)[np.newaxis, :] < lengths[:, np.newaxis]
+        values = contours[valid].astype(np.float64)
+    else:
+        arrays = [np.asarray(contour, dtype=np.float64).ravel() for contour in contours]
+        lengths = np.array([len(array) for array in arrays])
+        values = np.concatenate(arrays) if arrays else np.empty(0)
+        n_contours = len(arrays)
+
+    lengths = lengths.astype(np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    nonempty = lengths > 0
+    n = lengths.astype(np.float64)
+    mean_x = (n - 1) / 2.0
+
+    def segment_sums(array):
+        sums = np.zeros(n_contours)
+        if np.any(nonempty):
+            sums[nonempty] = np.add.reduceat(array, starts[nonempty])
+        return sums
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Index of each value within its contour, centred on the contour's mean index
+        centred_x = np.arange(len(values), dtype=np.float64) - np.repeat(starts + mean_x, lengths)
+        mean_y = segment_sums(values) / n
+        centred_y = values - np.repeat(mean_y, lengths)
+        s_xy = segment_sums(centred_x * centred_y)
+        s_yy = segment_sums(centred_y * centred_y)
+        slopes = s_xy / (n * (n * n - 1) / 12.0)
+        offsets = mean_y - slopes * mean_x
+        mses = np.maximum(s_yy - slopes * s_xy, 0.0) / n
+
+    too_short = lengths < 2
+    slopes[too_short] = np.nan
+    offsets[too_short] = np.nan
+    mses[too_short] = np.nan
+    return slopes, offsets, mses
@@ -0,0 +1,179 @@
+"""
+Duration-aware dispatch of files to worker processes within a memory budget
+
+Analysis time and peak memory both grow with the length of a recording, so
+dispatching files in ID order leaves whichever long interview comes last
+as a straggler, and a few long files landing on the workers at once can
+exhaust memory. Durations and sample rates come from the audio manifest or
+the file headers up front (no decoding), giving each file an estimated
+cost and peak memory. Work is dispatched longest first, and a task is
+admitted only while the projected memory of the running tasks stays within
+the budget. A task that does not fit waits for running ones to finish;
+smaller tasks may start ahead of it, but only in memory it does not need,
+so it is not starved.
+"""
+import heapq
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_index import audio_header
+
+# Resident memory of an idle extraction worker (interpreter, numpy, Praat) in MB
+WORKER_BASELINE_MB = 150.0
+
+# Peak working memory of an analysis on top of the worker baseline: per
+# sample (decoded float64 samples, Praat's copies and resampled signals)
+# and per second (analysis frames). Fitted on 16 and 44.1 kHz recordings
+# of 30-600 s, where it is within 15% of the measured peak.
+BYTES_PER_SAMPLE = 40
+MB_PER_SECOND = 0.35
+
+# Header assumed for unreadable files when no file's header can be read
+UNKNOWN_HEADER = {'duration': 600.0, 'sample_rate': 48000}
+
+
+def analysis_memory_mb(seconds, sample_rate):
+    """Estimated peak working memory (MB) of analysing this many seconds of audio at once"""
+    return seconds * (sample_rate * BYTES_PER_SAMPLE / 2 ** 20 + MB_PER_SECOND)
+
+
+def read_headers(paths, max_workers=16, known=None):
+    """
+    Read the duration and sample rate of many files from their headers
+
+    Headers are read in threads, since on network storage the time goes to
+    opening files. Files whose header cannot be read are given the longest
+    readable file's header (UNKNOWN_HEADER when none can be read), so they
+    are neither underestimated nor scheduled last.
+
+    Args:
+        paths: Audio file paths
+        max_workers: Reader threads
+        known: Optional {path: header} already known (e.g. from the audio
+               manifest); only the other files are opened
+
+    Returns:
+        tuple: (headers, n_unknown) - one dict with 'duration' and 'sample_rate'
+               per path, and the number of files whose header could not be read
+    """
+    paths = list(paths)
+    headers = [known.get(path) if known is not None else None for path in paths]
+    missing = [index for index, header in enumerate(headers) if header is None]
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor:
+            for index, header in zip(missing, executor.map(audio_header, [paths[index] for index in missing])):
+                headers[index] = header
+    readable = [header for header in headers if header is not None]
+    fallback = max(readable, key=lambda header: header['duration']) if readable else UNKNOWN_HEADER
+    return [header if header is not None else fallback for header in headers], len(headers) - len(readable)
+
+
+def pool_size(max_workers, budget_mb, memory_mb):
+    """
+    Number of workers whose baselines, each running a typical task, fit the budget
+
+    Args:
+        max_workers: Most workers wanted
+        budget_mb: Memory budget of the whole pool
+        memory_mb: Estimated peak memory per task beyond the worker baseline
+
+    Returns:
+        int: Between 1 and max_workers
+    """
+    typical_mb = statistics.median(memory_mb) if len(memory_mb) > 0 else 0.0
+    return max(1, min(max_workers, int(budget_mb // (WORKER_BASELINE_MB + typical_mb))))
+
+
+def balanced_chunks(costs, n_chunks):
+    """
+    Group tasks into chunks of similar total cost, longest first
+
+    Tasks are taken longest first and each goes to the chunk with the lowest
+    total so far (longest-processing-time rule), so a long file shares its
+    chunk with few others and no chunk is much longer than the longest file
+    or the average chunk.
+
+    Args:
+        costs: Estimated cost per task
+        n_chunks: Number of chunks
+
+    Returns:
+        list: Lists of task indices, each longest first, the chunks ordered
+              by decreasing total cost (empty chunks are dropped)
+    """
+    order = sorted(range(len(costs)), key=lambda index: -costs[index])
+    heap = [(0.0, chunk) for chunk in range(max(1, min(n_chunks, len(order))))]
+    chunks = [[] for _ in heap]
+    for index in order:
+        total, chunk = heapq.heappop(heap)
+        chunks[chunk].append(index)
+        heapq.heappush(heap, (total + costs[index], chunk))
+    totals = {chunk: total for total, chunk in heap}
+    return [chunks[chunk] for chunk in sorted(totals, key=lambda chunk: -totals[chunk]) if chunks[chunk]]
+
+
+class AdmissionQueue:
+    def __init__(self, budget_mb=None):
+        """
+        Queue of tasks started in order while their projected memory fits a budget
+
+        Args:
+            budget_mb: Total memory the running tasks may be projected to use
+                       (None for no budget: tasks start in order)
+        """
+        self.budget_mb = budget_mb
+        self.pending = []
+        self.running = 0
+        self.in_use_mb = 0.0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def push(self, task, memory_mb=0.0):
+        """Queue a task with its estimated peak memory (MB)"""
+        self.pending.append((task, memory_mb))
+
+    def fits(self, memory_mb):
+        """Whether this much more memory stays within the budget"""
+        return self.budget_mb is None or self.in_use_mb + memory_mb <= self.budget_mb
+
+    def pop(self):
+        """
+        Take the next task that may start now
+
+        The first queued task starts when it fits in the budget, or when
+        nothing is running (so a task larger than the whole budget still runs,
+        alone). Otherwise the first later task that fits beside the memory
+        the first one is waiting for starts instead.
+
+        Returns:
+            tuple: (task, memory_mb), or None when no queued task may start
+        """
+        if not self.pending:
+            return None
+        head_mb = self.pending[0][1]
+        if self.running == 0 or self.fits(head_mb):
+            position = 0
+        else:
+            position = next((position for position, (_, memory_mb) in enumerate(self.pending[1:], 1)
+                             if self.fits(memory_mb + head_mb)), None)
+            if position is None:
+                return None
+        task, memory_mb = self.pending.pop(position)
+        self.running += 1
+        self.in_use_mb += memory_mb
+        return task, memory_mb
+
+    def requeue(self, task, memory_mb):
+        """Put a task taken with pop() that could not start back at the front of the queue"""
+        self.finished(memory_mb)
+        self.pending.insert(0, (task, memory_mb))
+
+    def finished(self, memory_mb):
+        """Release the memory of a task taken with pop() that has ended"""
+        self.running -= 1
+        self.in_use_mb = max(0.0, self.in_use_mb - memory_mb)
+
+    def clear(self):
+        """Drop the queued tasks"""
+        self.pending.clear()
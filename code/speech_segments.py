@@ -0,0 +1,228 @@
+"""
+Participant speech regions for gating the feature analyses
+
+Interview recordings contain silence and the interviewer's turns. The
+extractor can restrict every feature family to the participant's speech,
+taken either from a transcript timing file (DAIC-WOZ style
+<id>_TRANSCRIPT.csv with a speaker column, E-DAIC <id>_Transcript.csv, or
+Whisper JSON segments) or from an energy-based voice activity detector run
+over non-overlapping 10ms frames.
+"""
+import csv
+import json
+import os
+
+import numpy as np
+
+# Voice activity detection and segment clean-up settings
+SPEECH_GATING_PARAMETERS = {
+    'frame_length': 0.01,   # VAD frame (and hop) length in seconds
+    'threshold_db': -30.0,  # Speech frames are within this many dB of the loud (95th percentile) frames
+    'floor_db': -60.0,      # ... and above this absolute level (dB re full scale)
+    'min_speech': 0.2,      # Shorter detected bursts are dropped
+    'min_silence': 0.3,     # Shorter pauses inside speech are bridged
+    'padding': 0.1,         # Added on each side of detected speech
+    'margin': 0.1,          # Context analysed around each region (frames there are not counted)
+    'speaker': 'participant',
+}
+
+# Transcript files looked up for a participant, next to the audio or in the transcript directories
+TRANSCRIPT_PATTERNS = ('{id}_TRANSCRIPT.csv', '{id}_Transcript.csv', '{id}_transcript.csv',
+                       '{id}_transcript.json', '{id}.json')
+
+START_COLUMNS = ('start_time', 'start', 'starttime', 'begin')
+STOP_COLUMNS = ('stop_time', 'end_time', 'stop', 'end', 'stoptime', 'endtime')
+SPEAKER_COLUMNS = ('speaker', 'role', 'personality')
+
+
+def frame_powers(samples, frame_samples):
+    """
+    Mean power of consecutive non-overlapping frames
+
+    Args:
+        samples: 1-D audio buffer
+        frame_samples: Frame length in samples
+
+    Returns:
+        ndarray: Mean square per complete frame
+    """
+    n_frames = len(samples) // frame_samples
+    frames = np.asarray(samples[:n_frames * frame_samples], dtype=np.float64).reshape(n_frames, frame_samples)
+    return np.einsum('ij,ij->i', frames, frames) / frame_samples
+
+
+def clean_segments(segments, duration=None, min_silence=0.0, padding=0.0):
+    """
+    Pad, sort, clip and merge speech segments
+
+    Args:
+        segments: Iterable of (start, end) times in seconds
+        duration: Recording duration to clip to (None to keep the end times)
+        min_silence: Gaps shorter than this are merged
+        padding: Seconds added on each side of every segment
+
+    Returns:
+        ndarray: Disjoint (start, end) rows sorted by start time
+    """
+    segments = np.asarray(list(segments), dtype=np.float64).reshape(-1, 2)
+    segments = segments[segments[:, 1] > segments[:, 0]]
+    if len(segments) == 0:
+        return np.empty((0, 2))
+
+    segments = segments[np.argsort(segments[:, 0])]
+    segments[:, 0] = np.maximum(segments[:, 0] - padding, 0.0)
+    segments[:, 1] += padding
+    if duration is not None:
+        segments[:, 1] = np.minimum(segments[:, 1], duration)
+        segments = segments[segments[:, 1] > segments[:, 0]]
+
+    merged = [segments[0].copy()] if len(segments) else []
+    for start, end in segments[1:]:
+        if start - merged[-1][1] < min_silence:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append(np.array([start, end]))
+    return np.array(merged).reshape(-1, 2)
+
+
+def detect_speech_segments(powers, frame_length=SPEECH_GATING_PARAMETERS['frame_length'],
+                           threshold_db=SPEECH_GATING_PARAMETERS['threshold_db'],
+                           floor_db=SPEECH_GATING_PARAMETERS['floor_db'],
+                           min_speech=SPEECH_GATING_PARAMETERS['min_speech'],
+                           min_silence=SPEECH_GATING_PARAMETERS['min_silence'],
+                           padding=SPEECH_GATING_PARAMETERS['padding']):
+    """
+    Energy-based voice activity detection
+
+    Frames louder than both the absolute floor and the loud frames' level
+    minus threshold_db are speech; short pauses are bridged, short bursts
+    dropped and the remaining regions padded.
+
+    Args:
+        powers: Mean power of consecutive frames (see frame_powers())
+        frame_length: Frame length in seconds
+        threshold_db: Level relative to the 95th percentile frame
+        floor_db: Absolute level in dB re full scale
+        min_speech: Minimum speech region length in seconds
+        min_silence: Minimum pause length in seconds
+        padding: Seconds added on each side of every region
+
+    Returns:
+        ndarray: (start, end) rows in seconds
+    """
+    powers = np.asarray(powers, dtype=np.float64)
+    if len(powers) == 0:
+        return np.empty((0, 2))
+
+    level_db = 10 * np.log10(powers + 1e-12)
+    threshold = max(np.percentile(level_db, 95) + threshold_db, floor_db)
+    speech = level_db > threshold
+
+    # Run boundaries of the speech mask
+    edges = np.diff(np.concatenate([[0], speech.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1) * frame_length
+    ends = np.flatnonzero(edges == -1) * frame_length
+
+    segments = clean_segments(np.column_stack([starts, ends]), min_silence=min_silence)
+    segments = segments[segments[:, 1] - segments[:, 0] >= min_speech]
+    return clean_segments(segments, duration=len(powers) * frame_length, padding=padding)
+
+
+def find_transcript(participant_id, audio_path=None, search_dirs=()):
+    """
+    Locate a participant's transcript timing file
+
+    Args:
+        participant_id: ID of the participant
+        audio_path: Audio file whose directory is searched first
+        search_dirs: Further directories to search
+
+    Returns:
+        str: Path of the first matching file, or None
+    """
+    directories = ([os.path.dirname(audio_path)] if audio_path else []) + list(search_dirs)
+    for directory in directories:
+        for pattern in TRANSCRIPT_PATTERNS:
+            path = os.path.join(directory, pattern.format(id=participant_id))
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def read_transcript_segments(path, speaker=SPEECH_GATING_PARAMETERS['speaker']):
+    """
+    Speech segments of one speaker from a transcript timing file
+
+    CSV/TSV files need start and stop time columns (e.g. start_time/stop_time
+    or Start_Time/End_Time); when a speaker column is present only rows of
+    the given speaker are kept. JSON files hold Whisper-style 'segments'
+    with 'start' and 'end' (and an optional 'speaker').
+
+    Args:
+        path: Transcript file path
+        speaker: Speaker to keep, compared case-insensitively
+
+    Returns:
+        ndarray: Merged (start, end) rows in seconds
+
+    Raises:
+        ValueError: If the file has no recognisable timing columns
+    """
+    if path.lower().endswith('.json'):
+        with open(path) as f:
+            data = json.load(f)
+        rows = data.get('segments', []) if isinstance(data, dict) else data
+        segments = [(row['start'], row['end']) for row in rows
+                    if 'speaker' not in row or str(row['speaker']).strip().lower() == speaker]
+        return clean_segments(segments)
+
+    with open(path, newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = '\t' if sample.count('\t') > sample.count(',') else ','
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [column.strip().lower() for column in next(reader, [])]
+
+        def column(names):
+            return next((header.index(name) for name in names if name in header), None)
+
+        start_column, stop_column, speaker_column = column(START_COLUMNS), column(STOP_COLUMNS), column(SPEAKER_COLUMNS)
+        if start_column is None or stop_column is None:
+            raise ValueError(f"No start/stop time columns in {path}")
+
+        segments = []
+        for row in reader:
+            if len(row) <= max(start_column, stop_column):
+                continue
+            if speaker_column is not None and row[speaker_column].strip().lower() != speaker:
+                continue
+            try:
+                segments.append((float(row[start_column]), float(row[stop_column])))
+            except ValueError:
+                continue
+    return clean_segments(segments)
+
+
+def segments_duration(segments):
+    """Total length of (start, end) segments in seconds"""
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2)
+    return float(np.sum(segments[:, 1] - segments[:, 0]))
+
+
+def leading_segments(segments, max_duration):
+    """
+    The first max_duration seconds of speech
+
+    Args:
+        segments: Disjoint (start, end) rows sorted by start time
+        max_duration: Seconds of speech to keep
+
+    Returns:
+        ndarray: Leading (start, end) rows, the last one shortened to fit
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2)
+    lengths = segments[:, 1] - segments[:, 0]
+    before = np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+    kept = segments[before < max_duration].copy()
+    kept[:, 1] = np.minimum(kept[:, 1], kept[:, 0] + max_duration - before[before < max_duration])
+    return kept
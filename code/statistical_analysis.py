@@ -0,0 +1,373 @@
+"""
+Vectorized statistical analysis of the feature table
+
+Runs the study's tests for every feature column at once (see
+docs/ACTUAL_methodology_conducted.md): Pearson correlations with PHQ-8,
+Mann-Whitney U tests and Cohen's d between genders in the MDD group,
+Spearman correlations with PHQ-8 by gender, Benjamini-Hochberg FDR and
+PHQ-8 ~ Feature + Gender + Feature x Gender regressions.
+
+Features are handled as one matrix. Columns are grouped by their pattern of
+missing values (usually only a handful, e.g. participants whose audio failed
+are missing every acoustic feature), each group is complete-case and dense,
+and every test is a few matrix operations on it: columns are ranked once,
+correlations are matrix products and the interaction models are solved as a
+batch of 4x4 normal equations. P-values match scipy.stats (asymptotic
+Mann-Whitney with tie and continuity correction) and ordinary least squares.
+"""
+import numpy as np
+
+# Column names of the E-DAIC label files
+OUTCOME_COLUMN = 'PHQ_Score'
+GENDER_COLUMN = 'Gender'
+MDD_COLUMN = 'PHQ_Binary'
+INTERACTION_TERMS = ['intercept', 'feature', 'gender', 'feature_x_gender']
+
+
+def missing_patterns(X, *vectors):
+    """
+    Group columns of X by the rows where they (and the vectors) are present
+
+    Args:
+        X: Array of shape (n_rows, n_columns) with NaN for missing values
+        vectors: 1-D arrays (e.g. the outcome) whose missing rows are excluded everywhere
+
+    Yields:
+        tuple: (row_mask, column_indices) for each distinct pattern with at least one row
+    """
+    present = ~np.isnan(X)
+    for vector in vectors:
+        present &= ~np.isnan(np.asarray(vector, dtype=np.float64))[:, np.newaxis]
+    if X.shape[1] == 0:
+        return
+    patterns, inverse = np.unique(present.T, axis=0, return_inverse=True)
+    for pattern_index, row_mask in enumerate(patterns):
+        if np.any(row_mask):
+            yield row_mask, np.flatnonzero(inverse.ravel() == pattern_index)
+
+
+def rank_columns(X):
+    """
+    Average ranks (1-based, ties share their mean rank) of every column
+
+    Args:
+        X: Complete array of shape (n_rows, n_columns)
+
+    Returns:
+        tuple: (ranks, tie_sums) where tie_sums[j] is the sum of t^3 - t over
+               the tie groups of column j (used by the Mann-Whitney variance)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n = X.shape[0]
+    order = np.argsort(X, axis=0, kind='mergesort')
+    sorted_values = np.take_along_axis(X, order, axis=0)
+
+    group_start = np.ones(X.shape, dtype=bool)
+    group_start[1:] = sorted_values[1:] != sorted_values[:-1]
+    group_end = np.ones(X.shape, dtype=bool)
+    group_end[:-1] = group_start[1:]
+
+    positions = np.arange(1, n + 1, dtype=np.float64)[:, np.newaxis]
+    first = np.maximum.accumulate(np.where(group_start, positions, 0), axis=0)
+    last = np.minimum.accumulate(np.where(group_end, positions, n + 1)[::-1], axis=0)[::-1]
+
+    ranks = np.empty_like(X)
+    np.put_along_axis(ranks, order, (first + last) / 2, axis=0)
+    tie_sizes = np.where(group_start, last - first + 1, 0)
+    return ranks, np.sum(tie_sizes ** 3 - tie_sizes, axis=0)
+
+
+def correlation_columns(X, y):
+    """
+    Pearson r of every column of a complete matrix with y
+
+    Args:
+        X: Array of shape (n_rows, n_columns)
+        y: Array of shape (n_rows,)
+
+    Returns:
+        ndarray: Correlation per column (NaN for constant columns)
+    """
+    X_centred = X - X.mean(axis=0)
+    y_centred = y - y.mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (X_centred.T @ y_centred) / (np.sqrt(np.einsum('ij,ij->j', X_centred, X_centred)) *
+                                         np.sqrt(y_centred @ y_centred))
+    return np.clip(r, -1.0, 1.0)
+
+
+def correlation_p_values(r, n):
+    """Two-sided p-values of correlations with the t distribution (n - 2 degrees of freedom)"""
+    from scipy import stats
+
+    r = np.asarray(r, dtype=np.float64)
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        degrees = n - 2
+        t = r * np.sqrt(degrees / ((1.0 - r) * (1.0 + r)))
+        p = 2 * stats.t.sf(np.abs(t), degrees)
+    return np.where(degrees > 0, p, np.nan)
+
+
+def correlations(X, y, method='pearson'):
+    """
+    Correlation of every feature column with an outcome
+
+    Each column uses the rows where both it and y are present.
+
+    Args:
+        X: Array of shape (n_rows, n_features), NaN for missing values
+        y: Outcome array of shape (n_rows,)
+        method: 'pearson' or 'spearman'
+
+    Returns:
+        dict: 'r', 'p' and 'n' arrays of shape (n_features,)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    r = np.full(X.shape[1], np.nan)
+    n = np.zeros(X.shape[1], dtype=np.int64)
+
+    for rows, columns in missing_patterns(X, y):
+        X_rows, y_rows = X[np.ix_(rows, columns)], y[rows]
+        if method == 'spearman':
+            X_rows = rank_columns(X_rows)[0]
+            y_rows = rank_columns(y_rows[:, np.newaxis])[0][:, 0]
+        elif method != 'pearson':
+            raise ValueError(f"Unknown correlation method '{method}'")
+        r[columns] = correlation_columns(X_rows, y_rows)
+        n[columns] = np.count_nonzero(rows)
+
+    return {'r': r, 'p': correlation_p_values(r, n), 'n': n}
+
+
+def mann_whitney(X, in_first_group):
+    """
+    Two-sided Mann-Whitney U test and Cohen's d between two groups for every column
+
+    Uses the normal approximation with tie and continuity correction
+    (scipy.stats.mannwhitneyu(method='asymptotic')).
+
+    Args:
+        X: Array of shape (n_rows, n_features), NaN for missing values
+        in_first_group: Boolean array of shape (n_rows,), True for the first group
+
+    Returns:
+        dict: 'u' (U of the first group), 'p', 'cohens_d' (first minus second
+              group over the pooled SD), 'n_first' and 'n_second' arrays
+    """
+    from scipy import stats
+
+    X = np.asarray(X, dtype=np.float64)
+    in_first_group = np.asarray(in_first_group, dtype=bool)
+    n_features = X.shape[1]
+    results = {key: np.full(n_features, np.nan) for key in ['u', 'p', 'cohens_d']}
+    results['n_first'] = np.zeros(n_features, dtype=np.int64)
+    results['n_second'] = np.zeros(n_features, dtype=np.int64)
+
+    for rows, columns in missing_patterns(X):
+        X_rows, first = X[np.ix_(rows, columns)], in_first_group[rows]
+        n1, n2 = np.count_nonzero(first), np.count_nonzero(~first)
+        results['n_first'][columns], results['n_second'][columns] = n1, n2
+        if n1 == 0 or n2 == 0:
+            continue
+        n = n1 + n2
+
+        ranks, tie_sums = rank_columns(X_rows)
+        u = ranks[first].sum(axis=0) - n1 * (n1 + 1) / 2.0
+        mean_u = n1 * n2 / 2.0
+        sd_u = np.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_sums / (n * (n - 1))))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = (np.abs(u - mean_u) - 0.5) / sd_u
+        results['u'][columns] = u
+        results['p'][columns] = np.clip(2 * stats.norm.sf(z), 0.0, 1.0)
+
+        if n1 > 1 and n2 > 1:
+            first_values, second_values = X_rows[first], X_rows[~first]
+            pooled_sd = np.sqrt(((n1 - 1) * first_values.var(axis=0, ddof=1) +
+                                 (n2 - 1) * second_values.var(axis=0, ddof=1)) / (n - 2))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                results['cohens_d'][columns] = (first_values.mean(axis=0) - second_values.mean(axis=0)) / pooled_sd
+
+    return results
+
+
+def benjamini_hochberg(p_values):
+    """
+    Benjamini-Hochberg adjusted p-values (q-values)
+
+    Args:
+        p_values: Array of p-values; NaN entries are ignored and stay NaN
+
+    Returns:
+        ndarray: Adjusted p-values with the input's shape
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    adjusted = np.full(p_values.shape, np.nan)
+    valid = ~np.isnan(p_values)
+    m = np.count_nonzero(valid)
+    if m == 0:
+        return adjusted
+
+    p = p_values[valid]
+    order = np.argsort(p)
+    scaled = p[order] * m / np.arange(1, m + 1)
+    monotone = np.minimum.accumulate(scaled[::-1])[::-1]
+    q = np.empty(m)
+    q[order] = np.minimum(monotone, 1.0)
+    adjusted[valid] = q
+    return adjusted
+
+
+def bonferroni(p_values):
+    """Bonferroni adjusted p-values (NaN entries are ignored and stay NaN)"""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    return np.minimum(p_values * np.count_nonzero(~np.isnan(p_values)), 1.0)
+
+
+def interaction_regressions(X, y, gender):
+    """
+    Fit y ~ feature + gender + feature x gender by least squares for every feature
+
+    The design matrices of all features are stacked and solved as one batch
+    of 4x4 normal equations (columns scaled to unit norm for conditioning).
+
+    Args:
+        X: Array of shape (n_rows, n_features), NaN for missing values
+        y: Outcome array of shape (n_rows,)
+        gender: Array of shape (n_rows,) coded 0/1
+
+    Returns:
+        dict: 'coefficients', 'standard_errors', 't' and 'p' arrays of shape
+              (n_features, 4) in INTERACTION_TERMS order, plus 'r_squared'
+              and 'n' of shape (n_features,); NaN for rank-deficient designs
+    """
+    from scipy import stats
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    gender = np.asarray(gender, dtype=np.float64)
+    n_features = X.shape[1]
+    results = {key: np.full((n_features, 4), np.nan) for key in ['coefficients', 'standard_errors', 't', 'p']}
+    results['r_squared'] = np.full(n_features, np.nan)
+    results['n'] = np.zeros(n_features, dtype=np.int64)
+
+    for rows, columns in missing_patterns(X, y, gender):
+        n = np.count_nonzero(rows)
+        results['n'][columns] = n
+        if n <= 4:
+            continue
+        features, outcome, group = X[np.ix_(rows, columns)].T, y[rows], gender[rows]
+
+        # Design of shape (n_columns, n, 4): 1, x, g, x*g
+        design = np.empty((len(columns), n, 4))
+        design[:, :, 0] = 1.0
+        design[:, :, 1] = features
+        design[:, :, 2] = group
+        design[:, :, 3] = features * group
+        scale = np.sqrt(np.einsum('fni,fni->fi', design, design))
+        scale[scale == 0] = 1.0
+        design /= scale[:, np.newaxis, :]
+
+        gram = np.einsum('fni,fnj->fij', design, design)
+        full_rank = np.linalg.matrix_rank(gram) == 4
+        gram_inverse = np.linalg.pinv(gram)
+        beta = np.einsum('fij,fnj,n->fi', gram_inverse, design, outcome)
+        residuals = outcome - np.einsum('fni,fi->fn', design, beta)
+        rss = np.einsum('fn,fn->f', residuals, residuals)
+        sigma2 = rss / (n - 4)
+        standard_errors = np.sqrt(sigma2[:, np.newaxis] * np.diagonal(gram_inverse, axis1=1, axis2=2))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = beta / standard_errors
+            total = np.sum((outcome - outcome.mean()) ** 2)
+            r_squared = 1.0 - rss / total
+        p = 2 * stats.t.sf(np.abs(t), n - 4)
+
+        invalid = ~full_rank
+        for key, values in [('coefficients', beta / scale), ('standard_errors', standard_errors / scale),
+                            ('t', t), ('p', p)]:
+            values[invalid] = np.nan
+            results[key][columns] = values
+        r_squared[invalid] = np.nan
+        results['r_squared'][columns] = r_squared
+
+    return results
+
+
+def analyze_features(data, feature_columns=None, outcome=OUTCOME_COLUMN, gender=GENDER_COLUMN, mdd=MDD_COLUMN):
+    """
+    Run the study's full analysis on a merged feature/label table
+
+    Args:
+        data: pandas DataFrame with one row per participant
+        feature_columns: Features to test (None for every numeric column
+                         except 'id' and the label columns)
+        outcome: Depression severity column (PHQ-8 score)
+        gender: Two-valued gender column (coded 0/1 in E-DAIC)
+        mdd: Column marking MDD participants (1/True); the gender analyses use these rows
+
+    Returns:
+        dict: pandas DataFrames indexed by feature:
+              'correlations' - Pearson r with the outcome over all participants
+                               with Bonferroni and FDR adjusted p-values
+              'gender_differences' - Mann-Whitney U and Cohen's d between the
+                                     genders within the MDD group
+              'gender_correlations' - Spearman rho with the outcome per gender
+                                      within the MDD group
+              'interactions' - outcome ~ feature + gender + feature x gender
+                               over all participants
+    """
+    import pandas as pd
+
+    if feature_columns is None:
+        labels = {'id', outcome, gender, mdd}
+        feature_columns = [column for column in data.select_dtypes(include='number').columns
+                           if column not in labels]
+    feature_columns = list(feature_columns)
+    X = data[feature_columns].to_numpy(dtype=np.float64)
+    y = data[outcome].to_numpy(dtype=np.float64)
+
+    # Two genders, the first (lower) code becomes 0 for the regression
+    gender_values = data[gender].to_numpy()
+    gender_levels = sorted(pd.unique(data[gender].dropna()))
+    if len(gender_levels) != 2:
+        raise ValueError(f"Column '{gender}' must have exactly two values, found {gender_levels}")
+    gender_code = np.where(pd.isna(data[gender]), np.nan, (gender_values == gender_levels[1]).astype(np.float64))
+    in_mdd = data[mdd].fillna(0).to_numpy().astype(bool)
+
+    results = {}
+
+    overall = correlations(X, y, 'pearson')
+    results['correlations'] = pd.DataFrame({
+        'r': overall['r'], 'p': overall['p'], 'p_bonferroni': bonferroni(overall['p']),
+        'p_fdr': benjamini_hochberg(overall['p']), 'n': overall['n']}, index=feature_columns)
+
+    mdd_rows = in_mdd & ~np.isnan(gender_code)
+    differences = mann_whitney(X[mdd_rows], gender_code[mdd_rows] == 0)
+    results['gender_differences'] = pd.DataFrame({
+        'u': differences['u'], 'p': differences['p'], 'p_fdr': benjamini_hochberg(differences['p']),
+        'cohens_d': differences['cohens_d'], f'n_{gender_levels[0]}': differences['n_first'],
+        f'n_{gender_levels[1]}': differences['n_second']}, index=feature_columns)
+
+    by_gender = {}
+    for code, level in enumerate(gender_levels):
+        rows = mdd_rows & (gender_code == code)
+        spearman = correlations(X[rows], y[rows], 'spearman')
+        by_gender[f'rho_{level}'] = spearman['r']
+        by_gender[f'p_{level}'] = spearman['p']
+        by_gender[f'p_fdr_{level}'] = benjamini_hochberg(spearman['p'])
+        by_gender[f'n_{level}'] = spearman['n']
+    results['gender_correlations'] = pd.DataFrame(by_gender, index=feature_columns)
+
+    regressions = interaction_regressions(X, y, gender_code)
+    interactions = {}
+    for term_index, term in enumerate(INTERACTION_TERMS):
+        interactions[f'{term}_coefficient'] = regressions['coefficients'][:, term_index]
+        interactions[f'{term}_p'] = regressions['p'][:, term_index]
+    interactions['feature_x_gender_p_fdr'] = benjamini_hochberg(regressions['p'][:, 3])
+    interactions['r_squared'] = regressions['r_squared']
+    interactions['n'] = regressions['n']
+    results['interactions'] = pd.DataFrame(interactions, index=feature_columns)
+
+    return results
@@ -0,0 +1,237 @@
+"""
+Supervised worker processes with per-task time and memory budgets
+
+A process pool cannot stop one task: a file that hangs inside Praat or
+keeps allocating holds its worker (and the run) until it finishes. Here
+every worker runs one task at a time over its own pipe, while the parent
+watches the task's wall time and the worker's resident memory. A worker
+that exceeds its budget, or dies, is killed and replaced, and the task is
+reported back so the caller can retry it more cheaply or give up on it.
+Killing a worker only breaks its own pipe, so the other workers carry on.
+Tasks can carry a memory estimate, and then only start while the estimates
+of the running tasks fit a memory budget (scheduling.py).
+"""
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+
+import psutil
+
+from scheduling import AdmissionQueue
+
+# Outcome of a supervised task
+TASK_STATUSES = ('ok', 'error', 'timeout', 'memory', 'died')
+
+
+def supervised_worker(connection, task, initializer=None, initargs=()):
+    """
+    Worker process loop: run tasks received over the connection until None arrives
+
+    Each task is acknowledged with ('started', None) before it runs, so the
+    supervisor's clock does not count process start-up and the initializer.
+
+    Args:
+        connection: Worker end of the pipe to the supervisor
+        task: Picklable function called with each task's arguments
+        initializer: Optional function called once when the worker starts
+        initargs: Arguments of the initializer
+    """
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        args = connection.recv()
+        if args is None:
+            break
+        connection.send(('started', None))
+        try:
+            result = ('ok', task(*args))
+        except Exception as e:
+            result = ('error', f"{type(e).__name__}: {e}")
+        connection.send(result)
+
+
+def process_memory_mb(pid):
+    """Resident memory of a process and its children in MB (0 once it has exited)"""
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / 2 ** 20
+    except psutil.Error:
+        return 0.0
+
+
+class SupervisedWorker:
+    def __init__(self, context, task, initializer, initargs):
+        """Start one worker process connected by a pipe"""
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=supervised_worker,
+                                       args=(worker_connection, task, initializer, initargs), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.key = None
+        self.args = None
+        self.started = None
+        self.memory_mb = 0.0
+
+    def assign(self, key, args, memory_mb=0.0):
+        """Send a task (with its estimated memory); its clock starts when the worker acknowledges it"""
+        self.key, self.args, self.started, self.memory_mb = key, args, None, memory_mb
+        self.connection.send(args)
+
+    def release(self):
+        """Forget the finished task; returns (key, args, memory_mb)"""
+        task = (self.key, self.args, self.memory_mb)
+        self.key = self.args = self.started = None
+        self.memory_mb = 0.0
+        return task
+
+    def kill(self):
+        """Stop the worker process immediately"""
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self, timeout=5.0):
+        """Ask an idle worker to exit, killing it if it does not"""
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class SupervisedPool:
+    def __init__(self, task, max_workers=1, time_limit=None, memory_limit_mb=None,
+                 initializer=None, initargs=(), poll_interval=0.25, memory_budget_mb=None):
+        """
+        Set up a pool of supervised workers (started on demand)
+
+        Args:
+            task: Picklable module-level function run in the workers
+            max_workers: Number of worker processes
+            time_limit: Wall-clock seconds a task may run, from when its worker
+                        receives it (None for no limit)
+            memory_limit_mb: Resident memory a worker may reach while running a
+                             task, including the interpreter (None for no limit)
+            initializer: Optional picklable function run once in each new worker
+            initargs: Arguments of the initializer
+            poll_interval: Seconds between budget checks
+            memory_budget_mb: Total estimated memory of the tasks running at
+                              once (None to start tasks whenever a worker is free)
+        """
+        self.task = task
+        self.max_workers = max(1, max_workers)
+        self.time_limit = time_limit
+        self.memory_limit_mb = memory_limit_mb
+        self.initializer = initializer
+        self.initargs = initargs
+        self.poll_interval = poll_interval
+        self.context = multiprocessing.get_context()
+        self.pending = AdmissionQueue(memory_budget_mb)
+        self.idle = []
+        self.busy = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def submit(self, key, args, memory_mb=0.0):
+        """
+        Queue a task (may be called while iterating over results())
+
+        Tasks start in submission order, except that a later task may start
+        ahead of one that does not fit the memory budget yet.
+
+        Args:
+            key: Identifier returned with the task's outcome
+            args: Tuple of arguments for the task function
+            memory_mb: Estimated peak memory of the task, counted against memory_budget_mb
+        """
+        self.pending.push((key, tuple(args)), memory_mb)
+
+    def over_budget(self, worker, now):
+        """Status of a busy worker that must be stopped, or None"""
+        if not worker.process.is_alive():
+            return 'died'
+        if self.time_limit is not None and worker.started is not None and now - worker.started > self.time_limit:
+            return 'timeout'
+        if self.memory_limit_mb is not None and process_memory_mb(worker.process.pid) > self.memory_limit_mb:
+            return 'memory'
+        return None
+
+    def results(self):
+        """
+        Run the queued tasks, yielding each outcome as it is known
+
+        Yields:
+            tuple: (key, args, status, result) where status is one of
+                   TASK_STATUSES and result is the task's return value ('ok'),
+                   the error message ('error') or None (the worker was killed
+                   for exceeding its budget, or died)
+        """
+        while self.pending or self.busy:
+            while len(self.busy) < self.max_workers:
+                admitted = self.pending.pop()
+                if admitted is None:
+                    break
+                (key, args), memory_mb = admitted
+                if self.idle:
+                    worker = self.idle.pop()
+                else:
+                    worker = SupervisedWorker(self.context, self.task, self.initializer, self.initargs)
+                worker.assign(key, args, memory_mb)
+                self.busy.append(worker)
+
+            timeout = self.poll_interval
+            started = [worker.started for worker in self.busy if worker.started is not None]
+            if self.time_limit is not None and started:
+                # Wake up for the earliest deadline
+                deadline = min(started) + self.time_limit
+                timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+            ready = wait([worker.connection for worker in self.busy], timeout=timeout)
+            finished = []
+            for worker in self.busy:
+                if worker.connection in ready:
+                    try:
+                        status, result = worker.connection.recv()
+                    except (EOFError, OSError):
+                        continue  # Died mid-task; handled with the budget checks below
+                    if status == 'started':
+                        worker.started = time.monotonic()
+                        continue
+                    finished.append((worker, status, result))
+
+            now = time.monotonic()
+            for worker, status, result in finished:
+                self.busy.remove(worker)
+                self.idle.append(worker)
+                key, args, memory_mb = worker.release()
+                self.pending.finished(memory_mb)
+                yield key, args, status, result
+
+            for worker in list(self.busy):
+                status = self.over_budget(worker, now)
+                if status is None:
+                    continue
+                # Replaced by a fresh worker when the next task starts
+                worker.kill()
+                self.busy.remove(worker)
+                key, args, memory_mb = worker.release()
+                self.pending.finished(memory_mb)
+                yield key, args, status, None
+
+    def close(self):
+        """Stop all workers (running tasks are abandoned)"""
+        for worker in self.busy:
+            worker.kill()
+        for worker in self.idle:
+            worker.stop()
+        self.busy, self.idle = [], []
+        self.pending.clear()
@@ -0,0 +1,44 @@
+"""AnalysisContext: pitch and glottal pulses at the native rate, formants on the pyramid level"""
+import numpy as np
+import pytest
+
+from benchmark_features import synthesize_voiced_signal
+from frequency_features import (AnalysisContext, FORMANT_PARAMETERS, JITTER_FEATURE_MEASURES, JITTER_PARAMETERS,
+                                FrequencyFeatureExtractor)
+
+parselmouth = pytest.importorskip('parselmouth')
+from parselmouth.praat import call  # noqa: E402
+
+PRAAT_QUERIES = {'local': "Get jitter (local)", 'local_absolute': "Get jitter (local, absolute)",
+                 'rap': "Get jitter (rap)", 'ppq5': "Get jitter (ppq5)", 'ddp': "Get jitter (ddp)"}
+
+
+@pytest.mark.parametrize('sample_rate', [44100, 16000])
+def test_jitter_matches_native_rate_praat(sample_rate):
+    samples = synthesize_voiced_signal(5.0, sample_rate, f0=150.0, jitter=0.01, seed=1)
+    sound = parselmouth.Sound(samples, sampling_frequency=sample_rate)
+    features = FrequencyFeatureExtractor().extract_jitter_features(sound, AnalysisContext(sound))
+
+    point_process = call(sound, "To PointProcess (periodic, cc)",
+                         JITTER_PARAMETERS['pitch_floor'], JITTER_PARAMETERS['pitch_ceiling'])
+    for feature_name, measure in JITTER_FEATURE_MEASURES.items():
+        if measure not in PRAAT_QUERIES:
+            continue
+        expected = call(point_process, PRAAT_QUERIES[measure], 0, 0, JITTER_PARAMETERS['period_floor'],
+                        JITTER_PARAMETERS['period_ceiling'], JITTER_PARAMETERS['maximum_period_factor'])
+        assert features[feature_name] == pytest.approx(expected, rel=1e-9), feature_name
+
+
+def test_formants_use_the_pyramid_level():
+    samples = synthesize_voiced_signal(2.0, 44100, seed=2)
+    sound = parselmouth.Sound(samples, sampling_frequency=44100)
+    analysis = AnalysisContext(sound)
+
+    formant = analysis.get_formant(**FORMANT_PARAMETERS)
+    expected = sound.to_formant_burg(**FORMANT_PARAMETERS)
+    assert analysis.get_sound(2 * FORMANT_PARAMETERS['maximum_formant']).sampling_frequency == 11000
+    for number in (1, 2, 3):
+        times = np.arange(0.1, 1.9, 0.1)
+        values = [formant.get_value_at_time(number, t) for t in times]
+        reference = [expected.get_value_at_time(number, t) for t in times]
+        assert values == pytest.approx(reference, rel=1e-3), number
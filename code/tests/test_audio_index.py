@@ -0,0 +1,117 @@
+"""AudioManifest: incremental updates, duplicate IDs and root subsets"""
+import os
+
+import numpy as np
+import pytest
+
+from audio_index import AudioManifest
+
+sf = pytest.importorskip('soundfile')
+
+PAST_NS = 10 ** 18  # 2001, well outside RECENT_CHANGE_NS
+
+
+def write_wav(path, seconds, sample_rate=16000):
+    """Write a silent PCM16 file, creating its directory"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sf.write(str(path), np.zeros(int(seconds * sample_rate)), sample_rate, subtype='PCM_16')
+
+
+def age_directories(root):
+    """Set directory modification times to a fixed past time, so updates may reuse them"""
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, ns=(PAST_NS, PAST_NS))
+
+
+def durations(manifest):
+    return {entry['participant_id']: entry['duration'] for entry in manifest.entries()}
+
+
+def test_added_modified_and_deleted_files(tmp_path):
+    root = tmp_path / 'audio'
+    write_wav(root / 'a' / '301_AUDIO.wav', 1.0)
+    write_wav(root / 'b' / '302_AUDIO.wav', 2.0)
+    (root / 'b' / 'notes.txt').write_text('not audio')
+    age_directories(root)
+
+    with AudioManifest(str(tmp_path / 'manifest.sqlite'), max_workers=2) as manifest:
+        stats = manifest.update([str(root)])
+        assert (stats['directories_listed'], stats['added']) == (3, 2)
+        assert durations(manifest) == {301: pytest.approx(1.0), 302: pytest.approx(2.0)}
+
+        stats = manifest.update([str(root)])
+        assert (stats['directories_listed'], stats['directories_reused']) == (0, 3)
+
+        write_wav(root / 'a' / '303_AUDIO.wav', 3.0)
+        stats = manifest.update([str(root)])
+        assert (stats['directories_listed'], stats['added'], stats['changed']) == (1, 1, 0)
+        assert durations(manifest)[303] == pytest.approx(3.0)
+
+        # Rewritten in place: the directory is unchanged, so only a full rescan sees it
+        age_directories(root)
+        write_wav(root / 'b' / '302_AUDIO.wav', 4.0)
+        age_directories(root)
+        assert manifest.update([str(root)])['changed'] == 0
+        stats = manifest.update([str(root)], full_rescan=True)
+        assert (stats['directories_listed'], stats['changed']) == (3, 1)
+        assert durations(manifest)[302] == pytest.approx(4.0)
+
+        (root / 'a' / '301_AUDIO.wav').unlink()
+        assert manifest.update([str(root)])['removed'] == 1
+        assert sorted(durations(manifest)) == [302, 303]
+
+        (root / 'b' / '302_AUDIO.wav').unlink()
+        (root / 'b' / 'notes.txt').unlink()
+        (root / 'b').rmdir()
+        assert manifest.update([str(root)])['removed'] == 1
+        assert sorted(durations(manifest)) == [303]
+
+        # Directories listed right after a change are listed once more
+        age_directories(root)
+        assert manifest.update([str(root)])['directories_listed'] == 2
+
+    # The manifest persists: a reopened one has the same files and reuses every directory
+    with AudioManifest(str(tmp_path / 'manifest.sqlite')) as manifest:
+        assert manifest.update([str(root)])['directories_listed'] == 0
+        assert sorted(durations(manifest)) == [303]
+
+
+def test_duplicate_ids_keep_the_longest_recording(tmp_path):
+    root = tmp_path / 'audio'
+    write_wav(root / 'session1' / '310_AUDIO.wav', 1.0)
+    write_wav(root / 'session2' / '310_AUDIO.wav', 2.0)
+    write_wav(root / 'session2' / '311.wav', 1.0)
+
+    with AudioManifest(str(tmp_path / 'manifest.sqlite')) as manifest:
+        manifest.update([str(root)])
+        files, duplicates = manifest.files_by_id()
+
+    longer = str(root / 'session2' / '310_AUDIO.wav')
+    assert files == {310: longer, 311: str(root / 'session2' / '311.wav')}
+    assert duplicates == {310: [longer, str(root / 'session1' / '310_AUDIO.wav')]}
+
+
+def test_scanning_a_subset_of_roots(tmp_path):
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    write_wav(first / '320_AUDIO.wav', 1.0)
+    write_wav(second / 'nested' / '321_AUDIO.wav', 1.0)
+    age_directories(tmp_path)
+
+    with AudioManifest(str(tmp_path / 'manifest.sqlite')) as manifest:
+        assert manifest.update([str(first), str(second)])['added'] == 2
+        assert sorted(durations(manifest)) == [320, 321]
+
+        # Rows under the other root are kept but not returned
+        stats = manifest.update([str(first)])
+        assert (stats['directories_reused'], stats['removed']) == (1, 0)
+        assert sorted(durations(manifest)) == [320]
+        assert manifest.files_by_id([321]) == ({}, {})
+
+        stats = manifest.update([str(first), str(second)])
+        assert (stats['directories_listed'], stats['directories_reused'], stats['added']) == (0, 3, 0)
+        assert sorted(durations(manifest)) == [320, 321]
+
+        # A missing root is skipped and reported, not treated as deleted
+        stats = manifest.update([str(first), str(tmp_path / 'missing')])
+        assert stats['removed'] == 0
+        assert sorted(durations(manifest)) == [320]
@@ -0,0 +1,95 @@
+"""parse_wav_header() and AudioReader against soundfile"""
+import struct
+
+import numpy as np
+import pytest
+
+from audio_io import AudioReader, WAVE_FORMAT_PCM, load_audio, parse_wav_header
+
+sf = pytest.importorskip('soundfile')
+
+SAMPLE_RATE = 16000
+
+
+def write_noise(path, subtype, channels=1, frames=4001, wav_format='WAV', seed=0):
+    """Write full-scale noise in the given soundfile subtype and return the path"""
+    samples = np.random.default_rng(seed).uniform(-1, 1, (frames, channels))
+    sf.write(str(path), samples, SAMPLE_RATE, subtype=subtype, format=wav_format)
+    return str(path)
+
+
+def soundfile_mono(path, start=0, stop=None):
+    block, _ = sf.read(path, start=start, stop=stop, dtype='float64', always_2d=True)
+    return block.mean(axis=1)
+
+
+def riff(chunks):
+    """RIFF/WAVE bytes from (chunk id, body) pairs, padding odd bodies"""
+    body = b'WAVE' + b''.join(chunk_id + struct.pack('<I', len(data)) + data + b'\0' * (len(data) % 2)
+                              for chunk_id, data in chunks)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+@pytest.mark.parametrize('wav_format', ['WAV', 'WAVEX'])
+@pytest.mark.parametrize('subtype', ['PCM_U8', 'PCM_16', 'PCM_24', 'PCM_32', 'FLOAT', 'DOUBLE'])
+@pytest.mark.parametrize('channels', [1, 2])
+def test_reads_match_soundfile(tmp_path, subtype, wav_format, channels):
+    path = write_noise(tmp_path / 'noise.wav', subtype, channels, wav_format=wav_format)
+
+    header = parse_wav_header(path)
+    if subtype == 'PCM_24':
+        assert header is None  # Not memory-mappable: AudioReader goes through soundfile
+    else:
+        assert (header['frames'], header['channels'], header['sample_rate']) == (4001, channels, SAMPLE_RATE)
+
+    audio, sample_rate = load_audio(path)
+    assert sample_rate == SAMPLE_RATE
+    np.testing.assert_allclose(audio, soundfile_mono(path), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('subtype', ['PCM_16', 'PCM_24', 'FLOAT'])
+def test_slices_match_soundfile(tmp_path, subtype):
+    path = write_noise(tmp_path / 'noise.wav', subtype, channels=2)
+    with AudioReader(path) as reader:
+        assert reader.frames == 4001
+        for start, stop in [(0, 1), (0, 4001), (1000, 1001), (17, 2999), (4000, 4001), (3000, 3000)]:
+            np.testing.assert_allclose(reader.read(start, stop), soundfile_mono(path, start, stop),
+                                       rtol=0, atol=1e-12, err_msg=f"[{start}:{stop}]")
+
+
+def test_truncated_data_chunk(tmp_path):
+    path = write_noise(tmp_path / 'noise.wav', 'PCM_16', channels=2)
+    full = soundfile_mono(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    # Cut mid-frame: the data chunk still declares every frame
+    truncated = tmp_path / 'truncated.wav'
+    truncated.write_bytes(data[:-1001])
+
+    header = parse_wav_header(str(truncated))
+    assert header['frames'] == (len(data) - 1001 - header['offset']) // 4
+    audio, _ = load_audio(str(truncated))
+    np.testing.assert_allclose(audio, full[:header['frames']], rtol=0, atol=1e-12)
+
+    # Cut inside the headers: not a readable WAV
+    for cut in (10, 30):
+        (tmp_path / 'header.wav').write_bytes(data[:cut])
+        assert parse_wav_header(str(tmp_path / 'header.wav')) is None
+
+
+def test_odd_sized_chunks_are_padded(tmp_path):
+    samples = np.arange(-50, 51, dtype='<i2') * 300
+    fmt = struct.pack('<HHIIHH', WAVE_FORMAT_PCM, 1, SAMPLE_RATE, 2 * SAMPLE_RATE, 2, 16)
+    path = tmp_path / 'odd.wav'
+    path.write_bytes(riff([(b'LIST', b'INFOabc'), (b'fmt ', fmt), (b'junk', b'x'), (b'data', samples.tobytes())]))
+
+    header = parse_wav_header(str(path))
+    assert header['frames'] == len(samples)
+    audio, sample_rate = load_audio(str(path))
+    assert sample_rate == SAMPLE_RATE
+    np.testing.assert_array_equal(audio, samples / 32768)
+    np.testing.assert_allclose(audio, soundfile_mono(str(path)), rtol=0, atol=1e-12)
+
+    # A data chunk before any fmt chunk cannot be located
+    path.write_bytes(riff([(b'data', samples.tobytes()), (b'fmt ', fmt)]))
+    assert parse_wav_header(str(path)) is None
@@ -0,0 +1,92 @@
+"""Feature store: which files a rerun skips"""
+import os
+
+import frequency_features as ff
+from feature_store import FeatureStore, parameters_hash
+
+
+def test_rows_from_a_cheaper_mode_are_not_done(tmp_path):
+    audio = tmp_path / '1.wav'
+    audio.write_bytes(b'RIFF' + bytes(100))
+    extractor = ff.FrequencyFeatureExtractor(max_workers=1)
+    parameters = extractor.extraction_parameters()
+    row = {'id': 1, 'pitch_mean': 120.0, 'extraction_mode': 'coarse_formants'}
+
+    with FeatureStore(str(tmp_path / 'store.sqlite')) as store:
+        assert store.put(row, str(audio), extractor.extraction_parameters('coarse_formants'))
+        assert store.pending([(str(audio), 1)], parameters) == [(str(audio), 1)]
+        assert store.put(dict(row, extraction_mode='full'), str(audio), parameters)
+        assert store.pending([(str(audio), 1)], parameters) == []
+
+
+def count_hashes(store, monkeypatch):
+    """Record the paths FeatureStore.file_hash is called with"""
+    calls = []
+    file_hash = store.file_hash
+    monkeypatch.setattr(store, 'file_hash', lambda path: calls.append(path) or file_hash(path))
+    return calls
+
+
+def test_unchanged_files_are_not_hashed(tmp_path, monkeypatch):
+    audio = tmp_path / '1.wav'
+    audio.write_bytes(b'RIFF' + bytes(100))
+    parameters = {'feature_set_version': 1}
+
+    with FeatureStore(str(tmp_path / 'store.sqlite')) as store:
+        assert store.put({'id': 1, 'pitch_mean': 120.0}, str(audio), parameters)
+    with FeatureStore(str(tmp_path / 'store.sqlite')) as store:
+        calls = count_hashes(store, monkeypatch)
+        assert store.pending([(str(audio), 1)], parameters) == []
+        assert store.is_done(str(audio), 1, parameters)
+        assert calls == []
+
+
+def test_stat_changes_decide_when_to_hash(tmp_path, monkeypatch):
+    audio = tmp_path / '1.wav'
+    audio.write_bytes(b'RIFF' + bytes(100))
+    parameters = {'feature_set_version': 1}
+
+    with FeatureStore(str(tmp_path / 'store.sqlite')) as store:
+        assert store.put({'id': 1, 'pitch_mean': 120.0}, str(audio), parameters)
+        calls = count_hashes(store, monkeypatch)
+
+        # Touched but identical: hashed once, then the refreshed stat skips the hash
+        stat = audio.stat()
+        os.utime(audio, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert store.pending([(str(audio), 1)], parameters) == []
+        assert store.pending([(str(audio), 1)], parameters) == []
+        assert calls == [str(audio)]
+
+        # Same size, new content and mtime: the hash catches it
+        audio.write_bytes(b'RIFF' + bytes(99) + b'\x01')
+        os.utime(audio, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+        assert store.pending([(str(audio), 1)], parameters) == [(str(audio), 1)]
+        assert len(calls) == 2
+
+        # A different size is a change without reading the file
+        audio.write_bytes(b'RIFF' + bytes(200))
+        assert store.pending([(str(audio), 1)], parameters) == [(str(audio), 1)]
+        assert len(calls) == 2
+        assert not store.is_done(str(tmp_path / 'missing.wav'), 1, parameters)
+
+
+def test_rows_from_before_the_stat_columns_are_hashed_once(tmp_path, monkeypatch):
+    audio = tmp_path / '1.wav'
+    audio.write_bytes(b'RIFF' + bytes(100))
+    parameters = {'feature_set_version': 1}
+    path = str(tmp_path / 'store.sqlite')
+    with FeatureStore(path) as store:
+        store.connection.execute("DROP TABLE features")
+        store.connection.execute(
+            "CREATE TABLE features (participant_id TEXT PRIMARY KEY, file_path TEXT, audio_hash TEXT,"
+            " params_hash TEXT, features_json TEXT, created_at REAL)")
+        store.connection.execute("INSERT INTO features VALUES (?, ?, ?, ?, ?, ?)",
+                                 ('1', str(audio), store.file_hash(str(audio)), parameters_hash(parameters),
+                                  '{"id": 1}', 0.0))
+        store.connection.commit()
+
+    with FeatureStore(path) as store:
+        calls = count_hashes(store, monkeypatch)
+        assert store.pending([(str(audio), 1)], parameters) == []
+        assert store.pending([(str(audio), 1)], parameters) == []
+        assert calls == [str(audio)]
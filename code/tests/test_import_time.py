@@ -0,0 +1,31 @@
+"""Importing the extractor (e.g. in a fresh pool worker) must stay cheap"""
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_S = 0.5
+HEAVY_MODULES = ('pandas', 'scipy', 'sklearn', 'librosa', 'parselmouth', 'soundfile', 'pyarrow', 'tqdm')
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module):
+    """Seconds taken to import a module in a fresh interpreter, and the heavy modules it loaded"""
+    script = ("import sys, time\n"
+              "start = time.perf_counter()\n"
+              f"import {module}\n"
+              "elapsed = time.perf_counter() - start\n"
+              f"print(elapsed, ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=CODE_DIR).stdout.split()
+    return float(output[0]), output[1].split(',') if len(output) > 1 else []
+
+
+def test_frequency_features_imports_within_budget():
+    # Fastest of a few fresh interpreters, so a busy machine does not fail the test
+    timings = [time_import('frequency_features')[0] for _ in range(3)]
+    assert min(timings) < IMPORT_TIME_BUDGET_S
+
+
+def test_frequency_features_loads_no_heavy_modules():
+    _, heavy_modules = time_import('frequency_features')
+    assert heavy_modules == []
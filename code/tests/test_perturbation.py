@@ -0,0 +1,60 @@
+"""jitter_measures() must reproduce Praat's "Get jitter (...)" queries"""
+import numpy as np
+import pytest
+
+from perturbation import jitter_measures
+
+parselmouth = pytest.importorskip('parselmouth')
+from parselmouth.praat import call  # noqa: E402
+
+PRAAT_QUERIES = {'local': "Get jitter (local)", 'local_absolute': "Get jitter (local, absolute)",
+                 'rap': "Get jitter (rap)", 'ppq5': "Get jitter (ppq5)", 'ddp': "Get jitter (ddp)"}
+PERIOD_FLOOR, PERIOD_CEILING, MAXIMUM_PERIOD_FACTOR = 0.0001, 0.02, 1.3
+
+
+def praat_point_process(times):
+    """Praat PointProcess holding the given pulse times"""
+    matrix = call("Create simple Matrix", "pulses", 1, len(times), "0")
+    matrix.values[:] = np.asarray(times)[np.newaxis, :]
+    return call(matrix, "To PointProcess")
+
+
+def random_pulse_train(seed):
+    """Pulse times with random F0 and jitter, and some periods outside the floor, ceiling and factor"""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 400))
+    periods = (1 / rng.uniform(80, 250)) * (1 + rng.choice([0.005, 0.05, 0.2]) * rng.standard_normal(n))
+    outliers = rng.integers(0, n, int(rng.integers(0, 5)))
+    periods[outliers] *= rng.uniform(0.3, 8.0, len(outliers))  # Beyond 1.3x neighbours, some above 20 ms
+    periods = np.abs(periods) + 1e-5
+    return np.cumsum(np.concatenate([[0.1], periods]))
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_jitter_matches_praat(seed):
+    times = random_pulse_train(seed)
+    point_process = praat_point_process(times)
+    measures = jitter_measures(times, PERIOD_FLOOR, PERIOD_CEILING, MAXIMUM_PERIOD_FACTOR)
+    for name, query in PRAAT_QUERIES.items():
+        expected = call(point_process, query, 0, 0, PERIOD_FLOOR, PERIOD_CEILING, MAXIMUM_PERIOD_FACTOR)
+        if np.isnan(expected):
+            assert np.isnan(measures[name]), name
+        else:
+            assert measures[name] == pytest.approx(expected, rel=1e-9, abs=1e-15), name
+
+
+def test_local_sd_is_sd_of_windowed_local_jitter():
+    rng = np.random.default_rng(0)
+    periods = 0.008 * (1 + 0.01 * rng.standard_normal(200))
+    times = np.cumsum(np.concatenate([[0.0], periods]))
+    measures = jitter_measures(times, sd_window_periods=20)
+
+    differences = np.abs(np.diff(periods))
+    pair_means = (periods[:-1] + periods[1:]) / 2
+    window_jitter = [differences[start:start + 20].sum() / pair_means[start:start + 20].sum()
+                     for start in range(len(differences) - 19)]
+    assert measures['local_sd'] == pytest.approx(np.std(window_jitter), rel=1e-9)
+
+    # Steady periods have no jitter to vary, and too few pairs leave it undefined
+    assert jitter_measures(np.arange(100) * 0.008)['local_sd'] == pytest.approx(0.0, abs=1e-9)
+    assert np.isnan(jitter_measures(times[:20], sd_window_periods=20)['local_sd'])
@@ -0,0 +1,104 @@
+"""ResamplingEngine: block statistics against per-resample scipy, and results independent of the workers"""
+import numpy as np
+import pytest
+
+from resampling import STATISTICS, ResamplingEngine, resample_indices
+
+stats = pytest.importorskip('scipy.stats')
+
+
+def feature_table(seed=0, n=60, n_features=6):
+    """Features with ties, a constant column and missing values, an outcome and a group mask"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    X[:, 1] = np.round(X[:, 1])
+    X[:, 2] = 1.5
+    X[rng.random(n) < 0.2, 3:5] = np.nan
+    y = X[:, 0] + rng.normal(size=n)
+    y[5] = np.nan
+    in_first_group = rng.random(n) < 0.4
+    return X, y, in_first_group
+
+
+def cohens_d(first, second):
+    pooled_sd = np.sqrt(((len(first) - 1) * first.var(ddof=1) + (len(second) - 1) * second.var(ddof=1)) /
+                        (len(first) + len(second) - 2))
+    return (first.mean() - second.mean()) / pooled_sd
+
+
+@pytest.mark.parametrize('kind', ['permutation', 'bootstrap'])
+@pytest.mark.parametrize('statistic', ['pearson', 'spearman', 'cohens_d'])
+def test_block_statistics_match_each_resample(kind, statistic):
+    X, y, in_first_group = feature_table()
+    rows = ~np.isnan(y)
+    X, y, in_first_group = X[rows, :2], y[rows], in_first_group[rows]
+    v = in_first_group if statistic == 'cohens_d' else y
+    indices = resample_indices(kind, statistic, v, 20, np.random.default_rng(1))
+    values = STATISTICS[statistic](X, v, indices, kind)
+
+    for resample, rows in enumerate(indices):
+        for column in range(X.shape[1]):
+            if statistic == 'cohens_d':
+                x = X[rows, column] if kind == 'bootstrap' else X[:, column]
+                group = in_first_group[rows]
+                expected = cohens_d(x[group], x[~group])
+            else:
+                x, outcome = (X[rows, column], y[rows]) if kind == 'bootstrap' else (X[:, column], y[rows])
+                reference = stats.pearsonr if statistic == 'pearson' else stats.spearmanr
+                expected = reference(x, outcome)[0]
+            assert values[resample, column] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('statistic', ['pearson', 'spearman', 'cohens_d'])
+def test_results_do_not_depend_on_the_workers(statistic):
+    X, y, in_first_group = feature_table(seed=2)
+    v = in_first_group if statistic == 'cohens_d' else y
+    runs = [ResamplingEngine(n_resamples=250, max_workers=workers, seed=7, block_size=40)
+            for workers in (1, 2, 3)]
+
+    permutations = [engine.permutation_test(statistic, X, v) for engine in runs]
+    bootstraps = [engine.bootstrap(statistic, X, v) for engine in runs]
+    for results in (permutations, bootstraps):
+        for other in results[1:]:
+            for key, values in results[0].items():
+                np.testing.assert_array_equal(other[key], values, err_msg=key)
+
+    # A different seed or block size draws different resamples
+    reseeded = ResamplingEngine(n_resamples=250, seed=8, block_size=40).permutation_test(statistic, X, v)
+    reblocked = ResamplingEngine(n_resamples=250, seed=7, block_size=50).permutation_test(statistic, X, v)
+    tested = ~np.isnan(permutations[0]['p'])
+    assert not np.array_equal(reseeded['p'][tested], permutations[0]['p'][tested])
+    assert not np.array_equal(reblocked['p'][tested], permutations[0]['p'][tested])
+
+
+def test_permutation_p_values_and_intervals():
+    X, y, in_first_group = feature_table(seed=3, n=120)
+    engine = ResamplingEngine(n_resamples=2000, seed=0, block_size=500)
+
+    permutation = engine.permutation_test('pearson', X, y)
+    present = ~np.isnan(X[:, 0]) & ~np.isnan(y)
+    assert permutation['statistic'][0] == pytest.approx(stats.pearsonr(X[present, 0], y[present])[0])
+    assert permutation['p'][0] == pytest.approx(1 / 2001)  # Strong correlation: no permutation reaches it
+    assert 0.05 < permutation['p'][5] <= 1.0
+
+    bootstrap = engine.bootstrap('cohens_d', X, in_first_group)
+    tested = [0, 1, 3, 4, 5]
+    assert np.all(bootstrap['low'][tested] < bootstrap['statistic'][tested])
+    assert np.all(bootstrap['statistic'][tested] < bootstrap['high'][tested])
+    assert np.all(bootstrap['standard_error'][tested] > 0)
+
+
+@pytest.mark.parametrize('statistic', ['pearson', 'spearman', 'cohens_d'])
+def test_constant_columns_are_nan(statistic):
+    X, y, in_first_group = feature_table(seed=4)
+    v = in_first_group if statistic == 'cohens_d' else y
+    engine = ResamplingEngine(n_resamples=200, seed=0, block_size=64)
+
+    permutation = engine.permutation_test(statistic, X, v)
+    bootstrap = engine.bootstrap(statistic, X, v)
+    assert np.isnan(permutation['statistic'][2]) and np.isnan(permutation['p'][2])
+    for key in ['statistic', 'low', 'high', 'standard_error']:
+        assert np.isnan(bootstrap[key][2]), key
+    others = [0, 1, 3, 4, 5]
+    assert not np.any(np.isnan(permutation['p'][others]))
+    assert not np.any(np.isnan(bootstrap['low'][others]))
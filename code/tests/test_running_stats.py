@@ -0,0 +1,111 @@
+"""Merged accumulators must match one pass over all the values"""
+import numpy as np
+import pytest
+from scipy import stats
+
+from running_stats import (MomentAccumulator, QuantileSketch, LinearTrendAccumulator, linear_trend,
+                           batch_linear_trend)
+
+
+def split(values, rng, n_parts=5):
+    """Split an array at random points into consecutive parts (some may be empty)"""
+    cuts = np.sort(rng.integers(0, len(values) + 1, n_parts - 1))
+    return np.split(values, cuts)
+
+
+def test_merged_moments_equal_one_pass():
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2.0, 30.0, 5000) + 80.0
+    merged = MomentAccumulator()
+    for part in split(values, rng):
+        merged.merge(MomentAccumulator.from_values(part))
+
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(np.mean(values), rel=1e-12)
+    assert merged.std == pytest.approx(np.std(values), rel=1e-10)
+    assert merged.skewness == pytest.approx(stats.skew(values), rel=1e-9)
+    assert merged.kurtosis == pytest.approx(stats.kurtosis(values), rel=1e-9)
+    assert (merged.minimum, merged.maximum) == (np.min(values), np.max(values))
+
+
+def test_moments_of_constant_values_are_nan():
+    accumulator = MomentAccumulator.from_values(np.full(10, 120.0))
+    assert accumulator.std == 0.0
+    assert np.isnan(accumulator.skewness) and np.isnan(accumulator.kurtosis)
+
+
+def test_merged_quantile_sketch_equals_one_pass():
+    rng = np.random.default_rng(1)
+    values = rng.uniform(75.0, 500.0, 20000)
+    whole = QuantileSketch()
+    whole.update(values)
+    merged = QuantileSketch()
+    for part in split(values, rng):
+        sketch = QuantileSketch()
+        sketch.update(part)
+        merged.merge(sketch)
+
+    assert merged.buckets == whole.buckets
+    assert merged.count == whole.count
+    q = [0, 1, 5, 25, 50, 75, 95, 99, 100]
+    np.testing.assert_array_equal(merged.percentile(q), whole.percentile(q))
+
+
+@pytest.mark.parametrize('relative_accuracy', [0.001, 0.01])
+def test_quantiles_within_relative_accuracy(relative_accuracy):
+    rng = np.random.default_rng(2)
+    values = np.exp(rng.normal(np.log(150.0), 0.4, 10000))
+    sketch = QuantileSketch(relative_accuracy)
+    sketch.update(values)
+
+    # Order statistics (exact ranks, no interpolation between them)
+    ordered = np.sort(values)
+    ranks = np.arange(0, len(values), 97)
+    estimates = sketch.percentile(100.0 * ranks / (len(values) - 1))
+    np.testing.assert_array_less(np.abs(estimates - ordered[ranks]), relative_accuracy * ordered[ranks] * (1 + 1e-12))
+
+
+def test_quantile_sketch_rejects_non_positive_values():
+    with pytest.raises(ValueError):
+        QuantileSketch().update([120.0, 0.0])
+
+
+def test_merged_linear_trend_equals_one_pass():
+    rng = np.random.default_rng(3)
+    values = 150.0 + 0.01 * np.arange(3000) + rng.normal(0.0, 5.0, 3000)
+    merged = LinearTrendAccumulator()
+    for part in split(values, rng):
+        accumulator = LinearTrendAccumulator()
+        accumulator.update(part)
+        merged.merge(accumulator, x_offset=merged.count)
+
+    slope, offset = np.polyfit(np.arange(len(values)), values, 1)
+    mse = np.mean((values - (slope * np.arange(len(values)) + offset)) ** 2)
+    np.testing.assert_allclose(merged.result(), (slope, offset, mse), rtol=1e-9)
+    np.testing.assert_allclose(linear_trend(values), (slope, offset, mse), rtol=1e-9)
+
+
+def test_batch_linear_trend_matches_polyfit():
+    rng = np.random.default_rng(4)
+    contours = [rng.normal(120.0, 10.0, length) + rng.normal() * np.arange(length)
+                for length in [2, 3, 10, 57, 400]]
+    slopes, offsets, mses = batch_linear_trend(contours)
+    for contour, slope, offset, mse in zip(contours, slopes, offsets, mses):
+        x = np.arange(len(contour))
+        expected_slope, expected_offset = np.polyfit(x, contour, 1)
+        expected_mse = np.mean((contour - (expected_slope * x + expected_offset)) ** 2)
+        np.testing.assert_allclose([slope, offset], [expected_slope, expected_offset], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(mse, expected_mse, rtol=1e-7, atol=1e-12)
+
+    # A padded 2-D array with row lengths gives the same fits as the ragged list
+    padded = np.zeros((len(contours), 400))
+    for row, contour in enumerate(contours):
+        padded[row, :len(contour)] = contour
+    np.testing.assert_allclose(batch_linear_trend(padded, [len(contour) for contour in contours]),
+                               (slopes, offsets, mses), rtol=1e-12)
+
+
+def test_batch_linear_trend_is_nan_for_short_contours():
+    slopes, offsets, mses = batch_linear_trend([np.array([]), np.array([120.0]), np.array([120.0, 121.0])])
+    assert np.isnan(slopes[:2]).all() and np.isnan(offsets[:2]).all() and np.isnan(mses[:2]).all()
+    assert slopes[2] == pytest.approx(1.0)
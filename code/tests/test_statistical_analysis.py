@@ -0,0 +1,121 @@
+"""Vectorized statistics against scipy.stats and least squares, one feature at a time"""
+import numpy as np
+import pytest
+
+from statistical_analysis import (benjamini_hochberg, correlations, interaction_regressions, mann_whitney,
+                                  rank_columns)
+
+stats = pytest.importorskip('scipy.stats')
+
+
+def feature_table(seed=0, n=80, n_features=12):
+    """Features with ties and a few missing-value patterns, and an outcome with gaps"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    X[:, :4] = np.round(X[:, :4], 1)  # Ties
+    X[:, 4] += 0.5 * np.arange(n) / n
+    X[rng.random(n) < 0.15, 6:9] = np.nan  # Shared pattern, e.g. failed audio
+    X[rng.random(n) < 0.1, 10] = np.nan
+    y = X[:, 4] + rng.normal(size=n)
+    y[[3, 17]] = np.nan
+    return X, y
+
+
+def complete(*arrays):
+    rows = np.all([~np.isnan(array) for array in arrays], axis=0)
+    return [array[rows] for array in arrays]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('method, reference', [('pearson', stats.pearsonr), ('spearman', stats.spearmanr)])
+def test_correlations_match_scipy(seed, method, reference):
+    X, y = feature_table(seed)
+    result = correlations(X, y, method)
+    for column in range(X.shape[1]):
+        x_rows, y_rows = complete(X[:, column], y)
+        expected = reference(x_rows, y_rows)
+        assert result['n'][column] == len(x_rows)
+        assert result['r'][column] == pytest.approx(expected[0], rel=1e-10, abs=1e-14)
+        assert result['p'][column] == pytest.approx(expected[1], rel=1e-8, abs=1e-14)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_mann_whitney_matches_scipy(seed):
+    X, _ = feature_table(seed)
+    in_first_group = np.random.default_rng(seed + 100).random(len(X)) < 0.4
+    result = mann_whitney(X, in_first_group)
+    for column in range(X.shape[1]):
+        present = ~np.isnan(X[:, column])
+        first = X[present & in_first_group, column]
+        second = X[present & ~in_first_group, column]
+        expected = stats.mannwhitneyu(first, second, alternative='two-sided', method='asymptotic')
+        assert result['u'][column] == expected.statistic
+        assert result['p'][column] == pytest.approx(expected.pvalue, rel=1e-10)
+        pooled_sd = np.sqrt(((len(first) - 1) * first.var(ddof=1) + (len(second) - 1) * second.var(ddof=1)) /
+                            (len(first) + len(second) - 2))
+        assert result['cohens_d'][column] == pytest.approx((first.mean() - second.mean()) / pooled_sd, rel=1e-10)
+
+
+def test_ranks_match_scipy():
+    X, _ = feature_table()
+    X = np.nan_to_num(X)
+    ranks, tie_sums = rank_columns(X)
+    for column in range(X.shape[1]):
+        np.testing.assert_array_equal(ranks[:, column], stats.rankdata(X[:, column]))
+        _, tie_sizes = np.unique(X[:, column], return_counts=True)
+        assert tie_sums[column] == np.sum(tie_sizes ** 3 - tie_sizes)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_benjamini_hochberg_matches_scipy(seed):
+    rng = np.random.default_rng(seed)
+    p = np.concatenate([rng.uniform(0, 0.01, 5), rng.uniform(size=40), [0.5, 0.5, 1.0]])
+    p[rng.integers(0, len(p), 4)] = np.nan
+    q = benjamini_hochberg(p)
+    valid = ~np.isnan(p)
+    np.testing.assert_array_equal(np.isnan(q), ~valid)
+    np.testing.assert_allclose(q[valid], stats.false_discovery_control(p[valid]), rtol=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_interaction_regressions_match_lstsq(seed):
+    X, y = feature_table(seed)
+    gender = (np.random.default_rng(seed + 200).random(len(X)) < 0.5).astype(np.float64)
+    result = interaction_regressions(X, y, gender)
+    for column in range(X.shape[1]):
+        x_rows, y_rows, g_rows = complete(X[:, column], y, gender)
+        design = np.column_stack([np.ones(len(x_rows)), x_rows, g_rows, x_rows * g_rows])
+        beta, rss, _, _ = np.linalg.lstsq(design, y_rows, rcond=None)
+        degrees = len(y_rows) - 4
+        standard_errors = np.sqrt(rss[0] / degrees * np.diag(np.linalg.inv(design.T @ design)))
+        t = beta / standard_errors
+
+        assert result['n'][column] == len(y_rows)
+        np.testing.assert_allclose(result['coefficients'][column], beta, rtol=1e-8)
+        np.testing.assert_allclose(result['standard_errors'][column], standard_errors, rtol=1e-8)
+        np.testing.assert_allclose(result['p'][column], 2 * stats.t.sf(np.abs(t), degrees), rtol=1e-6)
+        assert result['r_squared'][column] == pytest.approx(
+            1 - rss[0] / np.sum((y_rows - y_rows.mean()) ** 2), rel=1e-8)
+
+
+def test_constant_columns_are_nan():
+    X, y = feature_table()
+    X[:, 2] = 3.0
+    X[:, 7] = np.where(np.isnan(X[:, 7]), np.nan, -1.0)
+    gender = np.arange(len(X)) % 2
+    constant = [2, 7]
+
+    for method in ['pearson', 'spearman']:
+        result = correlations(X, y, method)
+        assert np.all(np.isnan(result['r'][constant])) and np.all(np.isnan(result['p'][constant]))
+        assert not np.any(np.isnan(np.delete(result['r'], constant)))
+
+    differences = mann_whitney(X, gender == 0)
+    assert np.all(np.isnan(differences['cohens_d'][constant]))
+    assert np.all(differences['p'][constant] == 1.0)  # As scipy: U equals its mean when every value ties
+
+    regressions = interaction_regressions(X, y, gender)
+    for key in ['coefficients', 'standard_errors', 'p']:
+        assert np.all(np.isnan(regressions[key][constant]))
+        assert not np.any(np.isnan(np.delete(regressions[key], constant, axis=0)))
+    assert np.all(np.isnan(regressions['r_squared'][constant]))
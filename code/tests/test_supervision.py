@@ -0,0 +1,76 @@
+"""Supervised workers are stopped at their budgets and files are retried in cheaper modes"""
+import time
+
+import numpy as np
+import pytest
+
+import frequency_features as ff
+from supervision import SupervisedPool
+from test_worker_crash import write_tone
+
+
+def sleep_then_return(seconds, value):
+    time.sleep(seconds)
+    return value
+
+
+def allocate_mb(megabytes, seconds):
+    block = np.ones(int(megabytes * 2 ** 20 / 8))
+    time.sleep(seconds)
+    return float(block[0])
+
+
+def slow_start(seconds):
+    time.sleep(seconds)
+
+
+def outcomes(pool):
+    return {key: (status, result) for key, _, status, result in pool.results()}
+
+
+def test_task_over_time_limit_is_killed():
+    with SupervisedPool(sleep_then_return, max_workers=2, time_limit=0.5, poll_interval=0.05) as pool:
+        pool.submit('slow', (30.0, 'slow'))
+        pool.submit('fast', (0.0, 'fast'))
+        pool.submit('after', (0.0, 'after'))
+        start = time.monotonic()
+        results = outcomes(pool)
+    assert time.monotonic() - start < 10.0
+    assert results == {'slow': ('timeout', None), 'fast': ('ok', 'fast'), 'after': ('ok', 'after')}
+
+
+def test_task_over_memory_limit_is_killed():
+    with SupervisedPool(allocate_mb, max_workers=1, memory_limit_mb=400, poll_interval=0.05) as pool:
+        pool.submit('large', (800, 30.0))
+        pool.submit('small', (1, 0.0))
+        results = outcomes(pool)
+    assert results == {'large': ('memory', None), 'small': ('ok', 1.0)}
+
+
+def test_time_limit_excludes_worker_start_up():
+    # The initializer takes longer than the limit, the task itself does not
+    with SupervisedPool(sleep_then_return, max_workers=1, time_limit=0.5, initializer=slow_start,
+                        initargs=(1.0,), poll_interval=0.05) as pool:
+        pool.submit('task', (0.1, 'done'))
+        assert outcomes(pool) == {'task': ('ok', 'done')}
+
+
+def slow_in_full_mode(extractor, sound_obj, analysis):
+    """Feature family that only finishes in time outside the full extraction mode"""
+    if extractor.mode == 'full':
+        time.sleep(30)
+    return {'supervision_test_mode': float(list(ff.EXTRACTION_MODES).index(extractor.mode))}
+
+
+def test_file_over_budget_is_retried_in_cheaper_mode(tmp_path):
+    ff.register_feature_family(ff.FeatureFamily('supervision_test', ['supervision_test_mode'], [],
+                                                slow_in_full_mode))
+    try:
+        write_tone(tmp_path / 'tone.wav', 1.0)
+        extractor = ff.FrequencyFeatureExtractor(max_workers=1, families=['supervision_test'])
+        rows = list(extractor.iter_extract_supervised([(str(tmp_path / 'tone.wav'), 1)], time_limit=2.0))
+    finally:
+        del ff.FEATURE_FAMILIES['supervision_test']
+    assert len(rows) == 1
+    assert rows[0]['extraction_mode'] == 'coarse_formants'
+    assert rows[0]['supervision_test_mode'] == 1.0
@@ -0,0 +1,76 @@
+"""vocal_tremor() must recover the rate and amplitude of an F0 modulation"""
+import numpy as np
+import pytest
+
+from tremor import vocal_tremor
+
+FRAME_RATE = 100.0  # 10 ms pitch frames
+
+
+def f0_track(seconds, tremor_rate=0.0, tremor_amplitude=0.0, drift_rate=0.4, drift_amplitude=0.0,
+             run_seconds=None, gap_seconds=0.2):
+    """150 Hz F0 track with a sinusoidal tremor and intonation drift, optionally cut into voiced runs"""
+    t = np.arange(int(seconds * FRAME_RATE)) / FRAME_RATE
+    f0 = (150.0 + tremor_amplitude * np.sin(2 * np.pi * tremor_rate * t)
+          + drift_amplitude * np.sin(2 * np.pi * drift_rate * t + 1.0))
+    if run_seconds is not None:
+        f0 = np.where(t % (run_seconds + gap_seconds) < run_seconds, f0, 0.0)
+    return f0
+
+
+def test_synthetic_tremor_voice():
+    parselmouth = pytest.importorskip('parselmouth')
+    from benchmark_features import synthesize_voiced_signal
+
+    # 5 Hz modulation of 3% around 150 Hz: 4.5 Hz amplitude
+    signal = synthesize_voiced_signal(12, 16000, f0=150.0, tremor_rate=5.0, tremor_depth=0.03)
+    for voiced_seconds in (None, 0.5):
+        if voiced_seconds is not None:
+            # Speech-like: 0.5 s voiced runs separated by 0.25 s of silence
+            t = np.arange(len(signal)) / 16000
+            signal = signal * (t % (voiced_seconds + 0.25) < voiced_seconds)
+        pitch = parselmouth.Sound(signal, sampling_frequency=16000).to_pitch(
+            time_step=0.01, pitch_floor=75, pitch_ceiling=500).selected_array['frequency']
+        amplitude, rate, seconds = vocal_tremor([pitch], FRAME_RATE)
+        assert rate[0] == pytest.approx(5.0, abs=0.25)
+        assert amplitude[0] == pytest.approx(4.5, rel=0.1)
+        assert seconds[0] == pytest.approx(np.count_nonzero(pitch) / FRAME_RATE, rel=0.05)
+
+
+@pytest.mark.parametrize('tremor_rate', [1.5, 2.0, 3.0, 5.0, 8.0, 12.0])
+def test_tremor_separated_from_intonation_drift(tremor_rate):
+    # A 15 Hz intonation movement at 0.4 Hz, just below the band, must not mask a 2 Hz tremor
+    amplitude, rate, _ = vocal_tremor([f0_track(60, tremor_rate, 2.0, drift_amplitude=15.0)], FRAME_RATE)
+    assert rate[0] == pytest.approx(tremor_rate, abs=0.25)
+    assert amplitude[0] == pytest.approx(2.0, rel=0.1)
+
+
+def test_intonation_drift_alone_is_not_tremor():
+    amplitude, _, _ = vocal_tremor([f0_track(60, drift_amplitude=15.0)], FRAME_RATE)
+    assert amplitude[0] < 0.5
+
+
+@pytest.mark.parametrize('tremor_rate', [5.0, 8.0, 12.0])
+def test_short_voiced_runs(tremor_rate):
+    # Runs of 0.4 s (the minimum) hold two cycles of a 5 Hz tremor and still measure it
+    track = f0_track(60, tremor_rate, 3.0, drift_amplitude=15.0, run_seconds=0.4)
+    amplitude, rate, seconds = vocal_tremor([track], FRAME_RATE)
+    assert rate[0] == pytest.approx(tremor_rate, abs=0.75)
+    assert amplitude[0] == pytest.approx(3.0, rel=0.15)
+    assert seconds[0] == pytest.approx(np.count_nonzero(track) / FRAME_RATE)
+
+
+def test_runs_below_the_minimum_are_not_analysed():
+    track = f0_track(60, 5.0, 3.0, run_seconds=0.3)
+    amplitude, rate, seconds = vocal_tremor([track], FRAME_RATE, min_voiced_seconds=0.4)
+    assert np.isnan(amplitude[0]) and np.isnan(rate[0])
+    assert seconds[0] == 0.0
+
+
+def test_batch_equals_single_tracks():
+    tracks = [f0_track(30, 5.0, 3.0, run_seconds=0.8), f0_track(10), f0_track(45, 8.0, 1.0, drift_amplitude=10.0)]
+    batch = vocal_tremor(tracks, FRAME_RATE)
+    for index, track in enumerate(tracks):
+        single = vocal_tremor([track], FRAME_RATE)
+        for batch_values, single_values in zip(batch, single):
+            assert batch_values[index] == pytest.approx(single_values[0], rel=1e-9, nan_ok=True)
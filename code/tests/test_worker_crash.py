@@ -0,0 +1,88 @@
+"""A worker process that dies must only cost the file that killed it"""
+import math
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+import frequency_features as ff
+
+CRASH_BELOW_SECONDS = 1.0
+
+
+def write_tone(path, seconds, sample_rate=16000):
+    """Write a 150 Hz tone as a 16-bit mono WAV file"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (0.3 * np.sin(2 * np.pi * 150 * t) * 32767).astype(np.int16)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+
+
+def crash_on_short_files(extractor, sound_obj, analysis):
+    """Feature family that kills its worker process on short recordings"""
+    if sound_obj.xmax - sound_obj.xmin < CRASH_BELOW_SECONDS:
+        os._exit(1)
+    return {'crash_test_ok': 1.0}
+
+
+@pytest.fixture
+def crash_files(tmp_path):
+    """Fifteen long recordings and one short one that kills its worker, with the crash family registered"""
+    ff.register_feature_family(ff.FeatureFamily('crash_test', ['crash_test_ok'], [], crash_on_short_files))
+    write_tone(tmp_path / 'long.wav', 3.0)
+    write_tone(tmp_path / 'short.wav', 0.5)
+    files = [(str(tmp_path / 'long.wav'), participant_id) for participant_id in range(15)]
+    files.append((str(tmp_path / 'short.wav'), 99))
+    yield files
+    del ff.FEATURE_FAMILIES['crash_test']
+
+
+def check_results(results):
+    assert sorted(results) == list(range(15)) + [99]
+    assert all(results[participant_id]['crash_test_ok'] == 1.0 for participant_id in range(15))
+    assert math.isnan(results[99]['crash_test_ok'])
+
+
+def broken_pool():
+    """Process pool whose worker already died, so submit() raises BrokenProcessPool"""
+    executor = ProcessPoolExecutor(max_workers=1, initializer=os._exit, initargs=(1,))
+    assert isinstance(executor.submit(int).exception(), BrokenProcessPool)
+    return executor
+
+
+def test_dead_worker_only_loses_its_file(crash_files):
+    # Two files per chunk, so the crashing file shares its chunk with a good one
+    extractor = ff.FrequencyFeatureExtractor(max_workers=2, chunk_size=2, families=['crash_test'])
+    check_results({row['id']: row for row in extractor.iter_extract_many(crash_files)})
+
+
+def test_pool_broken_at_submit(crash_files, monkeypatch):
+    # Just enough memory for two workers each running a chunk, so every chunk
+    # goes through the admission queue's accounting
+    extractor = ff.FrequencyFeatureExtractor(max_workers=2, chunk_size=2, families=['crash_test'],
+                                             memory_budget_mb=2 * (ff.WORKER_BASELINE_MB + 3.0))
+    pools = []
+
+    def extraction_pool(n_workers):
+        # The first pool dies before a chunk is admitted, and the pool rebuilt
+        # after the crash dies before the first suspect is re-run
+        pools.append(n_workers)
+        if len(pools) in (1, 3):
+            return broken_pool()
+        return ff.FrequencyFeatureExtractor.extraction_pool(extractor, n_workers)
+
+    requeued = []
+    requeue = ff.AdmissionQueue.requeue
+    monkeypatch.setattr(ff.AdmissionQueue, 'requeue',
+                        lambda queue, task, memory_mb: requeued.append(task) or requeue(queue, task, memory_mb))
+
+    extractor.extraction_pool = extraction_pool
+    check_results({row['id']: row for row in extractor.iter_extract_many(crash_files)})
+    assert len(requeued) == 1
+    assert pools == [2] * len(pools) and len(pools) >= 4